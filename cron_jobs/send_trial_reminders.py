@@ -1,15 +1,8 @@
-from inventory_system import create_app, db
-from modules.users.models import User
-from datetime import datetime
+from inventory_system import create_app
+from modules.users.trial_reminders import queue_trial_reminders
 
 # Create and set up the Flask app context
 app = create_app()
 with app.app_context():
-    users = User.query.filter(User.trial_expiry_date.isnot(None)).all()
-    for user in users:
-        if user.is_trial_active() and not user.notification_sent:
-            days_remaining = (user.trial_expiry_date - datetime.now()).days
-            if days_remaining <= 3:  # Send reminder 3 days before expiry
-                user.send_trial_expiry_reminder()
-                user.notification_sent = True
-                db.session.commit()
+    queued = queue_trial_reminders()  # Only users in the 7/3/1-day windows are read; each reminder is sent once
+    print(f"Queued {sum(queued.values())} trial reminder(s)")
@@ -6,6 +6,7 @@ from flask_restx import Api
 from flask_login import LoginManager, login_required, login_user, current_user, logout_user
 from flask_mail import Mail
 from flask_apscheduler import APScheduler
+import click
 import os
 from .swagger import init_swagger
 from logging.handlers import RotatingFileHandler
@@ -57,10 +58,11 @@ def create_app():
     app.logger.info('Inventory System startup')
 
     # Email configuration
+    # MAIL_SERVER/MAIL_PORT/MAIL_USE_SSL can point at a local debugging SMTP server in development and tests
     app.config.update({
-        'MAIL_SERVER': 'smtp.gmail.com',
-        'MAIL_PORT': 465,
-        'MAIL_USE_SSL': True,
+        'MAIL_SERVER': os.getenv('MAIL_SERVER', 'smtp.gmail.com'),
+        'MAIL_PORT': int(os.getenv('MAIL_PORT', 465)),
+        'MAIL_USE_SSL': os.getenv('MAIL_USE_SSL', 'true').lower() == 'true',
         'MAIL_USERNAME': os.getenv('GMAIL_USER'),
         'MAIL_PASSWORD': os.getenv('GMAIL_APP_PASSWORD'),
         'MAIL_DEFAULT_SENDER': os.getenv('GMAIL_USER'),
@@ -106,10 +108,25 @@ def create_app():
         from modules.ReturnedDamagedItem.models import ReturnedDamagedItem
         from modules.announcements.models import Announcement
         from modules.business.models import Business
+        from modules.tables_reports.models import ReportHistory, ReportArtifact, ReportSettings
+        from modules.tables_reports.models import DailyRollup, RollupDirtyDay, RollupWatermark, DailySketch
+        from modules.tables_reports.models import HourlySalesRollup, SalesHeatmapCell
+        from modules.utils.email_automation.models import EmailOutbox
+        from modules.tables_reports.rollups import register_dirty_day_tracking
+        from modules.tables_reports.live_dashboard import register_live_dashboard_events
+
+        # Record which days' rollups go stale whenever sales, expenses, returns or receivables are written
+        register_dirty_day_tracking()
+        # Wake open live-dashboard streams when a tenant's sales, stock or movements are committed
+        register_live_dashboard_events()
 
         # Initialize migrations after all models are imported
         migrate.init_app(app, db)
 
+    # Background PDF rendering pool (started lazily on the first export)
+    from modules.utils.pdf_service import pdf_service
+    pdf_service.configure(app.config)
+
     # Initialize other extensions
     jwt.init_app(app)
     login_manager.init_app(app)
@@ -149,6 +166,54 @@ def create_app():
         with app.app_context():
             email_automation.check_low_inventory()
 
+    @scheduler.task('cron', id='enforce_report_retention', hour=3)
+    def scheduled_report_retention():
+        from modules.tables_reports.report_storage import enforce_retention_for_all_tenants
+        with app.app_context():
+            enforce_retention_for_all_tenants()
+
+    @scheduler.task('cron', id='deliver_scheduled_reports', hour=2)
+    def scheduled_report_delivery():
+        from modules.tables_reports.report_scheduler import deliver_scheduled_reports
+        with app.app_context():
+            deliver_scheduled_reports()
+
+    @scheduler.task('interval', id='refresh_report_rollups', minutes=app.config.get('ROLLUP_REFRESH_MINUTES', 15))
+    def scheduled_rollup_refresh():
+        from modules.tables_reports.rollups import refresh_rollups
+        with app.app_context():
+            refresh_rollups()
+
+    @scheduler.task('interval', id='drain_email_outbox', seconds=app.config.get('EMAIL_OUTBOX_POLL_SECONDS', 15),
+                    max_instances=1, coalesce=True)
+    def scheduled_outbox_drain():
+        from modules.utils.email_automation.outbox import drain_outbox
+        with app.app_context():
+            drain_outbox()
+
+    @app.cli.command('email-outbox')
+    @click.option('--drain', is_flag=True, help='Deliver due emails now instead of waiting for the worker.')
+    @click.option('--requeue-dead', is_flag=True, help='Give dead-lettered emails a fresh set of attempts.')
+    def email_outbox_command(drain, requeue_dead):
+        """Show email outbox delivery metrics, optionally draining it or requeueing dead letters first."""
+        from modules.utils.email_automation.outbox import drain_outbox, get_outbox_metrics, requeue_dead as requeue
+        if requeue_dead:
+            click.echo(f"Requeued {requeue()} dead-lettered email(s)")
+        if drain:
+            counts = drain_outbox()
+            click.echo(f"Sent {counts['sent']}, retrying {counts['retried']}, dead-lettered {counts['dead']}")
+        for name, value in get_outbox_metrics().items():
+            click.echo(f"{name}: {value}")
+
+    @app.cli.command('refresh-rollups')
+    @click.option('--tenant', type=int, default=None, help='Only refresh this tenant (admin user id).')
+    @click.option('--full', is_flag=True, help='Rebuild every day instead of only the dirty ones.')
+    def refresh_rollups_command(tenant, full):
+        """Recompute daily report rollups for days changed since the last refresh."""
+        from modules.tables_reports.rollups import refresh_rollups
+        refreshed = refresh_rollups(tenant, full=full)
+        click.echo(f"Refreshed {sum(refreshed.values())} day(s) across {len(refreshed)} tenant(s)")
+
     # Root route
     @app.route('/')
     def redirect_to_landing():
@@ -198,6 +263,7 @@ def create_app():
     from modules.routes.visualizations_routes import visualizations_bp
     from modules.routes.announcement_routes import announcements_bp
     from modules.routes.business_routes import business_bp
+    from modules.routes.pdf_jobs_routes import pdf_jobs_bp
 
     app.register_blueprint(main_bp)
     app.register_blueprint(products_bp, url_prefix='/products')
@@ -213,6 +279,7 @@ def create_app():
     app.register_blueprint(visualizations_bp, url_prefix='/visualizations')
     app.register_blueprint(announcements_bp, url_prefix='/announcements')
     app.register_blueprint(business_bp, url_prefix='/business')
+    app.register_blueprint(pdf_jobs_bp, url_prefix='/pdf_jobs')
 
     # Initialize Swagger
     init_swagger(app)
@@ -19,12 +19,28 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')
 
 # Gmail SMTP Configuration
-MAIL_SERVER = 'smtp.gmail.com'
-MAIL_PORT = 465
-MAIL_USE_SSL = True
+MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')  # e.g. localhost with `python -m aiosmtpd -n -l localhost:1025` for local testing
+MAIL_PORT = int(os.getenv('MAIL_PORT', 465))
+MAIL_USE_SSL = os.getenv('MAIL_USE_SSL', 'true').lower() == 'true'
 MAIL_USERNAME = os.getenv('GMAIL_USER')
 MAIL_PASSWORD = os.getenv('GMAIL_APP_PASSWORD')
 MAIL_DEFAULT_SENDER = os.getenv('GMAIL_USER')
+MAIL_POOL_SIZE = int(os.getenv('MAIL_POOL_SIZE', 3))  # Persistent SMTP connections shared by all senders
+MAIL_MAX_MESSAGES_PER_CONNECTION = 100  # Connections are recycled after this many sends
+MAIL_KEEPALIVE_SECONDS = 30  # Idle connections older than this are checked with NOOP before reuse
+MAIL_RATE_PER_SECOND = float(os.getenv('MAIL_RATE_PER_SECOND', 5))  # Pool-wide send rate limit (0 disables)
+
+# Email outbox: every email is queued in the email_outbox table and delivered by a background worker
+EMAIL_OUTBOX_POLL_SECONDS = int(os.getenv('EMAIL_OUTBOX_POLL_SECONDS', 15))  # How often the worker looks for due emails
+EMAIL_OUTBOX_BATCH_SIZE = 100  # Emails claimed per worker round
+EMAIL_OUTBOX_WORKERS = 2  # Concurrent SMTP sessions used by the worker (at most MAIL_POOL_SIZE)
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6  # Failed emails are dead-lettered after this many attempts
+EMAIL_OUTBOX_RETRY_BASE_SECONDS = 60  # First retry delay, doubled on every further attempt
+EMAIL_OUTBOX_RETRY_MAX_SECONDS = 3600
+EMAIL_OUTBOX_STALE_MINUTES = 15  # Emails claimed longer ago than this by a crashed worker are requeued
+EMAIL_OUTBOX_RETENTION_DAYS = 30  # Delivered emails are deleted after this many days; dead letters are kept
+LOW_STOCK_DIGEST_INLINE_ROWS = 25  # Longer low-stock lists are attached to the digest as CSV
+LOW_STOCK_DIGEST_BATCH_SIZE = 500  # Digests inserted into the outbox per bulk INSERT
 
 # Stripe Configuration
 STRIPE_PUBLISHABLE_KEY = os.getenv('STRIPE_PUBLISHABLE_KEY')
@@ -67,3 +83,39 @@ GDPR_DATA_RETENTION_DAYS = 730  # Default 2 years
 GDPR_CONTACT_EMAIL = os.getenv('GDPR_CONTACT_EMAIL', 'privacy@example.com')
 GDPR_DPO_NAME = os.getenv('GDPR_DPO_NAME', 'Data Protection Officer')
 GDPR_DPO_EMAIL = os.getenv('GDPR_DPO_EMAIL', 'dpo@example.com')
+
+# Report storage configuration
+REPORT_STORAGE_DIR = os.getenv('REPORT_STORAGE_DIR', os.path.join(os.path.dirname(BASE_DIR), 'reports'))
+REPORT_PDF_WORKERS = int(os.getenv('REPORT_PDF_WORKERS', os.cpu_count() or 2))
+REPORT_STORAGE_QUOTA_MB = int(os.getenv('REPORT_STORAGE_QUOTA_MB', 500))  # Default per-tenant quota
+REPORT_RETENTION_DAYS = int(os.getenv('REPORT_RETENTION_DAYS', 90))  # Evict reports not downloaded for this long
+REPORT_DOWNLOAD_MAX_AGE = 3600  # Cache-Control max-age for report downloads, in seconds
+REPORT_SCHEDULE_WORKERS = int(os.getenv('REPORT_SCHEDULE_WORKERS', 4))  # Concurrent renders for scheduled delivery
+
+# Background PDF rendering (visualizations, announcements)
+PDF_RENDER_WORKERS = int(os.getenv('PDF_RENDER_WORKERS', 2))  # wkhtmltopdf processes running at once
+PDF_MAX_QUEUED_JOBS = int(os.getenv('PDF_MAX_QUEUED_JOBS', 20))  # Exports waiting beyond this are refused until the queue drains
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', os.path.join(REPORT_STORAGE_DIR, 'pdf_cache'))  # Rendered PDFs, named by content hash
+PDF_CACHE_MAX_AGE_HOURS = int(os.getenv('PDF_CACHE_MAX_AGE_HOURS', 24))
+PDF_RENDER_STALE_MINUTES = int(os.getenv('PDF_RENDER_STALE_MINUTES', 10))  # A render with no PDF after this is reported failed and can be resubmitted
+
+# Dashboard configuration
+DASHBOARD_CACHE_TTL = int(os.getenv('DASHBOARD_CACHE_TTL', 60))  # Seconds a tenant's KPI tiles are cached
+ANALYTICS_CACHE_TTL = int(os.getenv('ANALYTICS_CACHE_TTL', 300))  # Seconds windowed analytics (turnover etc.) are cached
+ROLLUP_REFRESH_MINUTES = int(os.getenv('ROLLUP_REFRESH_MINUTES', 15))  # How often dirty days are folded into the daily rollups
+LIVE_DASHBOARD_INTERVAL = int(os.getenv('LIVE_DASHBOARD_INTERVAL', 2))  # Live tiles send at most one update per this many seconds
+LIVE_DASHBOARD_HEARTBEAT = 15  # Seconds between keep-alive comments on an idle live stream
+# Streams close after this and the browser reconnects; each open stream holds a worker thread, so keep
+# this below the gunicorn --timeout in the Procfile (360) and size --threads for the expected viewers
+LIVE_DASHBOARD_MAX_SECONDS = int(os.getenv('LIVE_DASHBOARD_MAX_SECONDS', 300))
+# Streams per web worker process; keep well below the Procfile's --threads so other requests still get a thread.
+# Dashboards beyond the cap poll the JSON snapshot instead
+LIVE_DASHBOARD_MAX_STREAMS = int(os.getenv('LIVE_DASHBOARD_MAX_STREAMS', 8))
+LIVE_DASHBOARD_POLL_SECONDS = 10  # Streams re-read their tiles this often to catch writes from other processes
+
+# Visualization configuration
+PLOTLY_JS_FILE = 'js/plotly-2.35.2.min.js'  # Pinned plotly.js bundle vendored under app/static; PDFs load it from disk
+PLOTLY_JS_URL = os.getenv('PLOTLY_JS_URL')  # Optional CDN for browser pages; defaults to the vendored file
+CHART_DATA_MAX_AGE = 3600  # Cache-Control max-age for chart-data responses, in seconds
+CHART_SERIES_CACHE_TTL = int(os.getenv('CHART_SERIES_CACHE_TTL', 60))  # Seconds a bucketed series is shared between preview and save
+CHART_MAX_POINTS = int(os.getenv('CHART_MAX_POINTS', 1000))  # Bar/line series longer than this are downsampled with LTTB
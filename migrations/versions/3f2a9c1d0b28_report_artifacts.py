@@ -0,0 +1,64 @@
+"""Report artifacts: report_history.artifact_id and business.report_storage_quota_mb
+
+Revision ID: 3f2a9c1d0b28
+Revises:
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d0b28'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _missing(table, column):
+    """True when `table` exists without `column`; databases built by db.create_all() already have it."""
+    inspector = sa.inspect(op.get_bind())
+    return inspector.has_table(table) and column not in {c['name'] for c in inspector.get_columns(table)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # An empty database is left to db.create_all(); only existing deployments get the new table here
+    if inspector.has_table('report_history') and not inspector.has_table('report_artifacts'):
+        op.create_table(
+            'report_artifacts',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('content_hash', sa.String(length=64), nullable=False),
+            sa.Column('extension', sa.String(length=10), nullable=False),
+            sa.Column('file_path', sa.String(length=255), nullable=False),
+            sa.Column('file_size', sa.BigInteger(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('last_accessed_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('user_id', 'content_hash', 'extension', name='uq_report_artifacts_user_hash')
+        )
+        op.create_index('ix_report_artifacts_user_id', 'report_artifacts', ['user_id'])
+        op.create_index('ix_report_artifacts_last_accessed_at', 'report_artifacts', ['last_accessed_at'])
+
+    if _missing('report_history', 'artifact_id'):
+        with op.batch_alter_table('report_history') as batch_op:
+            batch_op.add_column(sa.Column('artifact_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_report_history_artifact_id', 'report_artifacts', ['artifact_id'], ['id'])
+
+    if _missing('business', 'report_storage_quota_mb'):
+        with op.batch_alter_table('business') as batch_op:
+            batch_op.add_column(sa.Column('report_storage_quota_mb', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('business') as batch_op:
+        batch_op.drop_column('report_storage_quota_mb')
+    with op.batch_alter_table('report_history') as batch_op:
+        batch_op.drop_constraint('fk_report_history_artifact_id', type_='foreignkey')
+        batch_op.drop_column('artifact_id')
+    op.drop_index('ix_report_artifacts_last_accessed_at', table_name='report_artifacts')
+    op.drop_index('ix_report_artifacts_user_id', table_name='report_artifacts')
+    op.drop_table('report_artifacts')
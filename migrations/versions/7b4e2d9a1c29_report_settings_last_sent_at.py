@@ -0,0 +1,35 @@
+"""Scheduled report delivery: report_settings.last_sent_at
+
+Revision ID: 7b4e2d9a1c29
+Revises: 3f2a9c1d0b28
+Create Date: 2026-10-19 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b4e2d9a1c29'
+down_revision = '3f2a9c1d0b28'
+branch_labels = None
+depends_on = None
+
+
+def _missing(table, column):
+    """True when `table` exists without `column`; databases built by db.create_all() already have it."""
+    inspector = sa.inspect(op.get_bind())
+    return inspector.has_table(table) and column not in {c['name'] for c in inspector.get_columns(table)}
+
+
+def upgrade():
+    if _missing('report_settings', 'last_sent_at'):
+        with op.batch_alter_table('report_settings') as batch_op:
+            batch_op.add_column(sa.Column('last_sent_at', sa.DateTime(), nullable=True))
+            batch_op.create_index('ix_report_settings_last_sent_at', ['last_sent_at'])
+
+
+def downgrade():
+    with op.batch_alter_table('report_settings') as batch_op:
+        batch_op.drop_index('ix_report_settings_last_sent_at')
+        batch_op.drop_column('last_sent_at')
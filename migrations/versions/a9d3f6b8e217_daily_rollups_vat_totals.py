@@ -0,0 +1,44 @@
+"""Per-day VAT totals on daily_rollups
+
+Revision ID: a9d3f6b8e217
+Revises: e5a07c2b9f50
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3f6b8e217'
+down_revision = 'e5a07c2b9f50'
+branch_labels = None
+depends_on = None
+
+VAT_COLUMNS = ('sales_net', 'output_vat', 'purchases_gross', 'input_vat')
+
+
+def _missing(table, column):
+    """True when `table` exists without `column`; databases built by db.create_all() already have it."""
+    inspector = sa.inspect(op.get_bind())
+    return inspector.has_table(table) and column not in {c['name'] for c in inspector.get_columns(table)}
+
+
+def upgrade():
+    missing = [column for column in VAT_COLUMNS + ('vat_rate',) if _missing('daily_rollups', column)]
+    if not missing:
+        return
+    with op.batch_alter_table('daily_rollups') as batch_op:
+        for column in VAT_COLUMNS:
+            if column in missing:
+                batch_op.add_column(sa.Column(column, sa.Numeric(12, 2), nullable=False, server_default='0'))
+        if 'vat_rate' in missing:
+            # Left NULL on existing rows, so the next rollup refresh rebuilds them with VAT figures
+            batch_op.add_column(sa.Column('vat_rate', sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('daily_rollups') as batch_op:
+        batch_op.drop_column('vat_rate')
+        for column in reversed(VAT_COLUMNS):
+            batch_op.drop_column(column)
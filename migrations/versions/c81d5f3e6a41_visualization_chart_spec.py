@@ -0,0 +1,33 @@
+"""Client-rendered charts: visualizations.chart_spec
+
+Revision ID: c81d5f3e6a41
+Revises: 7b4e2d9a1c29
+Create Date: 2026-10-19 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c81d5f3e6a41'
+down_revision = '7b4e2d9a1c29'
+branch_labels = None
+depends_on = None
+
+
+def _missing(table, column):
+    """True when `table` exists without `column`; databases built by db.create_all() already have it."""
+    inspector = sa.inspect(op.get_bind())
+    return inspector.has_table(table) and column not in {c['name'] for c in inspector.get_columns(table)}
+
+
+def upgrade():
+    if _missing('visualizations', 'chart_spec'):
+        with op.batch_alter_table('visualizations') as batch_op:
+            batch_op.add_column(sa.Column('chart_spec', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('visualizations') as batch_op:
+        batch_op.drop_column('chart_spec')
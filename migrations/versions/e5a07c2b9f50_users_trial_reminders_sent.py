@@ -0,0 +1,40 @@
+"""Trial reminder milestones: users.trial_reminders_sent and the trial_expiry_date index
+
+Revision ID: e5a07c2b9f50
+Revises: c81d5f3e6a41
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a07c2b9f50'
+down_revision = 'c81d5f3e6a41'
+branch_labels = None
+depends_on = None
+
+
+def _missing(table, column):
+    """True when `table` exists without `column`; databases built by db.create_all() already have it."""
+    inspector = sa.inspect(op.get_bind())
+    return inspector.has_table(table) and column not in {c['name'] for c in inspector.get_columns(table)}
+
+
+def upgrade():
+    if not sa.inspect(op.get_bind()).has_table('users'):
+        return
+    indexes = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('users')}
+    with op.batch_alter_table('users') as batch_op:
+        if _missing('users', 'trial_reminders_sent'):
+            # server_default fills the existing rows, so the NOT NULL column can be added in place
+            batch_op.add_column(sa.Column('trial_reminders_sent', sa.Integer(), nullable=False, server_default='0'))
+        if 'ix_users_trial_expiry_date' not in indexes:
+            batch_op.create_index('ix_users_trial_expiry_date', ['trial_expiry_date'])
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_index('ix_users_trial_expiry_date')
+        batch_op.drop_column('trial_reminders_sent')
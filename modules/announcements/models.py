@@ -1,11 +1,12 @@
 from datetime import datetime
 from inventory_system import db
+from modules.utils.query_helpers import detail_column
 
 class Announcement(db.Model):
     __tablename__ = 'announcements'
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(150), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    content = detail_column(db.Column(db.Text, nullable=False))  # Deferred: loaded by pages that show it
     type = db.Column(db.String(50), nullable=False)
     visibility = db.Column(db.String(50), nullable=False, default="everyone")
     created_at = db.Column(db.DateTime, default=datetime.now)
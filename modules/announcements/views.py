@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_required, current_user
 from inventory_system import db
 from modules.announcements.models import Announcement
+from modules.utils.query_helpers import with_details
 
 announcements_bp = Blueprint('announcements', __name__, template_folder='templates/announcements')
 
@@ -10,7 +11,7 @@ announcements_bp = Blueprint('announcements', __name__, template_folder='templat
 @login_required
 def list_announcements():
     """Display a list of all announcements."""
-    announcements = Announcement.query.order_by(Announcement.created_at.desc()).all()
+    announcements = with_details(Announcement.query).order_by(Announcement.created_at.desc()).all()
     return render_template('list_announcements.html', announcements=announcements)
 
 
@@ -38,7 +39,7 @@ def create_announcement():
 @login_required
 def edit_announcement(announcement_id):
     """Edit an announcement."""
-    announcement = Announcement.query.get_or_404(announcement_id)
+    announcement = with_details(Announcement.query).get_or_404(announcement_id)
     if request.method == 'POST':
         announcement.title = request.form.get('title')
         announcement.content = request.form.get('content')
@@ -14,6 +14,7 @@ class Business(db.Model):
     email = db.Column(db.String(120))
     website = db.Column(db.String(120))
     logo_path = db.Column(db.String(200))
+    report_storage_quota_mb = db.Column(db.Integer, nullable=True)  # Overrides REPORT_STORAGE_QUOTA_MB when set
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
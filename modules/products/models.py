@@ -9,6 +9,7 @@ from inventory_system import db
 from datetime import datetime
 import uuid
 from inventory_system import db
+from modules.utils.query_helpers import detail_column, with_details
 
 class InventoryMovement(db.Model):
     __tablename__ = 'inventory_movements'
@@ -18,7 +19,7 @@ class InventoryMovement(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     quantity = db.Column(db.Integer, nullable=False)
     movement_type = db.Column(db.String(50), nullable=False)  # 'stock_add', 'stock_remove', 'initial_stock', etc.
-    notes = db.Column(db.Text)
+    notes = detail_column(db.Column(db.Text))  # Deferred: not needed when movements are aggregated or listed
     created_at = db.Column(db.DateTime, default=datetime.now)
 
     # Relationships
@@ -33,7 +34,7 @@ class Product(db.Model):
 
     product_id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))  # UUID as primary key
     name = db.Column(db.String(255), nullable=False)
-    description = db.Column(db.Text, nullable=True)
+    description = detail_column(db.Column(db.Text, nullable=True))  # Deferred: loaded by pages that show it
     price = db.Column(db.Numeric(10, 2), nullable=False)  # Sales price
     cost_price = db.Column(db.Numeric(10, 2), nullable=False)  # COGS
     quantity_in_stock = db.Column(db.Integer, nullable=False, default=0)
@@ -98,7 +99,7 @@ class Product(db.Model):
     @classmethod
     def get_user_products(cls, user_id=None):
         user_id = user_id or current_user.id
-        products = cls.query.filter_by(user_id=user_id).all()
+        products = with_details(cls.query).filter_by(user_id=user_id).all()
         print("Products fetched:", [p.to_dict() for p in products])
         return products
 
@@ -49,4 +49,16 @@ def test_create_invalid_product(test_client):
     response = test_client.post('/api/products/', json=invalid_product)
     assert response.status_code == 400
     # Rollback after failed transaction
-    db.session.rollback()
\ No newline at end of file
+    db.session.rollback()
+
+
+def test_product_description_deferred(test_client):
+    """
+    Test case for deferred loading of product descriptions.
+    Verifies plain queries leave the description out of the SELECT and with_details() loads it.
+    """
+    from modules.products.models import Product
+    from modules.utils.query_helpers import with_details
+
+    assert 'description' not in str(Product.query.statement)
+    assert 'description' in str(with_details(Product.query).statement)
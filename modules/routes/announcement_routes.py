@@ -1,11 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file
 from flask_login import login_required, current_user
 from datetime import datetime
-import pdfkit
-import io
 from inventory_system import db
 from modules.announcements.models import Announcement
+from modules.routes.pdf_jobs_routes import start_pdf_job
 from modules.users.decorators import role_required
+from modules.utils.query_helpers import with_details
 
 # Create the blueprint for announcements
 announcements_bp = Blueprint('announcements', __name__, template_folder='templates/announcements')
@@ -16,7 +16,8 @@ announcements_bp = Blueprint('announcements', __name__, template_folder='templat
 @role_required('admin', 'staff')
 def list_announcements():
     """Display all announcements, sorted by creation date."""
-    announcements = Announcement.query.order_by(Announcement.created_at.desc()).all()
+    # The list shows each announcement's text (preview and modal), so load it in the same query
+    announcements = with_details(Announcement.query).order_by(Announcement.created_at.desc()).all()
     return render_template('list_announcements.html', announcements=announcements)
 
 
@@ -51,7 +52,7 @@ def create_announcement():
 @role_required('admin', 'staff')
 def edit_announcement(announcement_id):
     """Route to edit an existing announcement."""
-    announcement = Announcement.query.get_or_404(announcement_id)
+    announcement = with_details(Announcement.query).get_or_404(announcement_id)
     if announcement.created_by != current_user.id:
         flash("You do not have permission to edit this announcement.", "danger")
         return redirect(url_for('announcements.list_announcements'))
@@ -102,7 +103,7 @@ def delete_announcement(announcement_id):
 def download_announcement(announcement_id):
     """Route to download an announcement as a PDF."""
     try:
-        announcement = Announcement.query.get_or_404(announcement_id)
+        announcement = with_details(Announcement.query).get_or_404(announcement_id)
         if announcement.visibility != 'everyone' and announcement.created_by != current_user.id:
             flash("You do not have permission to download this announcement.", "danger")
             return redirect(url_for('announcements.list_announcements'))
@@ -110,7 +111,8 @@ def download_announcement(announcement_id):
         html_content = render_template(
             'announcement_pdf.html',
             announcement=announcement,
-            now=datetime.now()
+            # Part of the hashed PDF content: a stable time lets repeat downloads reuse the cached render
+            revised_at=announcement.updated_at or announcement.created_at
         )
 
         options = {
@@ -124,22 +126,14 @@ def download_announcement(announcement_id):
             'no-outline': None
         }
 
-        try:
-            pdf = pdfkit.from_string(html_content, False, options=options)
-        except Exception as e:
-            print(f"PDF generation error: {str(e)}")
-            flash("Error generating PDF. Please ensure wkhtmltopdf is installed.", "danger")
-            return redirect(url_for('announcements.list_announcements'))
-
-        response = send_file(
-            io.BytesIO(pdf),
-            mimetype='application/pdf',
-            as_attachment=True,
-            download_name=f"Announcement_{announcement.id}_{datetime.now().strftime('%Y%m%d')}.pdf"
+        # Rendered by the background PDF pool; the response points at the job
+        return start_pdf_job(
+            html_content,
+            options,
+            f"Announcement_{announcement.id}_{datetime.now().strftime('%Y%m%d')}.pdf",
+            back_url=url_for('announcements.list_announcements')
         )
 
-        return response
-
     except Exception as e:
         print(f"Error generating PDF: {str(e)}")
         flash("Error generating PDF. Please try again.", "danger")
@@ -0,0 +1,57 @@
+from flask import Blueprint, abort, jsonify, render_template, request, send_file, url_for
+from flask_login import current_user, login_required
+from modules.utils.pdf_service import PdfQueueFull, pdf_service
+
+pdf_jobs_bp = Blueprint('pdf_jobs', __name__)
+
+
+def start_pdf_job(html_content, options, download_name, back_url):
+    """
+    Queue a PDF render for the current user and answer with the job instead of the file:
+    JSON (202 with a status URL) for scripts, a page that waits for the download otherwise.
+    A PDF that is already cached is sent straight to the download.
+    """
+    wants_json = request.accept_mimetypes.best == 'application/json' or \
+        request.headers.get('X-Requested-With') == 'XMLHttpRequest'
+    try:
+        job_id = pdf_service.submit(html_content, options, current_user.id, download_name)
+    except PdfQueueFull as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 503
+        return render_template('pdf_job.html', job_id=None, error=str(e), back_url=back_url), 503
+
+    status_url = url_for('pdf_jobs.job_status', job_id=job_id)
+    download_url = url_for('pdf_jobs.download', job_id=job_id)
+    if wants_json:
+        status = pdf_service.status(job_id, current_user.id)
+        return jsonify({'job_id': job_id, 'status': status['status'], 'status_url': status_url,
+                        'download_url': download_url}), 202
+    if pdf_service.status(job_id, current_user.id)['status'] == 'done':
+        return send_file(pdf_service.cached_path(job_id), as_attachment=True,
+                         download_name=download_name, mimetype='application/pdf')
+    return render_template('pdf_job.html', job_id=job_id, status_url=status_url,
+                           download_url=download_url, back_url=back_url, error=None), 202
+
+
+@pdf_jobs_bp.route('/<job_id>')
+@login_required
+def job_status(job_id):
+    """Status of a PDF job: queued, running, done or failed."""
+    status = pdf_service.status(job_id, current_user.id)
+    if status is None:
+        return jsonify({'error': 'Unknown PDF job'}), 404
+    payload = {'job_id': job_id, 'status': status['status'], 'error': status['error']}
+    if status['status'] == 'done':
+        payload['download_url'] = url_for('pdf_jobs.download', job_id=job_id)
+    return jsonify(payload)
+
+
+@pdf_jobs_bp.route('/<job_id>/download')
+@login_required
+def download(job_id):
+    """Send a finished PDF from the render cache."""
+    status = pdf_service.status(job_id, current_user.id)
+    if status is None or status['status'] != 'done' or not pdf_service.cached_path(job_id):
+        abort(404)
+    return send_file(pdf_service.cached_path(job_id), as_attachment=True,
+                     download_name=status['download_name'], mimetype='application/pdf')
@@ -5,6 +5,7 @@ from modules.suppliers.models import Supplier
 from modules.inventory.models import Inventory
 from inventory_system import db
 from modules.users.decorators import role_required
+from modules.utils.query_helpers import with_details
 
 products_bp = Blueprint('products', __name__)
 
@@ -12,11 +13,11 @@ products_bp = Blueprint('products', __name__)
 @login_required
 def render_product_list():
     if current_user.role == 'admin' or current_user.role == 'owner':
-        # Admins and owners see their own products
-        products = Product.query.filter_by(user_id=current_user.id).all()
+        # Admins and owners see their own products (the table shows descriptions, so load them too)
+        products = with_details(Product.query).filter_by(user_id=current_user.id).all()
     elif current_user.role == 'staff':
         # Staff see products belonging to their parent admin/owner
-        products = Product.query.filter_by(user_id=current_user.parent_id).all()
+        products = with_details(Product.query).filter_by(user_id=current_user.parent_id).all()
     else:
         products = []  # Default to empty if the role is not recognized
 
@@ -26,7 +27,7 @@ def render_product_list():
 @login_required
 @role_required('admin', 'staff')
 def product_details(product_id):
-    product = Product.query.get_or_404(product_id)
+    product = with_details(Product.query).get_or_404(product_id)
     # Ensure user can only view their products
     if product.user_id != current_user.id and product.user_id != current_user.parent_id:
         flash("You do not have access to this product.", "error")
@@ -150,7 +151,7 @@ def product_create():
 @login_required
 @role_required('admin', 'staff')
 def product_edit(product_id):
-    product = Product.query.get_or_404(product_id)
+    product = with_details(Product.query).get_or_404(product_id)
 
     # Ensure user can only edit their products
     if product.user_id != current_user.id and product.user_id != current_user.parent_id:
@@ -206,7 +207,7 @@ def delete_product(product_id):
 @role_required('admin', 'staff')
 def product_search():
     name = request.args.get('name')
-    query = Product.query
+    query = with_details(Product.query)
 
     if name:
         query = query.filter(Product.name.ilike(f'%{name}%'))
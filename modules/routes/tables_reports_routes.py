@@ -1,4 +1,4 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, current_app
+from flask import Blueprint, render_template, request, redirect, url_for, flash, send_file, current_app, jsonify, Response, stream_with_context
 from flask_login import current_user, login_required
 from modules.sales.models import Sale, SaleItem
 from modules.business.models import Business
@@ -10,23 +10,50 @@ from modules.expenses.models import Expense, Category
 from modules.accounts_receivable.models import AccountsReceivable
 from modules.suppliers.models import AccountsPayable
 from modules.tables_reports.models import ReportHistory
+from modules.tables_reports.report_storage import store_report_file, enforce_retention, send_report_file
 from modules.tables_reports.report_helpers import fetch_returned_damaged_data
-from modules.tables_reports.pdf_generator import generate_pdf
+from modules.tables_reports.dashboard_metrics import get_dashboard_metrics
+from modules.tables_reports.turnover import get_inventory_turnover
+from modules.tables_reports.aging import get_aging_summary, get_aging_items, AGING_BUCKETS
+from modules.tables_reports.cash_flow import project_cash_flow, DEFAULT_WEEKS
+from modules.tables_reports.rollups import get_rollup_status, refresh_rollups
+from modules.tables_reports.comparisons import get_period_comparison, COMPARISON_METRICS
+from modules.tables_reports.vat import get_vat_summary, stream_vat_lines, quarter_bounds, VAT_LINE_COLUMNS
+from modules.tables_reports.leaderboards import get_leaderboard, DEFAULT_LIMIT
+from modules.tables_reports.sketch_metrics import get_approximate_metrics
+from modules.tables_reports.heatmap import get_sales_heatmap
+from modules.tables_reports.live_dashboard import dashboard_bus, get_live_metrics, stream_live_metrics
+from modules.tables_reports.pdf_generator import render_report_pdf
 from modules.users.decorators import role_required
-from modules.tables_reports.excel_exporter import export_to_excel
-from modules.tables_reports.email_service import send_report_email
+from modules.tables_reports.excel_exporter import export_report_to_excel
+from modules.tables_reports.email_service import send_report_email as email_report_file
 from modules.tables_reports.report_helpers import (
     calculate_inventory_turnover, calculate_profit_margin,
      fetch_receivables_data,fetch_expenses_data,
-    fetch_data_for_report, calculate_profit_and_loss
+    calculate_profit_and_loss
 )
 from datetime import datetime, timedelta
 from inventory_system import db
+import csv
+import io
 import os
 
 tables_reports_bp = Blueprint('tables_reports', __name__)
 
 
+def _aging_bucket_arg():
+    """Return the aging bucket requested in the query string, ignoring unknown values."""
+    bucket = request.args.get('bucket')
+    return bucket if bucket in [key for key, _, _ in AGING_BUCKETS] else None
+
+
+def _current_tenant_id():
+    """Return the tenant (admin) id for the logged-in user; staff see their admin's data."""
+    if current_user.role == 'staff' and current_user.parent_id:
+        return current_user.parent_id
+    return current_user.id
+
+
 @tables_reports_bp.route('/dashboard')
 @login_required
 @role_required('admin')
@@ -38,34 +65,107 @@ def reports_dashboard():
     start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
     end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
 
-    monthly_revenue = db.session.query(db.func.sum(Sale.total_price)).filter(
-        Sale.user_id == current_user.id,
-        Sale.sale_date >= datetime.now().replace(day=1)
-    ).scalar() or 0
+    # All tiles come from one cached query
+    metrics = get_dashboard_metrics(current_user.id, start_date, end_date)
+    turnover = get_inventory_turnover(current_user.id, start_date, end_date)
 
-    inventory_turnover = calculate_inventory_turnover(current_user.id)
+    return render_template('Report_dashboard.html',
+                           monthly_revenue=metrics['monthly_revenue'],
+                           inventory_turnover=turnover['overall_turnover'],
+                           top_movers=turnover['top_movers'],
+                           bottom_movers=turnover['bottom_movers'],
+                           pending_receivables=metrics['pending_receivables'],
+                           profit_margin=metrics['profit_margin'],
+                           start_date=start_date_str,
+                           end_date=end_date_str)
 
-    # Fetch pending receivables
-    pending_receivables = db.session.query(db.func.sum(AccountsReceivable.amount_due)).filter(
-        AccountsReceivable.user_id == current_user.id,
-        AccountsReceivable.status != 'paid'
-    ).scalar() or 0
 
-    # Log the fetched pending receivables
-    print("Fetched pending receivables:", pending_receivables)
+@tables_reports_bp.route('/dashboard/metrics')
+@login_required
+def dashboard_metrics():
+    """Return the dashboard KPI tiles for the current tenant as JSON."""
+    try:
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
 
-    # Convert pending receivables to float for display purposes
-    pending_receivables = float(pending_receivables) if pending_receivables else 0.0
+    return jsonify(get_dashboard_metrics(_current_tenant_id(), start_date, end_date))
 
-    profit_margin = calculate_profit_margin(current_user.id, start_date, end_date)
 
-    return render_template('Report_dashboard.html',
-                           monthly_revenue=monthly_revenue,
-                           inventory_turnover=inventory_turnover,
-                           pending_receivables=pending_receivables,
-                           profit_margin=profit_margin,
-                           start_date=start_date_str,
-                           end_date=end_date_str)
+@tables_reports_bp.route('/dashboard/approximate_metrics')
+@login_required
+def approximate_metrics():
+    """Return sketch-based distinct customers and ticket/basket percentiles for a window as JSON."""
+    try:
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+
+    return jsonify(get_approximate_metrics(_current_tenant_id(), start_date, end_date))
+
+
+@tables_reports_bp.route('/dashboard/heatmap')
+@login_required
+def sales_heatmap():
+    """Return the day-of-week by hour-of-day sales heatmap (7 x 24 arrays) as JSON."""
+    return jsonify(get_sales_heatmap(_current_tenant_id()))
+
+
+@tables_reports_bp.route('/dashboard/live')
+@login_required
+def live_dashboard():
+    """
+    Stream today's revenue, units sold and low-stock count as Server-Sent Events. Each stream holds a
+    worker thread, so past LIVE_DASHBOARD_MAX_STREAMS per process the client is sent to the snapshot endpoint.
+    """
+    if not dashboard_bus.reserve_stream(current_app.config.get('LIVE_DASHBOARD_MAX_STREAMS', 8)):
+        return jsonify({'error': 'Too many live dashboards open, poll the snapshot instead',
+                        'snapshot_url': url_for('tables_reports.live_dashboard_snapshot')}), 503
+    stream = stream_live_metrics(
+        _current_tenant_id(),
+        interval=current_app.config.get('LIVE_DASHBOARD_INTERVAL', 2),
+        heartbeat=current_app.config.get('LIVE_DASHBOARD_HEARTBEAT', 15),
+        max_duration=current_app.config.get('LIVE_DASHBOARD_MAX_SECONDS', 300),
+        poll=current_app.config.get('LIVE_DASHBOARD_POLL_SECONDS', 10),
+    )
+    response = Response(stream_with_context(stream), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    response.call_on_close(dashboard_bus.release_stream)
+    return response
+
+
+@tables_reports_bp.route('/dashboard/live/snapshot')
+@login_required
+def live_dashboard_snapshot():
+    """Return the live tiles as JSON; polled by dashboards that could not open a stream."""
+    return jsonify(get_live_metrics(_current_tenant_id()))
+
+
+@tables_reports_bp.route('/rollups/status')
+@login_required
+def rollup_status():
+    """Return when the tenant's daily rollups were last refreshed and how many days are pending."""
+    return jsonify(get_rollup_status(_current_tenant_id()))
+
+
+@tables_reports_bp.route('/rollups/refresh', methods=['POST'])
+@login_required
+@role_required('admin')
+def refresh_tenant_rollups():
+    """Fold the tenant's pending dirty days into its rollups now instead of waiting for the scheduler."""
+    try:
+        refreshed = refresh_rollups(_current_tenant_id())
+        return jsonify({'days_refreshed': sum(refreshed.values()), **get_rollup_status(_current_tenant_id())})
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f"Error refreshing report rollups: {str(e)}")
+        return jsonify({'error': 'Could not refresh report rollups'}), 500
 
 
 @tables_reports_bp.route('/sales_report')
@@ -153,17 +253,20 @@ def accounts_receivable_report():
 
     start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
     end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
+    bucket = _aging_bucket_arg()
+    page = request.args.get('page', 1, type=int)
 
-    # Fetch the receivables data with optional date filtering
-    receivables_data = fetch_receivables_data(current_user.id, start_date, end_date)
-
-    # Calculate total outstanding
-    total_outstanding = sum(receivable.amount_due for receivable in receivables_data)
+    # Aging summary from one grouped query; detail rows are paginated
+    aging = get_aging_summary('receivables', current_user.id)
+    pagination = get_aging_items('receivables', current_user.id, bucket, start_date, end_date, page=page)
 
     return render_template(
         'accounts_receivable_report.html',
-        receivables_data=receivables_data,
-        total_outstanding=total_outstanding,
+        receivables_data=pagination.items,
+        pagination=pagination,
+        aging=aging,
+        bucket=bucket,
+        total_outstanding=aging['total_outstanding'],
         start_date=start_date_str,
         end_date=end_date_str
     )
@@ -260,32 +363,29 @@ def accounts_payable_report():
     end_date_str = request.args.get('end_date')
     start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
     end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
+    bucket = _aging_bucket_arg()
+    page = request.args.get('page', 1, type=int)
 
-    # Fetch accounts payable data for the specified user and date range
-    payables_data = AccountsPayable.query.filter(
-        AccountsPayable.supplier.has(user_id=current_user.id)
-    )
-
-    if start_date:
-        payables_data = payables_data.filter(AccountsPayable.due_date >= start_date)
-    if end_date:
-        payables_data = payables_data.filter(AccountsPayable.due_date <= end_date)
-
-    # Retrieve all results and calculate the outstanding total
-    payables_data = payables_data.all()
-    total_outstanding = sum(item.amount_due for item in payables_data if item.status == 'unpaid')
+    # Aging summary from one grouped query; detail rows are paginated
+    aging = get_aging_summary('payables', current_user.id)
+    pagination = get_aging_items('payables', current_user.id, bucket, start_date, end_date, page=page)
 
     # Define and pass accounts_payable_data to the template
     accounts_payable_data = {
-        'total_outstanding': total_outstanding,
-        'transactions': payables_data
+        'total_outstanding': aging['total_outstanding'],
+        'transactions': pagination.items
     }
 
     return render_template(
         'accounts_payable_report.html',
         accounts_payable_data=accounts_payable_data,
+        pagination=pagination,
+        aging=aging,
+        bucket=bucket,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        start_date_str=start_date_str,
+        end_date_str=end_date_str
     )
 
 @tables_reports_bp.route('/history')
@@ -305,8 +405,11 @@ def download_report(report_id):
     if report.user_id != current_user.id:
         flash("You do not have permission to access this report.", "danger")
         return redirect(url_for('tables_reports.report_history'))
+    if report.status == 'expired':
+        flash("This report has expired from storage. Please generate it again.", "warning")
+        return redirect(url_for('tables_reports.report_history'))
     if os.path.exists(report.file_path):
-        return send_file(report.file_path, as_attachment=True)
+        return send_report_file(report)
     flash("Report file not found.", "danger")
     return redirect(url_for('tables_reports.report_history'))
 
@@ -322,36 +425,36 @@ def generate_report(report_type, format):
     start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
     end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
 
-    try:
-        # Fetch data for the report using the provided date range
-        data = fetch_data_for_report(report_type, current_user.id, start_date, end_date)
-    except Exception as e:
-        flash(f"Error fetching data for report: {e}", "danger")
+    if format not in ('pdf', 'excel'):
+        flash("Invalid format specified.", "danger")
         return redirect(url_for('tables_reports.reports_dashboard'))
 
     try:
-        # Generate the report in the specified format (PDF or Excel)
+        # Generate the report in the specified format; both stream rows straight from the database cursor
         if format == 'pdf':
-            file_path = generate_pdf(report_type, data)
-        elif format == 'excel':
-            file_path = export_to_excel(report_type, data)
+            file_path = render_report_pdf(report_type, current_user.id, start_date, end_date)
         else:
-            flash("Invalid format specified.", "danger")
-            return redirect(url_for('tables_reports.reports_dashboard'))
+            file_path = export_report_to_excel(report_type, current_user.id, start_date, end_date)
     except Exception as e:
         flash(f"Error generating {format.upper()} file for {report_type} report: {e}", "danger")
         return redirect(url_for('tables_reports.reports_dashboard'))
 
+    # Move the file into content-addressed storage; identical outputs share one stored file
+    artifact = store_report_file(current_user.id, file_path)
+    db.session.flush()
+
     # Save the generated report to the database
     new_report = ReportHistory(
         report_type=report_type,
-        file_path=file_path,
+        file_path=artifact.file_path,
         format=format,
         status='completed',
         generated_at=datetime.now(),
-        user_id=current_user.id
+        user_id=current_user.id,
+        artifact=artifact
     )
     db.session.add(new_report)
+    enforce_retention(current_user.id, keep_artifact_id=artifact.id)
     db.session.commit()
 
     flash(f"{report_type.capitalize()} report generated successfully.", "success")
@@ -371,15 +474,219 @@ def send_report_email(report_id):
         flash("Please provide an email address.", "danger")
         return redirect(url_for('tables_reports.report_history'))
 
-    success = send_report_email(report.report_type, report.file_path, recipient_email)
+    success = email_report_file(report.report_type, report.file_path, recipient_email)
     if success:
-        flash(f"Report sent to {recipient_email} successfully.", "success")
+        flash(f"Report queued for delivery to {recipient_email}.", "success")
     else:
         flash("Failed to send the report.", "danger")
 
     return redirect(url_for('tables_reports.report_history'))
 
 
+@tables_reports_bp.route('/inventory_turnover')
+@login_required
+def inventory_turnover_report():
+    """Render turnover, days of inventory and sell-through per product and supplier."""
+    try:
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
+
+        turnover = get_inventory_turnover(_current_tenant_id(), start_date, end_date)
+
+        return render_template('inventory_turnover_report.html', turnover=turnover, datetime=datetime)
+
+    except Exception as e:
+        current_app.logger.error(f"Error generating inventory turnover report: {str(e)}")
+        flash('Error generating inventory turnover report. Please try again.', 'danger')
+        return redirect(url_for('tables_reports.reports_dashboard'))
+
+
+@tables_reports_bp.route('/inventory_turnover/data')
+@login_required
+def inventory_turnover_data():
+    """Return per-product and per-supplier turnover for a window as JSON."""
+    try:
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+
+    return jsonify(get_inventory_turnover(_current_tenant_id(), start_date, end_date))
+
+
+def _comparison_args():
+    """Read the comparison period and optional reference date; raises ValueError on a bad date."""
+    period = request.args.get('period', 'monthly')
+    reference_str = request.args.get('reference_date')
+    reference = datetime.strptime(reference_str, '%Y-%m-%d') if reference_str else None
+    return period, reference
+
+
+@tables_reports_bp.route('/compare/<string:report_type>')
+@login_required
+def period_comparison_report(report_type):
+    """Render current vs prior period and year-ago figures for the sales, expenses or P&L report."""
+    if report_type not in COMPARISON_METRICS:
+        flash('Unknown comparison report.', 'danger')
+        return redirect(url_for('tables_reports.reports_dashboard'))
+    try:
+        period, reference = _comparison_args()
+        comparison = get_period_comparison(_current_tenant_id(), report_type, period, reference)
+        return render_template('period_comparison_report.html', comparison=comparison, datetime=datetime)
+
+    except Exception as e:
+        current_app.logger.error(f"Error generating period comparison: {str(e)}")
+        flash('Error generating period comparison. Please try again.', 'danger')
+        return redirect(url_for('tables_reports.reports_dashboard'))
+
+
+@tables_reports_bp.route('/compare/<string:report_type>/data')
+@login_required
+def period_comparison_data(report_type):
+    """Return a period-over-period comparison as JSON."""
+    if report_type not in COMPARISON_METRICS:
+        return jsonify({'error': f'Unknown comparison report: {report_type}'}), 404
+    try:
+        period, reference = _comparison_args()
+    except ValueError:
+        return jsonify({'error': 'Dates must use the YYYY-MM-DD format'}), 400
+
+    return jsonify(get_period_comparison(_current_tenant_id(), report_type, period, reference))
+
+
+@tables_reports_bp.route('/leaderboards/<string:board>')
+@login_required
+def leaderboard(board):
+    """Return the top N products, customers or staff for a window as JSON, with an "Others" remainder."""
+    try:
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
+        return jsonify(get_leaderboard(
+            _current_tenant_id(), board,
+            metric=request.args.get('metric'),
+            limit=request.args.get('limit', DEFAULT_LIMIT, type=int),
+            start_date=start_date,
+            end_date=end_date
+        ))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+@tables_reports_bp.route('/vat_report')
+@login_required
+@role_required('admin')
+def vat_report():
+    """Render output and input VAT per month and quarter for a year."""
+    try:
+        year = request.args.get('year', datetime.now().year, type=int)
+        summary = get_vat_summary(_current_tenant_id(), year)
+        return render_template('vat_report.html', summary=summary, datetime=datetime)
+
+    except Exception as e:
+        current_app.logger.error(f"Error generating VAT report: {str(e)}")
+        flash('Error generating VAT report. Please try again.', 'danger')
+        return redirect(url_for('tables_reports.reports_dashboard'))
+
+
+@tables_reports_bp.route('/vat_report/data')
+@login_required
+@role_required('admin')
+def vat_report_data():
+    """Return the monthly and quarterly VAT summary for a year as JSON."""
+    year = request.args.get('year', datetime.now().year, type=int)
+    return jsonify(get_vat_summary(_current_tenant_id(), year))
+
+
+@tables_reports_bp.route('/vat_report/export')
+@login_required
+@role_required('admin')
+def export_vat_lines():
+    """Stream the sale items and expenses behind a VAT quarter (or date range) as CSV."""
+    try:
+        year = request.args.get('year', datetime.now().year, type=int)
+        quarter = request.args.get('quarter', type=int)
+        if quarter:
+            if quarter not in (1, 2, 3, 4):
+                raise ValueError(f"Unknown quarter: {quarter}")
+            start_date, end_date = quarter_bounds(year, quarter)
+        else:
+            start_date = datetime.strptime(request.args.get('start_date', f'{year}-01-01'), '%Y-%m-%d')
+            end_date = datetime.strptime(request.args.get('end_date', f'{year}-12-31'), '%Y-%m-%d')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    tenant_id = _current_tenant_id()
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(VAT_LINE_COLUMNS)
+        for line in stream_vat_lines(tenant_id, start_date, end_date):
+            writer.writerow([
+                line['source'],
+                line['reference'] or '',
+                line['line_date'].strftime('%Y-%m-%d') if line['line_date'] else '',
+                line['description'] or '',
+                *('%.2f' % float(line[column]) for column in ('net_amount', 'vat_amount', 'gross_amount')),
+            ])
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    filename = f"vat_lines_{start_date:%Y%m%d}_{end_date:%Y%m%d}.csv"
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+
+def _cash_flow_args():
+    """Read projection horizon and scenario toggles from the query string; raises ValueError on bad input."""
+    granularity = request.args.get('granularity', 'weekly')
+    if granularity not in ('weekly', 'daily'):
+        raise ValueError(f"Unknown granularity: {granularity}")
+    return {
+        'weeks': int(request.args.get('weeks', DEFAULT_WEEKS)),
+        'granularity': granularity,
+        'opening_balance': float(request.args.get('opening_balance') or 0),
+        'receivable_delay_days': int(request.args.get('receivable_delay') or 0),
+        'payable_delay_days': int(request.args.get('payable_delay') or 0),
+        'include_recurring': request.args.get('include_recurring', '1') not in ('0', 'false', 'off'),
+    }
+
+
+@tables_reports_bp.route('/cash_flow_projection')
+@login_required
+def cash_flow_projection():
+    """Render projected inflows, outflows and running cash balance for the coming weeks."""
+    try:
+        projection = project_cash_flow(_current_tenant_id(), **_cash_flow_args())
+        return render_template('cash_flow_projection.html', projection=projection, datetime=datetime)
+
+    except Exception as e:
+        current_app.logger.error(f"Error generating cash flow projection: {str(e)}")
+        flash('Error generating cash flow projection. Please try again.', 'danger')
+        return redirect(url_for('tables_reports.reports_dashboard'))
+
+
+@tables_reports_bp.route('/cash_flow_projection/data')
+@login_required
+def cash_flow_projection_data():
+    """Return the cash flow projection for the requested horizon and scenario as JSON."""
+    try:
+        args = _cash_flow_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify(project_cash_flow(_current_tenant_id(), **args))
+
+
 @tables_reports_bp.route('/inventory_report')
 @login_required
 def inventory_report():
@@ -469,12 +776,16 @@ def returned_damaged_report():
     start_date = datetime.strptime(start_date_str, '%Y-%m-%d') if start_date_str else None
     end_date = datetime.strptime(end_date_str, '%Y-%m-%d') if end_date_str else None
 
+    page = request.args.get('page', 1, type=int)
+
     # Fetch returned and damaged items data
-    returned_damaged_data = fetch_returned_damaged_data(current_user.id, start_date, end_date)
+    returned_damaged_data = fetch_returned_damaged_data(current_user.id, start_date, end_date, page=page)
 
     return render_template(
         'returned_damaged_report.html',
         returned_damaged_data=returned_damaged_data,
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        start_date_str=start_date_str,
+        end_date_str=end_date_str
     )
@@ -14,9 +14,11 @@ from modules.suppliers.models import Supplier
 from modules.expenses.models import Expense
 from datetime import timedelta, datetime, timezone
 from modules.ReturnedDamagedItem.models import ReturnedDamagedItem
+from modules.tables_reports.dashboard_metrics import get_dashboard_metrics
 import stripe
 from modules.users.models import User, SubscriptionStatus,  SubscriptionPlan, PaymentProvider
 from modules.utils.email_automation import email_automation
+from modules.users.trial_reminders import queue_trial_reminders
 from modules.demo.demo_helpers import is_demo_mode, get_demo_stats, get_demo_data
 
 
@@ -220,21 +222,8 @@ def user_delete(user_id):
 def send_trial_reminders():
     """Admin-only route to trigger sending trial expiry reminders."""
     try:
-        users = User.query.filter(
-            User.trial_expiry_date.isnot(None),
-            User.trial_expiry_date > get_utc_now(),
-            User.notification_sent.is_(False)
-        ).all()
-
-        for user in users:
-            if user.is_trial_active():
-                days_remaining = user.get_trial_days_remaining()
-                if days_remaining <= 7:  # Send reminder for last 7 days
-                    email_automation.send_trial_expiry_reminder(user, days_remaining)
-                    user.notification_sent = True
-                    db.session.commit()
-
-        flash('Trial reminders sent successfully!', 'success')
+        queued = queue_trial_reminders()
+        flash(f'{sum(queued.values())} trial reminder(s) queued successfully!', 'success')
     except Exception as e:
         flash(f'Error sending reminders: {str(e)}', 'danger')
 
@@ -275,28 +264,8 @@ def personal_dashboard():
         trial_status = admin_user.get_trial_status()
         days_remaining = admin_user.get_trial_days_remaining() if admin_user.is_trial_active() else 0
 
-        # Fetch business metrics with UTC time handling
-        start_of_month = get_utc_now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        metrics = {
-            'product_count': Product.query.filter_by(user_id=admin_user.id).count(),
-            'low_inventory_count': Inventory.query.filter(
-                Inventory.user_id == admin_user.id,
-                Inventory.stock_quantity <= Inventory.reorder_threshold
-            ).count(),
-            'supplier_count': Supplier.query.filter_by(user_id=admin_user.id).count(),
-            'inventory_count': Inventory.query.filter_by(user_id=admin_user.id).count(),
-            'total_expenses': Expense.query.filter(
-                Expense.user_id == admin_user.id,
-                Expense.date_incurred >= start_of_month
-            ).with_entities(db.func.sum(Expense.amount)).scalar() or 0,
-            'accounts_receivable_count': AccountsReceivable.query.filter(
-                AccountsReceivable.user_id == admin_user.id,
-                AccountsReceivable.due_date <= (get_utc_now() + timedelta(days=7)),
-                AccountsReceivable.status != 'paid'
-            ).count(),
-            'returned_damaged_count': ReturnedDamagedItem.query.filter_by(user_id=admin_user.id).count(),
-        }
+        # Fetch all business metrics in one cached query
+        metrics = get_dashboard_metrics(admin_user.id)
 
     subscription_plans = {
         'monthly': {
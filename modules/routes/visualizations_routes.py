@@ -3,18 +3,15 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from modules.users.decorators import role_required
 from modules.business.models import Business
 from inventory_system import db
-import time
-import pdfkit
+import hashlib
+import json
 from modules.visualizations.models import Visualization
-from modules.tables_reports.report_helpers import (
-    fetch_data_for_report,
-    format_data_for_visualization,
-
-)
+from modules.tables_reports.chart_series import get_chart_series
 from modules.visualizations.views import create_visualization, get_chart_settings
-from modules.visualizations.pdf_helper import generate_pdf
-import os
+from modules.routes.pdf_jobs_routes import start_pdf_job
+from modules.utils.query_helpers import with_details
 from datetime import datetime
+from pathlib import Path
 
 visualizations_bp = Blueprint('visualizations', __name__, template_folder='templates/visualizations')
 
@@ -81,6 +78,7 @@ def handle_preview_request():
         chart_type = request.form.get('chart_type')
         start_date = request.form.get('start_date')
         end_date = request.form.get('end_date')
+        time_period = request.form.get('time_period', 'daily')
 
         print(f"\nHandling preview request:")
         print(f"Report type: {report_type}")
@@ -104,13 +102,9 @@ def handle_preview_request():
                 'error': 'Invalid date format'
             })
 
-        # Fetch and format data
-        print("Fetching raw data...")
-        raw_data = fetch_data_for_report(report_type, current_user.id, start_date, end_date)
-        print(f"Raw data received: {raw_data}")
-
-        print("Formatting data...")
-        formatted_data = format_data_for_visualization(report_type, raw_data, chart_type)
+        # Bucketed series (shared with the save request through the chart series cache)
+        print("Fetching chart series...")
+        formatted_data = get_chart_series(report_type, current_user.id, chart_type, time_period, start_date, end_date)
         print(f"Formatted data: {formatted_data}")
 
         if not formatted_data:
@@ -125,9 +119,9 @@ def handle_preview_request():
         print(f"Chart settings: {chart_settings}")
 
         print("Creating visualization...")
-        chart_html = create_visualization(formatted_data, chart_type, chart_settings)
+        chart_spec = create_visualization(formatted_data, chart_type, chart_settings)
 
-        if not chart_html:
+        if not chart_spec:
             return jsonify({
                 'success': False,
                 'error': 'Failed to generate chart'
@@ -135,7 +129,7 @@ def handle_preview_request():
 
         return jsonify({
             'success': True,
-            'chart_html': chart_html
+            'figure': chart_spec
         })
 
     except Exception as e:
@@ -173,34 +167,18 @@ def handle_visualization_save():
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
 
-            # Validate date range based on time period
-            date_diff = (end_date - start_date).days
-
-            if time_period == 'daily' and date_diff > 7:
-                flash('For daily analysis, please select a range of 7 days or less.', 'warning')
-                return redirect(url_for('visualizations.create_visualization_view'))
-            elif time_period == 'weekly' and date_diff > 31:
-                flash('For weekly analysis, please select a range of 31 days or less.', 'warning')
-                return redirect(url_for('visualizations.create_visualization_view'))
-            elif time_period == 'monthly' and date_diff > 365:
-                flash('For monthly analysis, please select a range of one year or less.', 'warning')
-                return redirect(url_for('visualizations.create_visualization_view'))
-            elif time_period == 'yearly' and date_diff > 1825:  # 5 years
-                flash('For yearly analysis, please select a range of 5 years or less.', 'warning')
+            # Any range length is accepted: long series are downsampled when the chart is built
+            if end_date < start_date:
+                flash('The end date must be on or after the start date.', 'warning')
                 return redirect(url_for('visualizations.create_visualization_view'))
 
         except ValueError:
             flash('Invalid date format.', 'warning')
             return redirect(url_for('visualizations.create_visualization_view'))
 
-        # Fetch raw data
-        print("Fetching raw data...")
-        raw_data = fetch_data_for_report(report_type, current_user.id, start_date, end_date)
-        print(f"Raw data received: {raw_data}")
-
-        # Format and aggregate data based on time period
-        print("Formatting data...")
-        formatted_data = format_data_for_visualization(report_type, raw_data, chart_type, time_period)
+        # Bucketed series aggregated by the database; usually already cached by the preview
+        print("Fetching chart series...")
+        formatted_data = get_chart_series(report_type, current_user.id, chart_type, time_period, start_date, end_date)
         print(f"Formatted data: {formatted_data}")
 
         if not formatted_data:
@@ -238,21 +216,13 @@ def handle_visualization_save():
         })
 
         print("Creating visualization...")
-        chart_html = create_visualization(formatted_data, chart_type, chart_settings)
+        chart_spec = create_visualization(formatted_data, chart_type, chart_settings)
 
-        if not chart_html:
+        if not chart_spec:
             flash('Failed to generate chart.', 'danger')
             return redirect(url_for('visualizations.create_visualization_view'))
 
-        # Optimize chart HTML
-        chart_html = (chart_html
-                      .replace('\n', '')
-                      .replace('    ', '')
-                      .replace('  ', ' ')
-                      .replace('> <', '><')
-                      )
-
-        # Save visualization
+        # Save visualization (the figure spec only; the page renders it with the shared plotly.js)
         try:
             visualization = Visualization(
                 user_id=current_user.id,
@@ -261,7 +231,7 @@ def handle_visualization_save():
                 start_date=start_date,
                 end_date=end_date,
                 data=str(formatted_data),
-                chart_html=chart_html
+                chart_spec=chart_spec
             )
             db.session.add(visualization)
             db.session.commit()
@@ -275,7 +245,6 @@ def handle_visualization_save():
 
         return render_template(
             'view_visualization.html',
-            chart_html=chart_html,
             vis_id=visualization.id,
             report_type=report_type,
             visualization=visualization,
@@ -366,15 +335,13 @@ def preview_visualization():
     try:
         report_type = request.form.get('report_type')
         chart_type = request.form.get('chart_type')
-        data = fetch_data_for_report(report_type, current_user.id)
-
-        # Pass chart_type to the formatting function
-        formatted_data = format_data_for_visualization(report_type, data, chart_type)
+        time_period = request.form.get('time_period', 'daily')
+        formatted_data = get_chart_series(report_type, current_user.id, chart_type, time_period)
 
         if formatted_data:
             chart_settings = get_chart_settings(report_type, chart_type)
-            chart_html = create_visualization(formatted_data, chart_type, chart_settings)
-            return jsonify({'success': True, 'chart_html': chart_html})
+            chart_spec = create_visualization(formatted_data, chart_type, chart_settings)
+            return jsonify({'success': True, 'figure': chart_spec})
 
         return jsonify({'success': False, 'error': 'No data available'})
 
@@ -382,13 +349,76 @@ def preview_visualization():
         return jsonify({'success': False, 'error': str(e)})
 
 
+def _chart_data_response(chart_spec, max_age=None):
+    """
+    Serve a figure spec as compact JSON with a content ETag, so an unchanged chart revalidates
+    with an empty 304. Without max_age the browser revalidates on every use.
+    """
+    body = json.dumps(chart_spec, separators=(',', ':'), sort_keys=True)
+    response = current_app.response_class(body, mimetype='application/json')
+    response.set_etag(hashlib.sha256(body.encode('utf-8')).hexdigest())
+    response.cache_control.private = True
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+
+@visualizations_bp.route('/chart-data')
+@login_required
+@role_required('admin')
+def chart_data():
+    """Figure spec of a chart over live report data (report_type, chart_type, optional dates and time_period)."""
+    try:
+        report_type = request.args.get('report_type')
+        chart_type = request.args.get('chart_type')
+        time_period = request.args.get('time_period', 'daily')
+        if not all([report_type, chart_type]):
+            return jsonify({'error': 'Missing required parameters'}), 400
+        try:
+            start_date = request.args.get('start_date')
+            end_date = request.args.get('end_date')
+            start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+            end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+        except ValueError:
+            return jsonify({'error': 'Invalid date format'}), 400
+
+        formatted_data = get_chart_series(report_type, current_user.id, chart_type, time_period, start_date, end_date)
+        if not formatted_data:
+            return jsonify({'error': 'No data available for the selected parameters'}), 404
+
+        chart_spec = create_visualization(formatted_data, chart_type, get_chart_settings(report_type, chart_type))
+        if not chart_spec:
+            return jsonify({'error': 'Failed to generate chart'}), 500
+        return _chart_data_response(chart_spec)
+
+    except Exception as e:
+        current_app.logger.error(f"Error generating chart data: {str(e)}")
+        return jsonify({'error': 'An error occurred while generating chart data'}), 500
+
+
+@visualizations_bp.route('/chart-data/<int:vis_id>')
+@login_required
+def saved_chart_data(vis_id):
+    """Figure spec of a saved visualization; saved charts never change, so browsers may cache them."""
+    visualization = with_details(Visualization.query).get_or_404(vis_id)
+    if visualization.user_id != current_user.id:
+        return jsonify({'error': 'Access denied'}), 403
+    if not visualization.chart_spec:
+        return jsonify({'error': 'This visualization was saved before chart data was stored'}), 404
+    return _chart_data_response(
+        visualization.chart_spec, max_age=current_app.config.get('CHART_DATA_MAX_AGE', 3600)
+    )
+
+
 @visualizations_bp.route('/download/<int:vis_id>')
 @login_required
 def download_visualization(vis_id):
     """Download visualization as PDF."""
     try:
         # Fetch the visualization from database
-        visualization = Visualization.query.get_or_404(vis_id)
+        visualization = with_details(Visualization.query).get_or_404(vis_id)
 
         # Check if user has permission to access this visualization
         if visualization.user_id != current_user.id:
@@ -402,14 +432,8 @@ def download_visualization(vis_id):
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"visualization_{visualization.report_type}_{timestamp}.pdf"
 
-        # Create temp directory if it doesn't exist
-        temp_dir = os.path.join(current_app.static_folder, 'temp')
-        os.makedirs(temp_dir, exist_ok=True)
-
-        output_path = os.path.join(temp_dir, filename)
-
-        # Modify the chart HTML for PDF rendering
-        chart_html = visualization.chart_html
+        # Legacy rows carry rendered HTML; new rows are drawn from chart_spec by the template
+        chart_html = None if visualization.chart_spec else visualization.chart_html
         if chart_html:
             # Add custom CSS for PDF rendering
             chart_html = chart_html.replace(
@@ -421,11 +445,14 @@ def download_visualization(vis_id):
         html_content = render_template(
             'pdf_visualization.html',
             chart_html=chart_html,
+            chart_spec=visualization.chart_spec,
             report_type=visualization.report_type,
             created_at=visualization.created_at,
             business=business,
             start_date=visualization.start_date,
-            end_date=visualization.end_date
+            end_date=visualization.end_date,
+            # The vendored bundle is read from disk, so exports need no network access
+            plotly_js_uri=Path(current_app.static_folder, current_app.config['PLOTLY_JS_FILE']).as_uri()
         )
 
         # Add custom CSS for better PDF rendering
@@ -442,35 +469,20 @@ def download_visualization(vis_id):
             'no-outline': None,
             'enable-local-file-access': None
         }
-
-        # Generate PDF with retry mechanism
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                pdfkit.from_string(html_content, output_path, options=pdf_options)
-                break
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise e
-                time.sleep(1)  # Wait before retry
-
-        # Send the file
-        return send_file(
-            output_path,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/pdf'
+        if visualization.chart_spec:
+            pdf_options['window-status'] = 'chart-ready'  # Set by the template once plotly.js has drawn the chart
+        else:
+            pdf_options['javascript-delay'] = '2000'  # Legacy chart HTML has no ready signal
+
+        # Render in the background PDF pool; the response points at the job
+        return start_pdf_job(
+            html_content,
+            pdf_options,
+            filename,
+            back_url=url_for('visualizations.create_visualization_view')
         )
 
     except Exception as e:
         current_app.logger.error(f"Error downloading visualization: {str(e)}")
         flash("Error generating PDF. Please try again.", "error")
-        return redirect(url_for('visualizations.create_visualization_view'))
-
-    finally:
-        # Clean up temporary file
-        try:
-            if 'output_path' in locals() and os.path.exists(output_path):
-                os.remove(output_path)
-        except Exception as e:
-            current_app.logger.error(f"Error cleaning up temp file: {str(e)}")
\ No newline at end of file
+        return redirect(url_for('visualizations.create_visualization_view'))
\ No newline at end of file
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case
+from sqlalchemy.orm import joinedload
+from inventory_system import db
+from modules.accounts_receivable.models import AccountsReceivable
+from modules.suppliers.models import AccountsPayable
+from modules.utils.cache import TTLCache
+
+# Aging buckets as (key, label, maximum days overdue); the last bucket is open-ended
+AGING_BUCKETS = [
+    ('current', 'Current', 0),
+    ('1_30', '1-30 Days', 30),
+    ('31_60', '31-60 Days', 60),
+    ('61_90', '61-90 Days', 90),
+    ('90_plus', '90+ Days', None),
+]
+
+LEDGERS = {
+    'receivables': AccountsReceivable,
+    'payables': AccountsPayable,
+}
+
+aging_cache = TTLCache(ttl=300)
+
+
+def _as_of_date(as_of=None):
+    """Aging is measured from the start of the given day (default: today)."""
+    as_of = as_of or datetime.now()
+    return as_of.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bucket_bounds(bucket, as_of):
+    """Return the (lower inclusive, upper exclusive) due dates of a bucket; None means unbounded."""
+    keys = [key for key, _, _ in AGING_BUCKETS]
+    if bucket not in keys:
+        raise ValueError(f"Unknown aging bucket: {bucket}")
+    index = keys.index(bucket)
+    max_days = AGING_BUCKETS[index][2]
+    lower = as_of - timedelta(days=max_days) if max_days is not None else None
+    upper = as_of - timedelta(days=AGING_BUCKETS[index - 1][2]) if index > 0 else None
+    return lower, upper
+
+
+def _bucket_expression(due_date, as_of):
+    """CASE expression assigning each due date to an aging bucket key."""
+    whens = [
+        (due_date >= as_of - timedelta(days=max_days), key)
+        for key, _, max_days in AGING_BUCKETS if max_days is not None
+    ]
+    return case(*whens, else_=AGING_BUCKETS[-1][0])
+
+
+def _open_items(model, user_id):
+    """Criteria selecting a tenant's unpaid items in a ledger."""
+    return [model.user_id == user_id, db.func.coalesce(model.status, '') != 'paid']
+
+
+def _compute_aging_summary(ledger, user_id, as_of):
+    """Bucket open amounts with a single CASE-based GROUP BY."""
+    model = LEDGERS[ledger]
+    bucket = _bucket_expression(model.due_date, as_of).label('bucket')
+    rows = db.session.execute(
+        db.select(
+            bucket,
+            db.func.count(model.id).label('item_count'),
+            db.func.coalesce(db.func.sum(model.amount_due), 0).label('amount')
+        ).where(*_open_items(model, user_id)).group_by(bucket)
+    ).all()
+
+    totals = {row.bucket: row for row in rows}
+    buckets = []
+    for key, label, _ in AGING_BUCKETS:
+        row = totals.get(key)
+        buckets.append({
+            'key': key,
+            'label': label,
+            'count': row.item_count if row else 0,
+            'amount': round(float(row.amount), 2) if row else 0.0,
+        })
+    return {
+        'as_of': as_of.strftime('%Y-%m-%d'),
+        'buckets': buckets,
+        'total_count': sum(bucket['count'] for bucket in buckets),
+        'total_outstanding': round(sum(bucket['amount'] for bucket in buckets), 2),
+    }
+
+
+def get_aging_summary(ledger, user_id, as_of=None):
+    """
+    Return open receivables or payables bucketed into current/1-30/31-60/61-90/90+ days overdue.
+    Cached per tenant, ledger and day for ANALYTICS_CACHE_TTL seconds.
+    """
+    if ledger not in LEDGERS:
+        raise ValueError(f"Unknown ledger: {ledger}")
+    as_of = _as_of_date(as_of)
+    return aging_cache.get_or_set(
+        (user_id, 'aging', ledger, as_of),
+        lambda: _compute_aging_summary(ledger, user_id, as_of),
+        ttl=current_app.config.get('ANALYTICS_CACHE_TTL', 300)
+    )
+
+
+def get_aging_items(ledger, user_id, bucket=None, start_date=None, end_date=None, page=1, per_page=50, as_of=None):
+    """
+    Paginate the open items of a ledger, optionally limited to one aging bucket and a due date range.
+    Related sales (receivables) or suppliers (payables) are eager-loaded for display.
+    """
+    if ledger not in LEDGERS:
+        raise ValueError(f"Unknown ledger: {ledger}")
+    model = LEDGERS[ledger]
+    as_of = _as_of_date(as_of)
+
+    related = AccountsReceivable.sale if ledger == 'receivables' else AccountsPayable.supplier
+    query = model.query.options(joinedload(related)).filter(*_open_items(model, user_id))
+
+    if bucket:
+        lower, upper = _bucket_bounds(bucket, as_of)
+        if lower is not None:
+            query = query.filter(model.due_date >= lower)
+        if upper is not None:
+            query = query.filter(model.due_date < upper)
+    if start_date:
+        query = query.filter(model.due_date >= start_date)
+    if end_date:
+        query = query.filter(model.due_date < end_date + timedelta(days=1))
+
+    return query.order_by(model.due_date, model.id).paginate(page=page, per_page=per_page, error_out=False)
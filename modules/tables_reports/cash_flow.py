@@ -0,0 +1,137 @@
+from datetime import datetime, timedelta
+import numpy as np
+from inventory_system import db
+from modules.accounts_receivable.models import AccountsReceivable
+from modules.expenses.models import Expense
+from modules.suppliers.models import AccountsPayable
+
+DEFAULT_WEEKS = 12
+MAX_WEEKS = 52
+RUN_RATE_DAYS = 90  # Trailing window used to estimate recurring expenses
+
+# Item kinds returned by the open-items query
+RECEIVABLE, PAYABLE, EXPENSE = 0, 1, 2
+
+
+def _open_items_statement(user_id, run_rate_start, run_rate_end):
+    """
+    One UNION ALL over everything that moves cash: open receivables and payables, unpaid
+    expenses, and the trailing total of paid regular expenses used as the recurring run rate.
+    """
+    receivables = db.select(
+        db.literal(RECEIVABLE).label('kind'),
+        AccountsReceivable.due_date.label('due_date'),
+        AccountsReceivable.amount_due.label('amount')
+    ).where(
+        AccountsReceivable.user_id == user_id,
+        db.func.coalesce(AccountsReceivable.status, '') != 'paid'
+    )
+    payables = db.select(
+        db.literal(PAYABLE).label('kind'),
+        AccountsPayable.due_date.label('due_date'),
+        AccountsPayable.amount_due.label('amount')
+    ).where(
+        AccountsPayable.user_id == user_id,
+        db.func.coalesce(AccountsPayable.status, '') != 'paid'
+    )
+    unpaid_expenses = db.select(
+        db.literal(EXPENSE).label('kind'),
+        Expense.date_incurred.label('due_date'),
+        Expense.amount.label('amount')
+    ).where(
+        Expense.user_id == user_id,
+        db.func.coalesce(Expense.payment_status, 'paid') != 'paid'
+    )
+    run_rate = db.select(
+        db.literal(-1).label('kind'),
+        db.literal(None, db.DateTime).label('due_date'),
+        db.func.coalesce(db.func.sum(Expense.amount), 0).label('amount')
+    ).where(
+        Expense.user_id == user_id,
+        db.func.coalesce(Expense.expense_type, 'regular') == 'regular',
+        db.func.coalesce(Expense.payment_status, 'paid') == 'paid',
+        Expense.date_incurred >= run_rate_start,
+        Expense.date_incurred < run_rate_end
+    )
+    return db.union_all(receivables, payables, unpaid_expenses, run_rate)
+
+
+def _bin(offsets, amounts, mask, days):
+    """Sum amounts into per-day slots; items already overdue land on day 0, items past the horizon are dropped."""
+    offsets = np.clip(offsets[mask], 0, None)
+    amounts = amounts[mask]
+    in_horizon = offsets < days
+    return np.bincount(offsets[in_horizon], weights=amounts[in_horizon], minlength=days)
+
+
+def project_cash_flow(user_id, weeks=DEFAULT_WEEKS, granularity='weekly', opening_balance=0.0,
+                      receivable_delay_days=0, payable_delay_days=0, include_recurring=True, today=None):
+    """
+    Project inflows, outflows and the running cash balance for the next N weeks.
+    Scenario toggles shift when receivables are collected and payables are paid, and switch the
+    recurring expense run rate on or off. All open items are fetched in one query and binned with NumPy.
+    """
+    weeks = max(1, min(int(weeks), MAX_WEEKS))
+    days = weeks * 7
+    today = (today or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    rows = db.session.execute(_open_items_statement(user_id, today - timedelta(days=RUN_RATE_DAYS), today)).all()
+    items = [row for row in rows if row.kind != -1]
+    run_rate_total = float(next((row.amount for row in rows if row.kind == -1), 0) or 0)
+
+    kinds = np.fromiter((row.kind for row in items), dtype=np.int8, count=len(items))
+    amounts = np.fromiter((float(row.amount or 0) for row in items), dtype=np.float64, count=len(items))
+    due = np.array([row.due_date for row in items], dtype='datetime64[D]')
+    offsets = (due - np.datetime64(today.date(), 'D')).astype(np.int64)
+
+    # Scenario delays move the whole class of items later in time
+    offsets = offsets + np.where(kinds == RECEIVABLE, receivable_delay_days, 0)
+    offsets = offsets + np.where(kinds == PAYABLE, payable_delay_days, 0)
+
+    inflows = _bin(offsets, amounts, kinds == RECEIVABLE, days)
+    payable_outflows = _bin(offsets, amounts, kinds == PAYABLE, days)
+    expense_outflows = _bin(offsets, amounts, kinds == EXPENSE, days)
+    if include_recurring:
+        expense_outflows = expense_outflows + run_rate_total / RUN_RATE_DAYS
+
+    if granularity == 'weekly':
+        inflows, payable_outflows, expense_outflows = (
+            series.reshape(weeks, 7).sum(axis=1) for series in (inflows, payable_outflows, expense_outflows)
+        )
+        starts = [today + timedelta(days=7 * index) for index in range(weeks)]
+    else:
+        starts = [today + timedelta(days=index) for index in range(days)]
+
+    outflows = payable_outflows + expense_outflows
+    net = inflows - outflows
+    balance = opening_balance + np.cumsum(net)
+
+    periods = [
+        {
+            'period_start': start.strftime('%Y-%m-%d'),
+            'inflows': round(float(inflows[index]), 2),
+            'payables': round(float(payable_outflows[index]), 2),
+            'expenses': round(float(expense_outflows[index]), 2),
+            'net': round(float(net[index]), 2),
+            'balance': round(float(balance[index]), 2),
+        }
+        for index, start in enumerate(starts)
+    ]
+    lowest = int(np.argmin(balance)) if len(balance) else 0
+    return {
+        'granularity': granularity,
+        'weeks': weeks,
+        'opening_balance': round(float(opening_balance), 2),
+        'closing_balance': round(float(balance[-1]), 2) if len(balance) else round(float(opening_balance), 2),
+        'total_inflows': round(float(inflows.sum()), 2),
+        'total_outflows': round(float(outflows.sum()), 2),
+        'lowest_balance': round(float(balance[lowest]), 2) if len(balance) else round(float(opening_balance), 2),
+        'lowest_balance_date': periods[lowest]['period_start'] if periods else None,
+        'recurring_daily_expense': round(run_rate_total / RUN_RATE_DAYS, 2),
+        'scenario': {
+            'receivable_delay_days': receivable_delay_days,
+            'payable_delay_days': payable_delay_days,
+            'include_recurring': include_recurring,
+        },
+        'periods': periods,
+    }
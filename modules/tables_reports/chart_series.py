@@ -0,0 +1,127 @@
+from datetime import date
+from flask import current_app
+from inventory_system import db
+from modules.expenses.models import Category, Expense
+from modules.sales.models import Sale
+from modules.tables_reports.report_helpers import (
+    PIE_CHART_TOP_N,
+    fetch_data_for_report,
+    format_data_for_visualization,
+    tenant_user_ids,
+    top_k_with_others,
+)
+from modules.tables_reports.report_queries import _apply_date_range
+from modules.utils.cache import TTLCache
+
+TIME_PERIODS = ('daily', 'weekly', 'monthly', 'yearly')
+
+chart_series_cache = TTLCache(ttl=60)
+
+
+def _dialect_name():
+    return db.session.get_bind().dialect.name
+
+
+def time_bucket(column, time_period, dialect=None):
+    """
+    SQL expression for the first day of the period a timestamp falls in (weeks start on Monday).
+    SQLite and MySQL yield 'YYYY-MM-DD' strings, PostgreSQL a date; both sort chronologically.
+    """
+    if time_period not in TIME_PERIODS:
+        raise ValueError(f"Unknown time period: {time_period}")
+    dialect = dialect or _dialect_name()
+
+    if dialect == 'postgresql':
+        unit = {'daily': 'day', 'weekly': 'week', 'monthly': 'month', 'yearly': 'year'}[time_period]
+        return db.cast(db.func.date_trunc(unit, column), db.Date)
+    if dialect in ('mysql', 'mariadb'):
+        if time_period == 'daily':
+            return db.func.date(column)
+        if time_period == 'weekly':
+            return db.func.subdate(db.func.date(column), db.func.weekday(column))
+        return db.func.date_format(column, '%Y-%m-01' if time_period == 'monthly' else '%Y-01-01')
+    # SQLite
+    if time_period == 'daily':
+        return db.func.date(column)
+    if time_period == 'weekly':
+        return db.func.date(column, 'weekday 0', '-6 days')
+    return db.func.strftime('%Y-%m-01' if time_period == 'monthly' else '%Y-01-01', column)
+
+
+def period_label(bucket, time_period):
+    """Axis label of a bucket, in the formats the charts have always used."""
+    if isinstance(bucket, str):
+        bucket = date.fromisoformat(bucket[:10])
+    if time_period == 'daily':
+        return bucket.strftime('%Y-%m-%d')
+    if time_period == 'weekly':
+        return f"Week {bucket.strftime('%V')} {bucket.strftime('%G')}"
+    if time_period == 'monthly':
+        return bucket.strftime('%B %Y')
+    return str(bucket.year)
+
+
+def _sales_source(user_id):
+    """Model, date column, amount and pie dimension of the sales series; returned sales are left out."""
+    criteria = [
+        Sale.user_id.in_(tenant_user_ids(user_id)),
+        db.func.coalesce(Sale.sale_status, '') != 'returned',
+    ]
+    customer = db.func.coalesce(db.func.nullif(Sale.customer_name, ''), 'Unknown')
+    return Sale, Sale.created_at, Sale.total_price, customer, 'customer', criteria
+
+
+def _expenses_source(user_id):
+    """Model, date column, amount and pie dimension of the expenses series."""
+    category = db.func.coalesce(
+        db.select(Category.name).where(Category.id == Expense.category_id).scalar_subquery(), 'Uncategorized'
+    )
+    criteria = [Expense.user_id.in_(tenant_user_ids(user_id))]
+    return Expense, Expense.date_incurred, Expense.amount, category, 'category', criteria
+
+
+SERIES_SOURCES = {
+    'sales': _sales_source,
+    'expenses': _expenses_source,
+}
+
+
+def _grouped_series(report_type, user_id, chart_type, time_period, start_date, end_date):
+    """One GROUP BY returning the ready-to-plot rows: per period for bar/line, per dimension for pie."""
+    model, date_column, amount, dimension, label_key, criteria = SERIES_SOURCES[report_type](user_id)
+    group = dimension if chart_type == 'pie' else time_bucket(date_column, time_period)
+    statement = db.select(group.label('bucket'), db.func.sum(amount).label('total_amount')).select_from(model)
+    statement = _apply_date_range(statement.where(*criteria), date_column, start_date, end_date)
+    rows = db.session.execute(statement.group_by(group).order_by(group)).all()
+
+    if chart_type == 'pie':
+        totals = {row.bucket: float(row.total_amount or 0) for row in rows}
+        return top_k_with_others(totals, PIE_CHART_TOP_N, label_key)
+    return [
+        {'date': period_label(row.bucket, time_period), 'total_amount': float(row.total_amount or 0)}
+        for row in rows
+    ]
+
+
+def _compute_chart_series(report_type, user_id, chart_type, time_period, start_date, end_date):
+    if report_type in SERIES_SOURCES and chart_type in ('bar', 'line', 'pie'):
+        return _grouped_series(report_type, user_id, chart_type, time_period, start_date, end_date) or None
+    # Reports without a time axis (inventory) are small enough to format in Python
+    raw_data = fetch_data_for_report(report_type, user_id, start_date, end_date)
+    return format_data_for_visualization(report_type, raw_data, chart_type, time_period)
+
+
+def get_chart_series(report_type, user_id, chart_type, time_period='daily', start_date=None, end_date=None):
+    """
+    Return the rows a visualization plots, bucketed by the database (daily, weekly, monthly or
+    yearly). Preview and save ask for the same series moments apart, so results are cached for
+    CHART_SERIES_CACHE_TTL seconds.
+    """
+    time_period = time_period or 'daily'
+    if time_period not in TIME_PERIODS:
+        raise ValueError(f"Unknown time period: {time_period}")
+    return chart_series_cache.get_or_set(
+        (user_id, 'chart_series', report_type, chart_type, time_period, start_date, end_date),
+        lambda: _compute_chart_series(report_type, user_id, chart_type, time_period, start_date, end_date),
+        ttl=current_app.config.get('CHART_SERIES_CACHE_TTL', 60)
+    )
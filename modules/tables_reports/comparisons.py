@@ -0,0 +1,149 @@
+from calendar import monthrange
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case
+from inventory_system import db
+from modules.tables_reports.models import DailyRollup, RollupWatermark
+from modules.tables_reports.rollups import get_rollup_status
+from modules.utils.cache import TTLCache
+
+# Months spanned by each comparable period; anything else compares trailing 30-day windows
+PERIOD_MONTHS = {'monthly': 1, 'quarterly': 3, 'yearly': 12}
+TRAILING_DAYS = 30
+
+# Metrics per report as (key, label, rollup expression)
+COMPARISON_METRICS = {
+    'sales': [
+        ('sales_count', 'Sales', DailyRollup.sales_count),
+        ('units_sold', 'Units Sold', DailyRollup.units_sold),
+        ('revenue', 'Revenue', DailyRollup.revenue),
+        ('gross_profit', 'Gross Profit', DailyRollup.profit),
+    ],
+    'expenses': [
+        ('expenses', 'Expenses', DailyRollup.expenses),
+    ],
+    'profit_loss': [
+        ('revenue', 'Revenue', DailyRollup.revenue),
+        ('cost_of_goods', 'Cost of Goods Sold', DailyRollup.revenue - DailyRollup.profit),
+        ('gross_profit', 'Gross Profit', DailyRollup.profit),
+        ('expenses', 'Operating Expenses', DailyRollup.expenses),
+        ('net_profit', 'Net Profit', DailyRollup.profit - DailyRollup.expenses),
+    ],
+}
+
+WINDOWS = ('current', 'prior', 'year_ago')
+
+comparison_cache = TTLCache(ttl=300)
+
+
+def _shift_months(day, months):
+    """Move a date by a number of months, clamping the day to the target month's length."""
+    month_index = day.year * 12 + day.month - 1 + months
+    year, month = divmod(month_index, 12)
+    return day.replace(year=year, month=month + 1, day=min(day.day, monthrange(year, month + 1)[1]))
+
+
+def comparison_windows(period, reference=None):
+    """
+    Return inclusive (start, end) dates for the current period-to-date, the same span of the
+    previous period, and the same span one year earlier.
+    """
+    reference = reference or datetime.now()
+    end = reference.date() if isinstance(reference, datetime) else reference
+    months = PERIOD_MONTHS.get(period)
+    if months:
+        if period == 'monthly':
+            start = end.replace(day=1)
+        elif period == 'quarterly':
+            start = end.replace(month=(end.month - 1) // 3 * 3 + 1, day=1)
+        else:
+            start = end.replace(month=1, day=1)
+        prior_start = _shift_months(start, -months)
+        prior = (prior_start, min(_shift_months(end, -months), start - timedelta(days=1)))
+    else:
+        start = end - timedelta(days=TRAILING_DAYS - 1)
+        prior = (start - timedelta(days=TRAILING_DAYS), start - timedelta(days=1))
+    return {
+        'current': (start, end),
+        'prior': prior,
+        'year_ago': (_shift_months(start, -12), _shift_months(end, -12)),
+    }
+
+
+def _comparison_statement(tenant_id, report_type, windows):
+    """One conditional-aggregation query summing every metric over all three windows."""
+    columns = []
+    for key, _, expression in COMPARISON_METRICS[report_type]:
+        for window in WINDOWS:
+            start, end = windows[window]
+            columns.append(db.func.coalesce(db.func.sum(
+                case((DailyRollup.day.between(start, end), expression), else_=0)
+            ), 0).label(f'{window}_{key}'))
+
+    return db.select(*columns).where(
+        DailyRollup.user_id == tenant_id,
+        DailyRollup.day >= min(start for start, _ in windows.values()),
+        DailyRollup.day <= max(end for _, end in windows.values())
+    )
+
+
+def _growth(current, previous):
+    """Percentage change, or None when there is nothing to compare against."""
+    if not previous:
+        return None
+    return round((current - previous) / abs(previous) * 100, 2)
+
+
+def _compute_comparison(tenant_id, report_type, period, windows):
+    """Run the comparison query and derive deltas and growth rates per metric."""
+    row = db.session.execute(_comparison_statement(tenant_id, report_type, windows)).one()._mapping
+
+    metrics = []
+    for key, label, _ in COMPARISON_METRICS[report_type]:
+        current, prior, year_ago = (round(float(row[f'{window}_{key}']), 2) for window in WINDOWS)
+        metrics.append({
+            'key': key,
+            'label': label,
+            'current': current,
+            'prior': prior,
+            'year_ago': year_ago,
+            'prior_delta': round(current - prior, 2),
+            'prior_growth': _growth(current, prior),
+            'year_ago_delta': round(current - year_ago, 2),
+            'year_ago_growth': _growth(current, year_ago),
+        })
+
+    watermark = db.session.get(RollupWatermark, tenant_id)
+    return {
+        'report_type': report_type,
+        'period': period,
+        'windows': {
+            window: {'start': start.strftime('%Y-%m-%d'), 'end': end.strftime('%Y-%m-%d')}
+            for window, (start, end) in windows.items()
+        },
+        'metrics': metrics,
+        'rollups_refreshed_at': watermark.refreshed_at.strftime('%Y-%m-%d %H:%M:%S') if watermark else None,
+    }
+
+
+def get_period_comparison(tenant_id, report_type, period='monthly', reference=None):
+    """
+    Compare a report's figures for the current period against the prior period and the same period a year ago.
+    Reads the daily rollups as they are, never rebuilding them; 'stale' flags changes the rollup refresh
+    (scheduler or POST /rollups/refresh) has not folded in yet. Cached per tenant, report and period
+    boundary for ANALYTICS_CACHE_TTL seconds.
+    """
+    if report_type not in COMPARISON_METRICS:
+        raise ValueError(f"Unknown comparison report: {report_type}")
+    windows = comparison_windows(period, reference)
+
+    rollup_status = get_rollup_status(tenant_id)
+
+    key = (tenant_id, 'comparison', report_type, period, windows['current'])
+    comparison = dict(comparison_cache.get_or_set(
+        key,
+        lambda: _compute_comparison(tenant_id, report_type, period, windows),
+        ttl=current_app.config.get('ANALYTICS_CACHE_TTL', 300)
+    ))
+    comparison['stale'] = rollup_status['refreshed_at'] is None or rollup_status['pending_days'] > 0
+    return comparison
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from inventory_system import db
+from modules.accounts_receivable.models import AccountsReceivable
+from modules.expenses.models import Expense
+from modules.inventory.models import Inventory
+from modules.products.models import Product
+from modules.ReturnedDamagedItem.models import ReturnedDamagedItem
+from modules.sales.models import Sale, SaleItem
+from modules.suppliers.models import Supplier
+from modules.tables_reports.report_helpers import tenant_user_ids
+from modules.utils.cache import TTLCache
+
+dashboard_cache = TTLCache(ttl=60)
+
+
+def _count(model, tenant, *criteria):
+    """Scalar subquery counting a tenant's rows of a model."""
+    return db.select(db.func.count()).select_from(model).where(
+        model.user_id.in_(tenant), *criteria
+    ).scalar_subquery()
+
+
+def _total(column, model, tenant, *criteria):
+    """Scalar subquery summing a column over a tenant's rows, zero when there are none."""
+    return db.select(db.func.coalesce(db.func.sum(column), 0)).where(
+        model.user_id.in_(tenant), *criteria
+    ).scalar_subquery()
+
+
+def _sale_window(start_date=None, end_date=None):
+    """Sale date criteria matching the report pages: the end date is included in full."""
+    criteria = []
+    if start_date:
+        criteria.append(Sale.created_at >= start_date)
+    if end_date:
+        criteria.append(Sale.created_at < end_date + timedelta(days=1))
+    return criteria
+
+
+def _metrics_statement(user_id, start_date=None, end_date=None):
+    """Build one SELECT whose columns are scalar subqueries, one per dashboard tile."""
+    tenant = tenant_user_ids(user_id)
+    now = datetime.now()
+    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    window = _sale_window(start_date, end_date)
+
+    acquisition_cost = db.select(
+        db.func.coalesce(db.func.sum(Product.cost_price * SaleItem.quantity), 0)
+    ).select_from(SaleItem).join(
+        Product, Product.product_id == SaleItem.product_id
+    ).join(
+        Sale, Sale.id == SaleItem.sale_id
+    ).where(Sale.user_id.in_(tenant), *window).scalar_subquery()
+
+    return db.select(
+        _count(Product, tenant).label('product_count'),
+        _count(Inventory, tenant, Inventory.stock_quantity <= Inventory.reorder_threshold).label('low_inventory_count'),
+        _count(Supplier, tenant).label('supplier_count'),
+        _count(Inventory, tenant).label('inventory_count'),
+        _total(Expense.amount, Expense, tenant, Expense.date_incurred >= start_of_month).label('total_expenses'),
+        _count(AccountsReceivable, tenant,
+               AccountsReceivable.due_date <= now + timedelta(days=7),
+               AccountsReceivable.status != 'paid').label('accounts_receivable_count'),
+        _count(ReturnedDamagedItem, tenant).label('returned_damaged_count'),
+        _total(Sale.total_price, Sale, tenant, Sale.sale_date >= start_of_month).label('monthly_revenue'),
+        _total(AccountsReceivable.amount_due, AccountsReceivable, tenant,
+               AccountsReceivable.status != 'paid').label('pending_receivables'),
+        _total(Sale.total_price, Sale, tenant, *window).label('window_revenue'),
+        acquisition_cost.label('acquisition_cost'),
+    )
+
+
+def _compute_metrics(user_id, start_date=None, end_date=None):
+    """Run the compound KPI statement and shape the result into dashboard tiles."""
+    row = db.session.execute(_metrics_statement(user_id, start_date, end_date)).one()._mapping
+
+    window_revenue = Decimal(str(row['window_revenue']))
+    acquisition_cost = Decimal(str(row['acquisition_cost']))
+    profit_margin = 0.0
+    if window_revenue > 0:
+        profit_margin = float(round((window_revenue - acquisition_cost) / window_revenue * Decimal('100'), 2))
+
+    return {
+        'product_count': row['product_count'],
+        'low_inventory_count': row['low_inventory_count'],
+        'supplier_count': row['supplier_count'],
+        'inventory_count': row['inventory_count'],
+        'total_expenses': float(row['total_expenses']),
+        'accounts_receivable_count': row['accounts_receivable_count'],
+        'returned_damaged_count': row['returned_damaged_count'],
+        'monthly_revenue': float(row['monthly_revenue']),
+        'pending_receivables': float(row['pending_receivables']),
+        'profit_margin': profit_margin,
+    }
+
+
+def get_dashboard_metrics(user_id, start_date=None, end_date=None):
+    """
+    Return every dashboard tile for a tenant, computed in a single round trip.
+    Results are cached per tenant and date range for DASHBOARD_CACHE_TTL seconds.
+    """
+    key = (user_id, 'dashboard_metrics', start_date, end_date)
+    return dashboard_cache.get_or_set(
+        key,
+        lambda: _compute_metrics(user_id, start_date, end_date),
+        ttl=current_app.config.get('DASHBOARD_CACHE_TTL', 60)
+    )
@@ -1,25 +1,26 @@
-from flask_mail import Message
-from modules.tables_reports.pdf_generator import generate_pdf  # Ensure your generator function is imported correctly
-from inventory_system import mail
+from flask import current_app
+from inventory_system import db
+from modules.utils.email_automation.outbox import enqueue_email
 
-def send_report_email(report_type, data, recipient_email):
-    """Send report as an email attachment."""
-    msg = Message(
-        subject=f"{report_type.capitalize()} Report",
-        sender="your_email@example.com",
-        recipients=[recipient_email]
-    )
-    msg.body = f"Please find the attached {report_type} report."
 
-    # Generate report file
-    file_path = generate_pdf(report_type, data)  # or export_to_excel if you need Excel format
+def queue_report_email(report_type, file_path, recipients, subject=None, commit=True):
+    """Queue an email carrying a generated report file as an attachment in the email outbox."""
+    return enqueue_email(
+        list(recipients),
+        subject or f"{report_type.replace('_', ' ').title()} Report",
+        text_body=f"Please find the attached {report_type.replace('_', ' ')} report.",
+        attachment_path=file_path,
+        sender=current_app.config.get('MAIL_DEFAULT_SENDER'),
+        commit=commit
+    )
 
-    with open(file_path, 'rb') as fp:
-        msg.attach(file_path, "application/pdf", fp.read())
 
+def send_report_email(report_type, file_path, recipient_email):
+    """Queue a generated report file for delivery as an email attachment."""
     try:
-        mail.send(msg)
+        queue_report_email(report_type, file_path, [recipient_email])
         return True
     except Exception as e:
-        print(f"Failed to send email: {e}")
+        db.session.rollback()
+        current_app.logger.error(f"Failed to queue report email: {e}")
         return False
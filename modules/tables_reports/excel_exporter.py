@@ -1,35 +1,153 @@
-import pandas as pd
-from datetime import datetime
-
-def export_to_excel(report_type, data):
-    """Generate an Excel file for the specified report with appropriate column names."""
-    column_names = {
-        'sales': ['Sale ID', 'Product', 'Quantity', 'Total Price', 'Sale Date', 'Customer Name'],
-        'inventory': ['Product ID', 'Product Name', 'Stock Quantity', 'Reorder Threshold', 'Unit Price', 'Last Updated'],
-        'receivables': ['Receivable ID', 'Customer Name', 'Amount Due', 'Due Date', 'Status'],
-        'profit_loss': ['Profit', 'Loss', 'Net Income'],  # Example summary structure
-        'expenses': ['Expense ID', 'Category', 'Amount', 'Date Incurred', 'Description'],
-        'payables': ['Payable ID', 'Supplier Name', 'Amount Due', 'Due Date', 'Status'],
-        'returned_damaged': ['Item ID', 'Product Name', 'Reason', 'Date Returned', 'Condition'],
-    }
-
-    # Map column names if provided in the structure
-    if isinstance(data, list) and data and isinstance(data[0], dict):
-        # If data is a list of dictionaries, convert it to a DataFrame
-        df = pd.DataFrame(data)
-        # Rename columns based on the report type if applicable
-        if report_type in column_names:
-            df.columns = column_names.get(report_type, df.columns)
-    elif isinstance(data, dict):
-        # If data is a single summary dictionary, convert it to a DataFrame with a single row
-        df = pd.DataFrame([data])
-        if report_type in column_names:
-            df.columns = column_names.get(report_type, df.columns)
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+from modules.tables_reports.report_helpers import calculate_profit_and_loss, profit_loss_lines
+from modules.tables_reports.report_queries import stream_report_rows
+from modules.tables_reports.report_storage import build_report_path
+
+NUMBER_FORMATS = {
+    'money': '#,##0.00',
+    'percent': '0.00',
+    'date': 'yyyy-mm-dd',
+    'datetime': 'yyyy-mm-dd hh:mm',
+}
+
+HEADER_FONT = Font(bold=True)
+
+# Column specs per report: (header, row key, cell type, column width)
+EXCEL_COLUMNS = {
+    'sales': [
+        ('Sale ID', 'sale_id', 'int', 10),
+        ('Sale Date', 'sale_date', 'datetime', 18),
+        ('Customer Name', 'customer_name', 'text', 28),
+        ('Product', 'product_name', 'text', 32),
+        ('Quantity', 'quantity', 'int', 10),
+        ('Unit Price', 'unit_price', 'money', 12),
+        ('Discount %', 'discount_percentage', 'percent', 11),
+        ('Line Total', 'line_total', 'money', 12),
+        ('Sale Total', 'total_price', 'money', 12),
+        ('Status', 'sale_status', 'text', 12),
+    ],
+    'inventory': [
+        ('Product ID', 'product_id', 'text', 38),
+        ('Product Name', 'product_name', 'text', 32),
+        ('SKU', 'sku', 'text', 18),
+        ('Stock Quantity', 'stock_quantity', 'int', 14),
+        ('Reorder Threshold', 'reorder_threshold', 'int', 17),
+        ('Unit Price', 'unit_price', 'money', 12),
+        ('Cost Price', 'cost_price', 'money', 12),
+        ('Last Updated', 'updated_at', 'datetime', 18),
+    ],
+    'receivables': [
+        ('Receivable ID', 'receivable_id', 'int', 13),
+        ('Customer Name', 'customer_name', 'text', 28),
+        ('Amount Due', 'amount_due', 'money', 12),
+        ('Due Date', 'due_date', 'date', 12),
+        ('Status', 'status', 'text', 12),
+    ],
+    'payables': [
+        ('Payable ID', 'payable_id', 'int', 11),
+        ('Supplier Name', 'supplier_name', 'text', 28),
+        ('Amount Due', 'amount_due', 'money', 12),
+        ('Due Date', 'due_date', 'date', 12),
+        ('Status', 'status', 'text', 12),
+    ],
+    'expenses': [
+        ('Expense ID', 'expense_id', 'int', 11),
+        ('Date Incurred', 'date_incurred', 'date', 13),
+        ('Category', 'category', 'text', 20),
+        ('Description', 'description', 'text', 40),
+        ('Amount', 'amount', 'money', 12),
+        ('Expense Type', 'expense_type', 'text', 13),
+        ('Payment Status', 'payment_status', 'text', 14),
+    ],
+    'returned_damaged': [
+        ('Item ID', 'item_id', 'int', 10),
+        ('Date Returned', 'return_date', 'date', 14),
+        ('Product Name', 'product_name', 'text', 32),
+        ('Quantity', 'quantity', 'int', 10),
+        ('Reason', 'reason', 'text', 30),
+        ('Cost Impact', 'cost_impact', 'money', 12),
+    ],
+}
+
+SUMMARY_COLUMNS = [
+    ('Line Item', 'label', 'text', 32),
+    ('Amount', 'amount', 'money', 16),
+]
+
+
+def _typed_cell(sheet, value, cell_type):
+    """Wrap a value in a formatted cell so Excel stores real dates and numbers."""
+    if value is None or cell_type not in NUMBER_FORMATS:
+        return value
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.number_format = NUMBER_FORMATS[cell_type]
+    return cell
+
+
+def _write_sheet(workbook, title, columns, rows):
+    """Append a header and all rows to a new write-only sheet, one row at a time."""
+    sheet = workbook.create_sheet(title=title)
+    for index, (_, _, _, width) in enumerate(columns, start=1):
+        sheet.column_dimensions[get_column_letter(index)].width = width
+    sheet.freeze_panes = 'A2'
+
+    header = []
+    for name, _, _, _ in columns:
+        cell = WriteOnlyCell(sheet, value=name)
+        cell.font = HEADER_FONT
+        header.append(cell)
+    sheet.append(header)
+
+    for row in rows:
+        sheet.append([_typed_cell(sheet, row.get(key), cell_type) for _, key, cell_type, _ in columns])
+    return sheet
+
+
+def export_report_to_excel(report_type, user_id, start_date=None, end_date=None, summary=None):
+    """
+    Stream a report from the database into an XLSX file in the tenant's report storage.
+    Rows are written in write-only mode so memory use stays flat regardless of row count.
+    A precomputed profit and loss summary can be passed in to avoid recalculating it.
+    """
+    workbook = Workbook(write_only=True)
+
+    if report_type == 'profit_loss':
+        if summary is None:
+            summary = calculate_profit_and_loss(user_id, start_date, end_date)
+        _write_sheet(workbook, 'Summary', SUMMARY_COLUMNS, profit_loss_lines(summary))
+        _write_sheet(workbook, 'Sales Detail', EXCEL_COLUMNS['sales'],
+                     stream_report_rows('sales', user_id, start_date, end_date))
+        _write_sheet(workbook, 'Expenses Detail', EXCEL_COLUMNS['expenses'],
+                     stream_report_rows('expenses', user_id, start_date, end_date))
+    elif report_type in EXCEL_COLUMNS:
+        _write_sheet(workbook, report_type.replace('_', ' ').title(), EXCEL_COLUMNS[report_type],
+                     stream_report_rows(report_type, user_id, start_date, end_date))
     else:
+        raise ValueError("Unknown report type specified.")
+
+    excel_output = build_report_path(user_id, report_type, 'xlsx')
+    workbook.save(excel_output)
+    return excel_output
+
+
+def export_to_excel(report_type, data, user_id):
+    """Write already-fetched report data (a list of dictionaries or a summary dictionary) to an XLSX file."""
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list) or (data and not isinstance(data[0], dict)):
         raise ValueError(f"Invalid data structure for {report_type} report. Expected a list of dictionaries or a single dictionary.")
 
-    # Generate Excel file with the report type and date in the filename
-    excel_output = f"{report_type}_report_{datetime.now().strftime('%Y%m%d')}.xlsx"
-    df.to_excel(excel_output, index=False)
+    keys = list(data[0].keys()) if data else []
+    columns = [column for column in EXCEL_COLUMNS.get(report_type, []) if column[1] in keys]
+    if not columns:
+        columns = [(key.replace('_', ' ').title(), key, 'text', 18) for key in keys]
+
+    workbook = Workbook(write_only=True)
+    _write_sheet(workbook, report_type.replace('_', ' ').title(), columns, data)
 
+    excel_output = build_report_path(user_id, report_type, 'xlsx')
+    workbook.save(excel_output)
     return excel_output
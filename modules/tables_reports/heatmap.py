@@ -0,0 +1,108 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from sqlalchemy import extract
+from inventory_system import db
+from modules.sales.models import Sale
+from modules.tables_reports.models import HourlySalesRollup, RollupDirtyDay, RollupWatermark, SalesHeatmapCell
+from modules.tables_reports.report_helpers import tenant_user_ids
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+HOURS = list(range(24))
+
+
+def _as_date(value):
+    return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+
+
+def _hourly_statement(tenant_id, days):
+    """Completed sales grouped by day and hour, for the given days or all history."""
+    day = db.func.date(Sale.created_at)
+    hour = extract('hour', Sale.created_at)
+    statement = db.select(
+        day.label('day'),
+        hour.label('hour'),
+        db.func.count(Sale.id).label('sales_count'),
+        db.func.coalesce(db.func.sum(Sale.total_price), 0).label('revenue'),
+    ).where(
+        Sale.user_id.in_(tenant_user_ids(tenant_id)),
+        Sale.sale_status == 'completed'
+    ).group_by(day, hour)
+    if days is not None:
+        statement = statement.where(
+            Sale.created_at >= min(days), Sale.created_at < max(days) + timedelta(days=1)
+        )
+    return statement
+
+
+def rebuild_sales_heatmap(tenant_id, days=None):
+    """
+    Recompute the hourly sales of the given days (None means full history) and apply the difference
+    to the tenant's 7 x 24 heatmap cells, so a refresh costs only the changed days. Called from the
+    rollup refresh.
+    """
+    fresh = {}
+    for row in db.session.execute(_hourly_statement(tenant_id, days)):
+        day = _as_date(row.day)
+        if days is None or day in days:
+            fresh[(day, int(row.hour))] = (row.sales_count, Decimal(str(row.revenue)))
+
+    cells = {}
+    if days is not None:
+        cells = {(cell.weekday, cell.hour): cell for cell in SalesHeatmapCell.query.filter_by(user_id=tenant_id)}
+        stale = HourlySalesRollup.query.filter(
+            HourlySalesRollup.user_id == tenant_id, HourlySalesRollup.day.in_(days)
+        )
+        for row in stale:
+            cell = cells.get((row.day.weekday(), row.hour))
+            if cell is not None:
+                cell.sales_count -= row.sales_count
+                cell.revenue -= row.revenue
+    else:
+        db.session.execute(db.delete(SalesHeatmapCell).where(SalesHeatmapCell.user_id == tenant_id))
+
+    delete = db.delete(HourlySalesRollup).where(HourlySalesRollup.user_id == tenant_id)
+    if days is not None:
+        delete = delete.where(HourlySalesRollup.day.in_(days))
+    db.session.execute(delete)
+
+    for (day, hour), (sales_count, revenue) in fresh.items():
+        db.session.add(HourlySalesRollup(user_id=tenant_id, day=day, hour=hour, sales_count=sales_count, revenue=revenue))
+        cell = cells.get((day.weekday(), hour))
+        if cell is None:
+            cell = cells[(day.weekday(), hour)] = SalesHeatmapCell(
+                user_id=tenant_id, weekday=day.weekday(), hour=hour, sales_count=0, revenue=0
+            )
+            db.session.add(cell)
+        cell.sales_count += sales_count
+        cell.revenue += revenue
+
+
+def get_sales_heatmap(tenant_id):
+    """
+    Return the tenant's day-of-week by hour-of-day heatmap as 7 x 24 arrays of sales counts, revenue
+    and average ticket, read from the precomputed cells as they are. Reading never writes: changes not
+    yet folded in by the rollup refresh (scheduler or POST /rollups/refresh) are flagged with 'stale'.
+    """
+    pending = db.session.scalar(
+        db.select(db.func.count(RollupDirtyDay.id)).where(RollupDirtyDay.user_id.in_(tenant_user_ids(tenant_id)))
+    )
+    watermark = db.session.get(RollupWatermark, tenant_id)
+
+    counts = [[0] * 24 for _ in WEEKDAYS]
+    revenue = [[0.0] * 24 for _ in WEEKDAYS]
+    for cell in SalesHeatmapCell.query.filter_by(user_id=tenant_id):
+        counts[cell.weekday][cell.hour] = cell.sales_count
+        revenue[cell.weekday][cell.hour] = round(float(cell.revenue), 2)
+
+    return {
+        'stale': bool(pending) or watermark is None,
+        'refreshed_at': watermark.refreshed_at.strftime('%Y-%m-%d %H:%M:%S') if watermark else None,
+        'weekdays': WEEKDAYS,
+        'hours': HOURS,
+        'sales_count': counts,
+        'revenue': revenue,
+        'average_ticket': [
+            [round(revenue[day][hour] / counts[day][hour], 2) if counts[day][hour] else 0.0 for hour in HOURS]
+            for day in range(len(WEEKDAYS))
+        ],
+    }
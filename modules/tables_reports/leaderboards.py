@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from inventory_system import db
+from modules.products.models import Product
+from modules.sales.models import Sale, SaleItem
+from modules.tables_reports.report_helpers import tenant_user_ids
+from modules.users.models import User
+from modules.utils.cache import TTLCache
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+DEFAULT_WINDOW_DAYS = 30
+
+# Metrics each leaderboard can be ranked by; the first one is the default
+LEADERBOARD_METRICS = {
+    'products': ('revenue', 'units', 'margin'),
+    'customers': ('revenue', 'sales'),
+    'staff': ('revenue', 'sales'),
+}
+
+leaderboard_cache = TTLCache(ttl=300)
+
+
+def _sale_criteria(tenant, start_date, end_exclusive):
+    return [
+        Sale.user_id.in_(tenant),
+        Sale.created_at >= start_date,
+        Sale.created_at < end_exclusive,
+        db.func.coalesce(Sale.sale_status, '') != 'returned',
+    ]
+
+
+def _products_statement(tenant, start_date, end_exclusive):
+    """Revenue, units and margin per product from sale items."""
+    revenue = (SaleItem.quantity * SaleItem.price_per_unit
+               * (100 - db.func.coalesce(SaleItem.discount_percentage, 0)) / 100)
+    return db.select(
+        Product.product_id.label('key'),
+        Product.name.label('label'),
+        db.func.sum(revenue).label('revenue'),
+        db.func.sum(SaleItem.quantity).label('units'),
+        db.func.sum(revenue - SaleItem.quantity * db.func.coalesce(Product.cost_price, 0)).label('margin'),
+    ).select_from(SaleItem).join(
+        Sale, Sale.id == SaleItem.sale_id
+    ).join(
+        Product, Product.product_id == SaleItem.product_id
+    ).where(*_sale_criteria(tenant, start_date, end_exclusive)).group_by(Product.product_id, Product.name)
+
+
+def _customers_statement(tenant, start_date, end_exclusive):
+    """Revenue and number of sales per customer name; unnamed sales are grouped as walk-in."""
+    customer = db.func.coalesce(db.func.nullif(Sale.customer_name, ''), 'Walk-in customer')
+    return db.select(
+        customer.label('key'),
+        customer.label('label'),
+        db.func.sum(Sale.total_price).label('revenue'),
+        db.func.count(Sale.id).label('sales'),
+    ).where(*_sale_criteria(tenant, start_date, end_exclusive)).group_by(customer)
+
+
+def _staff_statement(tenant, start_date, end_exclusive):
+    """Revenue and number of sales per user who recorded them."""
+    return db.select(
+        User.id.label('key'),
+        User.username.label('label'),
+        db.func.sum(Sale.total_price).label('revenue'),
+        db.func.count(Sale.id).label('sales'),
+    ).select_from(Sale).join(
+        User, User.id == Sale.user_id
+    ).where(*_sale_criteria(tenant, start_date, end_exclusive)).group_by(User.id, User.username)
+
+
+LEADERBOARD_STATEMENTS = {
+    'products': _products_statement,
+    'customers': _customers_statement,
+    'staff': _staff_statement,
+}
+
+
+def _leaderboard_statement(board, metric, tenant_id, start_date, end_exclusive, limit):
+    """
+    Rank the grouped rows with ORDER BY ... LIMIT; window sums over the whole grouping carry the
+    grand totals past the LIMIT so the "Others" bucket needs no second query.
+    """
+    grouped = LEADERBOARD_STATEMENTS[board](tenant_user_ids(tenant_id), start_date, end_exclusive).subquery('grouped')
+    totals = [db.func.sum(grouped.c[name]).over().label(f'total_{name}') for name in LEADERBOARD_METRICS[board]]
+    return db.select(
+        grouped, *totals, db.func.count().over().label('entries')
+    ).order_by(grouped.c[metric].desc(), grouped.c.label).limit(limit)
+
+
+def _compute_leaderboard(board, metric, tenant_id, start_date, end_date, limit):
+    """Run the ranking query and append the remainder as an "Others" entry."""
+    metrics = LEADERBOARD_METRICS[board]
+    rows = db.session.execute(
+        _leaderboard_statement(board, metric, tenant_id, start_date, end_date + timedelta(days=1), limit)
+    ).mappings().all()
+
+    entries = [
+        {'rank': index + 1, 'key': row['key'], 'label': row['label'],
+         **{name: round(float(row[name] or 0), 2) for name in metrics}}
+        for index, row in enumerate(rows)
+    ]
+    others = None
+    if rows and rows[0]['entries'] > len(rows):
+        others = {
+            'label': 'Others',
+            'count': rows[0]['entries'] - len(rows),
+            **{name: round(float(rows[0][f'total_{name}'] or 0) - sum(entry[name] for entry in entries), 2)
+               for name in metrics},
+        }
+    return {
+        'board': board,
+        'metric': metric,
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'entries': entries,
+        'others': others,
+    }
+
+
+def get_leaderboard(tenant_id, board, metric=None, limit=DEFAULT_LIMIT, start_date=None, end_date=None):
+    """
+    Return the top N products, customers or staff for a window (default: the last 30 days) ranked by
+    a metric, with everything below the cut folded into "Others". Cached per tenant, board, metric,
+    limit and window for ANALYTICS_CACHE_TTL seconds.
+    """
+    if board not in LEADERBOARD_METRICS:
+        raise ValueError(f"Unknown leaderboard: {board}")
+    metric = metric or LEADERBOARD_METRICS[board][0]
+    if metric not in LEADERBOARD_METRICS[board]:
+        raise ValueError(f"Unknown metric for {board}: {metric}")
+    limit = max(1, min(int(limit), MAX_LIMIT))
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end_date = end_date or today
+    start_date = start_date or end_date - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+
+    return leaderboard_cache.get_or_set(
+        (tenant_id, 'leaderboard', board, metric, limit, start_date, end_date),
+        lambda: _compute_leaderboard(board, metric, tenant_id, start_date, end_date, limit),
+        ttl=current_app.config.get('ANALYTICS_CACHE_TTL', 300)
+    )
@@ -0,0 +1,212 @@
+import json
+import threading
+import time
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from inventory_system import db
+from modules.inventory.models import Inventory
+from modules.products.models import InventoryMovement, Product
+from modules.sales.models import Sale, SaleItem
+from modules.tables_reports.dashboard_metrics import _count, _total
+from modules.tables_reports.report_helpers import tenant_user_ids
+
+# Writes to these models can move the live tiles
+LIVE_MODELS = (Sale, SaleItem, Inventory, InventoryMovement, Product)
+
+
+class _TenantChannel:
+    """Shared state of one tenant's live connections: a change counter and the last computed tiles."""
+
+    def __init__(self, user_ids):
+        self.user_ids = set(user_ids)
+        self.subscribers = 0
+        self.version = 0
+        self.snapshot = None
+        self.snapshot_version = -1
+        self.snapshot_day = None
+        self.snapshot_at = 0.0
+        self.changed = threading.Condition()
+        self.compute_lock = threading.Lock()
+
+
+class DashboardEventBus:
+    """
+    In-process fan-out of "tenant data changed" signals to that tenant's open dashboard streams.
+    Publishing only bumps a counter, so a burst of commits costs nothing until a stream wakes up.
+    Only commits made by this process are seen; streams also re-read their tiles on a timer to pick
+    up writes from other web workers and the scheduler.
+    """
+
+    def __init__(self):
+        self._channels = {}  # tenant id -> _TenantChannel
+        self._user_tenants = {}  # user id -> tenant id, for subscribed tenants only
+        self._lock = threading.Lock()
+        self.open_streams = 0
+
+    def reserve_stream(self, max_streams):
+        """Claim one of this process's stream slots; False when max_streams are already open."""
+        with self._lock:
+            if self.open_streams >= max_streams:
+                return False
+            self.open_streams += 1
+            return True
+
+    def release_stream(self):
+        with self._lock:
+            self.open_streams = max(0, self.open_streams - 1)
+
+    def subscribe(self, tenant_id, user_ids):
+        with self._lock:
+            channel = self._channels.get(tenant_id)
+            if channel is None:
+                channel = self._channels[tenant_id] = _TenantChannel(user_ids)
+            channel.user_ids.update(user_ids)
+            for user_id in channel.user_ids:
+                self._user_tenants[user_id] = tenant_id
+            channel.subscribers += 1
+            return channel
+
+    def unsubscribe(self, tenant_id):
+        with self._lock:
+            channel = self._channels.get(tenant_id)
+            if channel is None:
+                return
+            channel.subscribers -= 1
+            if channel.subscribers <= 0:
+                del self._channels[tenant_id]
+                for user_id in channel.user_ids:
+                    self._user_tenants.pop(user_id, None)
+
+    def publish(self, user_ids):
+        """Signal that data owned by these users changed; users of unwatched tenants are ignored."""
+        with self._lock:
+            channels = {self._channels[self._user_tenants[user_id]]
+                        for user_id in user_ids if user_id in self._user_tenants}
+        for channel in channels:
+            with channel.changed:
+                channel.version += 1
+                channel.changed.notify_all()
+
+
+dashboard_bus = DashboardEventBus()
+
+
+def _owner_ids(session, obj):
+    if isinstance(obj, SaleItem):
+        sale = obj.sale if 'sale' in obj.__dict__ else session.get(Sale, obj.sale_id) if obj.sale_id else None
+        return [sale.user_id] if sale is not None else []
+    return [obj.user_id] if getattr(obj, 'user_id', None) is not None else []
+
+
+def _collect_changes(session, flush_context):
+    """after_flush: remember which users' live data changed in this transaction."""
+    changed = session.info.setdefault('live_dashboard_users', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, LIVE_MODELS):
+            changed.update(_owner_ids(session, obj))
+
+
+def _publish_changes(session):
+    """after_commit: wake the affected tenants' streams."""
+    changed = session.info.pop('live_dashboard_users', None)
+    if changed:
+        dashboard_bus.publish(changed)
+
+
+def _discard_changes(session):
+    session.info.pop('live_dashboard_users', None)
+
+
+def register_live_dashboard_events():
+    """Hook the session events that feed the dashboard bus (idempotent)."""
+    for name, listener in (('after_flush', _collect_changes), ('after_commit', _publish_changes),
+                           ('after_rollback', _discard_changes)):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+def _live_metrics_statement(tenant_id, today):
+    """Today's completed revenue and units sold, and the low-stock count, in one SELECT."""
+    tenant = tenant_user_ids(tenant_id)
+    today_sales = [Sale.sale_status == 'completed', Sale.created_at >= today]
+    units = db.select(db.func.coalesce(db.func.sum(SaleItem.quantity), 0)).join(
+        Sale, Sale.id == SaleItem.sale_id
+    ).where(Sale.user_id.in_(tenant), *today_sales).scalar_subquery()
+    return db.select(
+        _total(Sale.total_price, Sale, tenant, *today_sales).label('today_revenue'),
+        units.label('today_units'),
+        _count(Sale, tenant, *today_sales).label('today_sales'),
+        _count(Inventory, tenant, Inventory.stock_quantity <= Inventory.reorder_threshold).label('low_stock_count'),
+    )
+
+
+def get_live_metrics(tenant_id):
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    row = db.session.execute(_live_metrics_statement(tenant_id, today)).one()._mapping
+    return {
+        'today_revenue': round(float(row['today_revenue']), 2),
+        'today_units': int(row['today_units']),
+        'today_sales': row['today_sales'],
+        'low_stock_count': row['low_stock_count'],
+    }
+
+
+def _channel_snapshot(channel, tenant_id, max_age=None):
+    """
+    Tiles for the channel's current version (or a new day, or once older than `max_age` seconds);
+    computed once and shared by every connection.
+    """
+    with channel.compute_lock:
+        today = datetime.now().date()
+        expired = max_age is not None and time.monotonic() - channel.snapshot_at >= max_age
+        if channel.snapshot is None or channel.snapshot_version != channel.version \
+                or channel.snapshot_day != today or expired:
+            version = channel.version
+            try:
+                channel.snapshot = get_live_metrics(tenant_id)
+            finally:
+                db.session.close()  # Do not hold a pooled connection for the life of the stream
+            channel.snapshot_version, channel.snapshot_day = version, today
+            channel.snapshot_at = time.monotonic()
+        return channel.snapshot
+
+
+def _sse(event_name, payload):
+    return f"event: {event_name}\ndata: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+
+def stream_live_metrics(tenant_id, interval=2, heartbeat=15, max_duration=300, poll=10):
+    """
+    Server-Sent Events for a tenant's live tiles: a full snapshot first, then only the tiles that
+    changed. Commits made in this process wake the stream at once and are coalesced into at most one
+    update per `interval` seconds; writes from other processes are picked up by re-reading the tiles
+    every `poll` seconds. Idle streams send a comment every `heartbeat` seconds. Streams end after
+    `max_duration` and the browser reconnects.
+    """
+    channel = dashboard_bus.subscribe(tenant_id, db.session.scalars(tenant_user_ids(tenant_id)).all())
+    try:
+        started = last_sent_at = last_write_at = time.monotonic()
+        seen_version = channel.version
+        sent = _channel_snapshot(channel, tenant_id)
+        yield f"retry: {int(interval * 1000)}\n" + _sse('snapshot', sent)
+
+        while time.monotonic() - started < max_duration:
+            timeout = max(0.1, min(poll, heartbeat - (time.monotonic() - last_write_at)))
+            with channel.changed:
+                changed = channel.changed.wait_for(lambda: channel.version != seen_version, timeout=timeout)
+            if changed:
+                # Coalesce: at most one update per interval, whatever the number of commits
+                time.sleep(max(0, interval - (time.monotonic() - last_sent_at)))
+            seen_version = channel.version
+            snapshot = _channel_snapshot(channel, tenant_id, max_age=poll)
+            delta = {key: value for key, value in snapshot.items() if sent.get(key) != value}
+            if delta:
+                yield _sse('delta', delta)
+                sent = snapshot
+                last_sent_at = last_write_at = time.monotonic()
+            elif time.monotonic() - last_write_at >= heartbeat:
+                yield ": keepalive\n\n"
+                last_write_at = time.monotonic()
+    finally:
+        dashboard_bus.unsubscribe(tenant_id)
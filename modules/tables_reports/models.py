@@ -13,9 +13,11 @@ class ReportHistory(db.Model):
     status = db.Column(db.String(50), default='completed')  # Status of report generation ('completed', 'failed')
     format = db.Column(db.String(10), nullable=False)  # Format of the report ('pdf' or 'excel')
     generated_by = db.Column(db.String(255), nullable=True)  # Optional: User who generated the report
+    artifact_id = db.Column(db.Integer, db.ForeignKey('report_artifacts.id'), nullable=True)  # Stored file, shared by identical outputs
 
     # Relationship back to User for easy querying
     user = db.relationship('User', backref='report_history', lazy=True)
+    artifact = db.relationship('ReportArtifact', backref='history_entries', lazy=True)
 
     def to_dict(self):
         """Convert the ReportHistory instance to a dictionary."""
@@ -27,7 +29,38 @@ class ReportHistory(db.Model):
             "file_path": self.file_path,
             "status": self.status,
             "format": self.format,
-            "generated_by": self.generated_by
+            "generated_by": self.generated_by,
+            "artifact_id": self.artifact_id
+        }
+
+class ReportArtifact(db.Model):
+    """A stored report file, addressed by the SHA-256 of its content within a tenant."""
+    __tablename__ = 'report_artifacts'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False, index=True)  # Owning tenant
+    content_hash = db.Column(db.String(64), nullable=False)  # SHA-256 hex digest of the file
+    extension = db.Column(db.String(10), nullable=False)  # File extension, e.g. 'pdf' or 'xlsx'
+    file_path = db.Column(db.String(255), nullable=False)  # Tenant-namespaced, content-hashed path
+    file_size = db.Column(db.BigInteger, nullable=False, default=0)  # Size in bytes, used for quota accounting
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_accessed_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Drives LRU eviction
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'content_hash', 'extension', name='uq_report_artifacts_user_hash'),
+    )
+
+    def to_dict(self):
+        """Convert the ReportArtifact instance to a dictionary."""
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "content_hash": self.content_hash,
+            "extension": self.extension,
+            "file_path": self.file_path,
+            "file_size": self.file_size,
+            "created_at": self.created_at,
+            "last_accessed_at": self.last_accessed_at
         }
 
 class ReportSettings(db.Model):
@@ -41,6 +74,7 @@ class ReportSettings(db.Model):
     email_recipients = db.Column(db.Text, nullable=True)  # List of email addresses for scheduled reports
     format = db.Column(db.String(10), default='pdf')  # Default format for the report (PDF or Excel)
     is_enabled = db.Column(db.Boolean, default=True)  # Toggle for enabling/disabling this report
+    last_sent_at = db.Column(db.DateTime, nullable=True, index=True)  # Last successful scheduled delivery
 
     # Relationship back to User for easy querying
     user = db.relationship('User', backref='report_settings', lazy=True)
@@ -54,5 +88,112 @@ class ReportSettings(db.Model):
             "schedule": self.schedule,
             "email_recipients": self.email_recipients.split(",") if self.email_recipients else [],
             "format": self.format,
-            "is_enabled": self.is_enabled
+            "is_enabled": self.is_enabled,
+            "last_sent_at": self.last_sent_at
+        }
+
+class DailyRollup(db.Model):
+    """Per-tenant, per-day totals that reports read instead of scanning the raw ledgers."""
+    __tablename__ = 'daily_rollups'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Tenant (admin) the day belongs to
+    day = db.Column(db.Date, nullable=False)
+    sales_count = db.Column(db.Integer, nullable=False, default=0)  # Sales created that day, returned sales excluded
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    profit = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    units_sold = db.Column(db.Integer, nullable=False, default=0)
+    expenses = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # Expenses incurred that day
+    returned_count = db.Column(db.Integer, nullable=False, default=0)
+    returned_quantity = db.Column(db.Integer, nullable=False, default=0)
+    receivables_due = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # Receivable amounts falling due that day
+    sales_net = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # VAT report figures, each line rounded as exported
+    output_vat = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    purchases_gross = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    input_vat = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    vat_rate = db.Column(db.Float, nullable=True)  # Rate the VAT figures were computed at; NULL before they were
+    refreshed_at = db.Column(db.DateTime, default=datetime.now)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_daily_rollups_user_day'),
+    )
+
+    def to_dict(self):
+        """Convert the DailyRollup instance to a dictionary."""
+        return {
+            "day": self.day.strftime('%Y-%m-%d'),
+            "sales_count": self.sales_count,
+            "revenue": float(self.revenue),
+            "profit": float(self.profit),
+            "units_sold": self.units_sold,
+            "expenses": float(self.expenses),
+            "returned_count": self.returned_count,
+            "returned_quantity": self.returned_quantity,
+            "receivables_due": float(self.receivables_due)
         }
+
+class RollupDirtyDay(db.Model):
+    """A day whose rollup is stale because a sale, expense, return or receivable on it was written."""
+    __tablename__ = 'rollup_dirty_days'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # Refresh clears ids up to the highest one it read
+    user_id = db.Column(db.Integer, nullable=False, index=True)  # User who wrote the row; resolved to its tenant on refresh
+    day = db.Column(db.Date, nullable=False)
+    marked_at = db.Column(db.DateTime, default=datetime.now)
+
+class RollupWatermark(db.Model):
+    """When a tenant's rollups were last brought up to date."""
+    __tablename__ = 'rollup_watermarks'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)  # Tenant (admin)
+    refreshed_at = db.Column(db.DateTime, nullable=False)  # Every write before this time is reflected in the rollups
+    days_refreshed = db.Column(db.Integer, default=0)  # Days recomputed by the last refresh
+
+    def to_dict(self):
+        """Convert the RollupWatermark instance to a dictionary."""
+        return {
+            "user_id": self.user_id,
+            "refreshed_at": self.refreshed_at,
+            "days_refreshed": self.days_refreshed
+        }
+
+class DailySketch(db.Model):
+    """Compact per-tenant, per-day sketches behind the approximate metrics; merged for any date range."""
+    __tablename__ = 'daily_sketches'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Tenant (admin) the day belongs to
+    day = db.Column(db.Date, nullable=False)
+    customers = db.Column(db.LargeBinary, nullable=False)  # HyperLogLog of customer names
+    ticket_values = db.Column(db.LargeBinary, nullable=False)  # t-digest of sale totals
+    basket_sizes = db.Column(db.LargeBinary, nullable=False)  # t-digest of units per sale
+    refreshed_at = db.Column(db.DateTime, default=datetime.now)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', name='uq_daily_sketches_user_day'),
+    )
+
+class HourlySalesRollup(db.Model):
+    """Completed sales per tenant, day and hour; kept so a refreshed day can be backed out of the heatmap."""
+    __tablename__ = 'hourly_sales_rollups'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)  # Tenant (admin)
+    day = db.Column(db.Date, nullable=False)
+    hour = db.Column(db.SmallInteger, nullable=False)  # 0-23
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', 'hour', name='uq_hourly_sales_user_day_hour'),
+    )
+
+class SalesHeatmapCell(db.Model):
+    """One cell of a tenant's all-time day-of-week by hour-of-day sales heatmap (at most 7 x 24 rows)."""
+    __tablename__ = 'sales_heatmap_cells'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)  # Tenant (admin)
+    weekday = db.Column(db.SmallInteger, primary_key=True)  # 0 = Monday
+    hour = db.Column(db.SmallInteger, primary_key=True)  # 0-23
+    sales_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
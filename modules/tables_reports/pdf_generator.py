@@ -1,22 +1,315 @@
+import io
+import math
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal
 from fpdf import FPDF
-from datetime import datetime
+from pypdf import PdfWriter
+from flask import current_app
+from modules.tables_reports.report_helpers import calculate_profit_and_loss, profit_loss_lines
+from modules.tables_reports.report_queries import stream_report_rows, count_report_rows
+from modules.tables_reports.report_storage import build_report_path
 
-def generate_pdf(report_type, data):
-    """Generate a PDF file for the specified report."""
-    pdf = FPDF()
+# Landscape A4 page layout, in millimetres
+PAGE_HEIGHT = 210
+MARGIN = 10
+TITLE_HEIGHT = 10
+ROW_HEIGHT = 6
+FOOTER_HEIGHT = 10
+
+# Body rows per page; one row of space is always kept free for the totals row
+ROWS_PER_PAGE = int((PAGE_HEIGHT - 2 * MARGIN - TITLE_HEIGHT - FOOTER_HEIGHT) // ROW_HEIGHT) - 2
+
+# Reports longer than PARALLEL_PAGE_THRESHOLD pages are split into page ranges
+# of PAGES_PER_CHUNK pages, rendered in a process pool and concatenated
+PAGES_PER_CHUNK = 40
+PARALLEL_PAGE_THRESHOLD = 2 * PAGES_PER_CHUNK
+
+# Column definitions per report: (header, row key, width in mm, cell type, included in totals row)
+PDF_COLUMNS = {
+    'sales': [
+        ('Sale ID', 'sale_id', 14, 'int', False),
+        ('Sale Date', 'sale_date', 28, 'datetime', False),
+        ('Customer', 'customer_name', 42, 'text', False),
+        ('Product', 'product_name', 56, 'text', False),
+        ('Qty', 'quantity', 14, 'int', True),
+        ('Unit Price', 'unit_price', 24, 'money', False),
+        ('Disc. %', 'discount_percentage', 16, 'percent', False),
+        ('Line Total', 'line_total', 26, 'money', True),
+        ('Sale Total', 'total_price', 26, 'money', False),
+        ('Status', 'sale_status', 22, 'text', False),
+    ],
+    'inventory': [
+        ('Product Name', 'product_name', 70, 'text', False),
+        ('SKU', 'sku', 40, 'text', False),
+        ('Stock', 'stock_quantity', 24, 'int', True),
+        ('Reorder At', 'reorder_threshold', 26, 'int', False),
+        ('Unit Price', 'unit_price', 28, 'money', False),
+        ('Cost Price', 'cost_price', 28, 'money', False),
+        ('Last Updated', 'updated_at', 34, 'datetime', False),
+    ],
+    'receivables': [
+        ('Receivable ID', 'receivable_id', 28, 'int', False),
+        ('Customer', 'customer_name', 90, 'text', False),
+        ('Amount Due', 'amount_due', 40, 'money', True),
+        ('Due Date', 'due_date', 36, 'date', False),
+        ('Status', 'status', 36, 'text', False),
+    ],
+    'payables': [
+        ('Payable ID', 'payable_id', 28, 'int', False),
+        ('Supplier', 'supplier_name', 90, 'text', False),
+        ('Amount Due', 'amount_due', 40, 'money', True),
+        ('Due Date', 'due_date', 36, 'date', False),
+        ('Status', 'status', 36, 'text', False),
+    ],
+    'expenses': [
+        ('Expense ID', 'expense_id', 20, 'int', False),
+        ('Date', 'date_incurred', 28, 'date', False),
+        ('Category', 'category', 40, 'text', False),
+        ('Description', 'description', 100, 'text', False),
+        ('Amount', 'amount', 30, 'money', True),
+        ('Type', 'expense_type', 28, 'text', False),
+        ('Payment', 'payment_status', 28, 'text', False),
+    ],
+    'returned_damaged': [
+        ('Item ID', 'item_id', 20, 'int', False),
+        ('Date Returned', 'return_date', 30, 'date', False),
+        ('Product', 'product_name', 80, 'text', False),
+        ('Qty', 'quantity', 20, 'int', True),
+        ('Reason', 'reason', 90, 'text', False),
+        ('Cost Impact', 'cost_impact', 32, 'money', True),
+    ],
+}
+
+SUMMARY_COLUMNS = [
+    ('Line Item', 'label', 150, 'text', False),
+    ('Amount', 'amount', 50, 'money', False),
+]
+
+
+def _pdf_text(value):
+    """FPDF core fonts only support latin-1, so replace anything outside it."""
+    return str(value).encode('latin-1', 'replace').decode('latin-1')
+
+
+def _format_value(value, cell_type):
+    """Format a raw row value for display in a table cell."""
+    if value is None:
+        return ''
+    if cell_type == 'money':
+        return f"{float(value):,.2f}"
+    if cell_type == 'percent':
+        return f"{float(value):.2f}"
+    if cell_type == 'datetime' and isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M')
+    if cell_type == 'date' and isinstance(value, (date, datetime)):
+        return value.strftime('%Y-%m-%d')
+    return _pdf_text(value)
+
+
+def _format_row(row, columns):
+    return tuple(_format_value(row.get(key), cell_type) for _, key, _, cell_type, _ in columns)
+
+
+def _totals_row(columns, totals):
+    """Build the formatted totals row; the first column carries the label."""
+    cells = []
+    for index, (_, key, _, cell_type, totalled) in enumerate(columns):
+        if totalled:
+            cells.append(_format_value(totals[key], cell_type))
+        else:
+            cells.append('Total' if index == 0 else '')
+    return tuple(cells)
+
+
+def _align(cell_type):
+    return 'R' if cell_type in ('int', 'money', 'percent') else 'L'
+
+
+class ReportPDF(FPDF):
+    """Tabular report page layout with a title, repeated column headers and page numbering."""
+
+    def __init__(self, title, columns, first_page=1, total_pages=1):
+        super().__init__(orientation='L', unit='mm', format='A4')
+        self.report_title = title
+        self.columns = columns
+        self.first_page = first_page
+        self.total_pages = total_pages
+        self.set_margins(MARGIN, MARGIN, MARGIN)
+        self.set_auto_page_break(False)
+        self.set_font('Arial', '', 8)
+
+    def header(self):
+        self.set_font('Arial', 'B', 14)
+        self.cell(0, TITLE_HEIGHT, self.report_title, 0, 1, 'C')
+        self.set_font('Arial', 'B', 8)
+        self.set_fill_color(230, 230, 230)
+        for name, _, width, cell_type, _ in self.columns:
+            self.cell(width, ROW_HEIGHT, name, 1, 0, _align(cell_type), 1)
+        self.ln(ROW_HEIGHT)
+
+    def footer(self):
+        self.set_y(-MARGIN - FOOTER_HEIGHT / 2)
+        self.set_font('Arial', 'I', 8)
+        page_number = self.first_page + self.page_no() - 1
+        self.cell(0, FOOTER_HEIGHT / 2, f"Page {page_number} of {self.total_pages}", 0, 0, 'C')
+
+    def fit_text(self, text, width):
+        """Truncate text with an ellipsis so it fits inside a cell."""
+        if not text or self.get_string_width(text) <= width - 2:
+            return text
+        while text and self.get_string_width(text + '...') > width - 2:
+            text = text[:-1]
+        return text + '...'
+
+    def table_row(self, values, bold=False):
+        if bold:
+            self.set_font('Arial', 'B', 8)
+            self.set_fill_color(245, 245, 245)
+        for value, (_, _, width, cell_type, _) in zip(values, self.columns):
+            if cell_type == 'text':
+                value = self.fit_text(value, width)
+            self.cell(width, ROW_HEIGHT, value, 1, 0, _align(cell_type), 1 if bold else 0)
+        self.ln(ROW_HEIGHT)
+        if bold:
+            self.set_font('Arial', '', 8)
+
+
+def _render_pages(title, columns, rows, first_page, total_pages, totals=None):
+    """
+    Render a contiguous range of report pages and return the PDF bytes.
+    Runs in worker processes, so it only receives plain, already-formatted rows.
+    """
+    pdf = ReportPDF(title, columns, first_page, total_pages)
     pdf.add_page()
-    pdf.set_font("Arial", size=12)
+    for index, row in enumerate(rows):
+        if index and index % ROWS_PER_PAGE == 0:
+            pdf.add_page()
+        pdf.table_row(row)
+    if totals is not None:
+        pdf.table_row(totals, bold=True)
 
-    # Header based on report type
-    pdf.cell(200, 10, txt=f"{report_type.capitalize()} Report", ln=True, align='C')
-    pdf.ln(10)
+    output = pdf.output(dest='S')
+    return output.encode('latin-1') if isinstance(output, str) else bytes(output)
 
-    if isinstance(data, list):  # Handle data if it's a list
-        for item in data:
-            pdf.cell(0, 10, txt=str(item), ln=True)  # Convert each item to a string for display
+
+def _page_chunks(rows, columns, chunk_pages=None):
+    """
+    Format streamed rows into page-aligned chunks, accumulating totals on the way.
+    Yields (first_page, rows, totals_row) with totals_row only set on the final chunk.
+    """
+    chunk_size = chunk_pages * ROWS_PER_PAGE if chunk_pages else None
+    totals = {key: Decimal('0') for _, key, _, _, totalled in columns if totalled}
+    chunk, first_page, pending = [], 1, None
+
+    for row in rows:
+        for key in totals:
+            totals[key] += Decimal(str(row.get(key) or 0))
+        chunk.append(_format_row(row, columns))
+        if chunk_size and len(chunk) == chunk_size:
+            if pending:
+                yield pending
+            pending = (first_page, chunk, None)
+            first_page += chunk_pages
+            chunk = []
+
+    totals_row = _totals_row(columns, totals) if totals else None
+    if chunk or not pending:
+        if pending:
+            yield pending
+        yield first_page, chunk, totals_row
+    else:
+        yield pending[0], pending[1], totals_row
+
+
+def _report_title(report_type, start_date=None, end_date=None):
+    title = f"{report_type.replace('_', ' ').title()} Report"
+    if start_date or end_date:
+        start = start_date.strftime('%Y-%m-%d') if start_date else '...'
+        end = end_date.strftime('%Y-%m-%d') if end_date else '...'
+        title += f" ({start} to {end})"
+    return title
+
+
+def _write_chunks_in_pool(pdf_output, title, columns, chunks, total_pages, pool=None):
+    """
+    Render page ranges in a bounded process pool and concatenate them in page order.
+    Callers rendering several reports at once pass a shared pool; otherwise one is started for this report.
+    """
+    workers = current_app.config.get('REPORT_PDF_WORKERS') or os.cpu_count() or 2
+    if pool is None:
+        with ProcessPoolExecutor(max_workers=workers) as own_pool:
+            return _write_chunks_in_pool(pdf_output, title, columns, chunks, total_pages, own_pool)
+
+    writer = PdfWriter()
+    in_flight = deque()
+    for first_page, rows, totals in chunks:
+        # Keep at most two chunks per worker queued so memory stays bounded
+        if len(in_flight) >= workers * 2:
+            writer.append(io.BytesIO(in_flight.popleft().result()))
+        in_flight.append(pool.submit(_render_pages, title, columns, rows, first_page, total_pages, totals))
+    while in_flight:
+        writer.append(io.BytesIO(in_flight.popleft().result()))
+
+    writer.write(pdf_output)
+
+
+def render_report_pdf(report_type, user_id, start_date=None, end_date=None, summary=None, pool=None):
+    """
+    Render a paginated tabular PDF for a report into the tenant's report storage.
+    Large reports are split into page ranges rendered in parallel, in `pool` when one is given.
+    A precomputed profit and loss summary can be passed in to avoid recalculating it.
+    """
+    title = _report_title(report_type, start_date, end_date)
+    pdf_output = build_report_path(user_id, report_type, 'pdf')
+
+    if report_type == 'profit_loss':
+        if summary is None:
+            summary = calculate_profit_and_loss(user_id, start_date, end_date)
+        rows = [_format_row(line, SUMMARY_COLUMNS) for line in profit_loss_lines(summary)]
+        with open(pdf_output, 'wb') as fp:
+            fp.write(_render_pages(title, SUMMARY_COLUMNS, rows, 1, 1))
+        return pdf_output
+
+    if report_type not in PDF_COLUMNS:
+        raise ValueError("Unknown report type specified.")
+
+    columns = PDF_COLUMNS[report_type]
+    row_count = count_report_rows(report_type, user_id, start_date, end_date)
+    total_pages = max(1, math.ceil(row_count / ROWS_PER_PAGE))
+    rows = stream_report_rows(report_type, user_id, start_date, end_date)
+
+    if total_pages <= PARALLEL_PAGE_THRESHOLD:
+        for first_page, chunk, totals in _page_chunks(rows, columns):
+            with open(pdf_output, 'wb') as fp:
+                fp.write(_render_pages(title, columns, chunk, first_page, total_pages, totals))
     else:
-        pdf.cell(0, 10, txt="No data available.", ln=True)
+        _write_chunks_in_pool(pdf_output, title, columns, _page_chunks(rows, columns, PAGES_PER_CHUNK), total_pages, pool)
+
+    return pdf_output
+
+
+def generate_pdf(report_type, data, user_id):
+    """Render already-fetched report data (a list of dictionaries or a summary dictionary) as a tabular PDF."""
+    if isinstance(data, dict):
+        columns = SUMMARY_COLUMNS
+        rows = list(profit_loss_lines(data))
+    else:
+        rows = list(data or [])
+        keys = list(rows[0].keys()) if rows else []
+        columns = [column for column in PDF_COLUMNS.get(report_type, []) if column[1] in keys]
+        if not columns and keys:
+            width = 277 // len(keys)
+            columns = [(key.replace('_', ' ').title(), key, width, 'text', False) for key in keys]
+        if not columns:
+            columns = [('No data available.', 'none', 277, 'text', False)]
+
+    formatted = [_format_row(row, columns) for row in rows]
+    total_pages = max(1, math.ceil(len(formatted) / ROWS_PER_PAGE))
 
-    pdf_output = f"{report_type}_report_{datetime.now().strftime('%Y%m%d')}.pdf"
-    pdf.output(pdf_output)
+    pdf_output = build_report_path(user_id, report_type, 'pdf')
+    with open(pdf_output, 'wb') as fp:
+        fp.write(_render_pages(_report_title(report_type), columns, formatted, 1, total_pages))
     return pdf_output
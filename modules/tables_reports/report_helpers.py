@@ -8,13 +8,25 @@ from modules.accounts_receivable.models import AccountsReceivable
 from modules.expenses.models import Expense, OtherIncome
 from inventory_system import db
 from datetime import datetime
-from sqlalchemy import and_
+from sqlalchemy import and_, or_
 from modules.suppliers.models import AccountsPayable, Supplier
 from modules.ReturnedDamagedItem.models import ReturnedDamagedItem
 from decimal import Decimal
 from flask import current_app
+import heapq
 import traceback
 
+# Slices shown in pie charts before the remainder is folded into "Others"
+PIE_CHART_TOP_N = 10
+
+def tenant_user_ids(user_id):
+    """
+    Returns a subquery selecting the owner account and all staff accounts of a tenant.
+    """
+    from modules.users.models import User  # Import here to avoid circular imports
+    return db.select(User.id).where(or_(User.id == user_id, User.parent_id == user_id))
+
+
 def get_time_range(period):
     """
     Returns the start and end dates for a given period (month, quarter, year).
@@ -133,7 +145,7 @@ def fetch_receivables_data(user_id, start_date=None, end_date=None):
     receivables = query.all()
     return [{
         'date': receivable.due_date.strftime('%Y-%m-%d'),
-        'amount': float(receivable.amount),
+        'amount': float(receivable.amount_due),
         'status': receivable.status
     } for receivable in receivables]
 
@@ -202,22 +214,12 @@ def fetch_other_expenses(user_id, start_date=None, end_date=None):
         return []
 
 
-def calculate_inventory_turnover(user_id):
+def calculate_inventory_turnover(user_id, start_date=None, end_date=None):
     """
-    Calculate the inventory turnover rate for a specific user.
+    Calculate the inventory turnover rate (COGS / average inventory value) for a window, by default the last 30 days.
     """
-    # Sum up the quantity of all sale items for the given user
-    total_sales_quantity = (
-                               db.session.query(db.func.sum(SaleItem.quantity))
-                               .join(Sale, Sale.id == SaleItem.sale_id)
-                               .filter(Sale.user_id == user_id)
-                               .scalar()
-                           ) or 0
-
-    # Sum the inventory stock quantity
-    total_inventory = db.session.query(db.func.sum(Inventory.stock_quantity)).filter_by(user_id=user_id).scalar() or 1
-
-    return round(total_sales_quantity / total_inventory, 2)
+    from modules.tables_reports.turnover import get_inventory_turnover  # Import here to avoid circular imports
+    return get_inventory_turnover(user_id, start_date, end_date)['overall_turnover']
 
 
 def calculate_profit_margin(user_id, start_date=None, end_date=None):
@@ -346,6 +348,27 @@ def calculate_profit_and_loss(user_id, start_date=None, end_date=None):
         current_app.logger.error(traceback.format_exc())
         return None
 
+def profit_loss_lines(profit_loss_data):
+    """Flatten the profit and loss structure into summary rows of label/amount pairs."""
+    if not profit_loss_data:
+        return
+
+    revenue = profit_loss_data['revenue']
+    yield {'label': 'Gross Sales', 'amount': revenue['gross_sales']}
+    yield {'label': 'Returns', 'amount': revenue['returns']}
+    yield {'label': 'Net Sales', 'amount': revenue['net_sales']}
+    yield {'label': 'Gross Profit', 'amount': profit_loss_data['gross_profit']}
+
+    operating_expenses = profit_loss_data['operating_expenses']
+    for category, amount in operating_expenses.items():
+        if category != 'total':
+            yield {'label': f"Expense: {category}", 'amount': amount}
+    yield {'label': 'Total Operating Expenses', 'amount': operating_expenses.get('total', 0)}
+    yield {'label': 'Operating Profit', 'amount': profit_loss_data['operating_profit']}
+    yield {'label': 'Other Items', 'amount': profit_loss_data['other_items']['total']}
+    yield {'label': 'Net Profit', 'amount': profit_loss_data['net_profit']}
+
+
 def fetch_data_for_report(report_type, user_id, start_date=None, end_date=None):
     if report_type == 'sales':
         return fetch_sales_data(user_id, start_date, end_date)
@@ -364,46 +387,90 @@ def fetch_data_for_report(report_type, user_id, start_date=None, end_date=None):
     else:
         raise ValueError("Unknown report type specified.")
 
-def fetch_returned_damaged_data(user_id, start_date=None, end_date=None):
+def fetch_returned_damaged_data(user_id, start_date=None, end_date=None, page=1, per_page=50):
     """
     Fetches data for returned and damaged items for the specified user and date range.
+    Totals, cost impact and return rates per product and per reason come from one grouped query;
+    transaction rows are paginated with their inventory and product eager-loaded.
     """
-    query = ReturnedDamagedItem.query.filter_by(user_id=user_id)
-
-    # Filter by date range if provided
-    if start_date:
-        query = query.filter(ReturnedDamagedItem.return_date >= start_date)
-    if end_date:
-        query = query.filter(ReturnedDamagedItem.return_date <= end_date)
-
-    # Get all returned or damaged items in the specified date range
-    returned_items = query.all()
+    from sqlalchemy.orm import joinedload
+    from modules.tables_reports.report_queries import returned_damaged_breakdown  # Import here to avoid circular imports
+
+    by_product, by_reason = [], []
+    total_transactions = 0
+    for row in returned_damaged_breakdown(user_id, start_date, end_date):
+        if row['dimension'] == 'sales':
+            total_transactions = row['entries']
+            continue
+        entry = {
+            "label": row['label'],
+            "returns": row['entries'],
+            "quantity": int(row['quantity'] or 0),
+            "cost_impact": round(float(row['cost_impact'] or 0), 2),
+        }
+        if row['dimension'] == 'product':
+            units_sold = int(row['units_sold'] or 0)
+            entry["units_sold"] = units_sold
+            entry["return_rate"] = round(entry["quantity"] / units_sold * 100, 2) if units_sold else None
+            by_product.append(entry)
+        else:
+            by_reason.append(entry)
 
-    # Calculate total cost of returned/damaged items
-    total_cost = sum(item.quantity * item.inventory.cost_price if item.inventory else 0 for item in returned_items)
+    total_returns = sum(entry["returns"] for entry in by_product)
+    total_quantity = sum(entry["quantity"] for entry in by_product)
+    total_cost = sum(entry["cost_impact"] for entry in by_product)
+    for entry in by_reason:
+        entry["share"] = round(entry["quantity"] / total_quantity * 100, 2) if total_quantity else 0
+    by_product.sort(key=lambda entry: entry["cost_impact"], reverse=True)
+    by_reason.sort(key=lambda entry: entry["quantity"], reverse=True)
 
     # Calculate the return rate based on total transactions (sales) + returns
-    total_transactions = Sale.query.filter_by(user_id=user_id).count()
-    total_returns = len(returned_items)
     return_rate = (total_returns / max(total_transactions + total_returns, 1)) * 100  # Avoid division by zero
 
+    query = ReturnedDamagedItem.query.options(
+        joinedload(ReturnedDamagedItem.inventory).joinedload(Inventory.product)
+    ).filter_by(user_id=user_id)
+    if start_date:
+        query = query.filter(ReturnedDamagedItem.return_date >= start_date)
+    if end_date:
+        query = query.filter(ReturnedDamagedItem.return_date < end_date + timedelta(days=1))
+    pagination = query.order_by(
+        ReturnedDamagedItem.return_date.desc(), ReturnedDamagedItem.id.desc()
+    ).paginate(page=page, per_page=per_page, error_out=False)
+
     # Convert results to a dictionary format for easy rendering
     data = {
         "total_cost": round(total_cost, 2),
+        "total_quantity": total_quantity,
         "return_rate": round(return_rate, 2),
+        "by_product": by_product,
+        "by_reason": by_reason,
+        "pagination": pagination,
         "transactions": [
             {
                 "return_date": item.return_date,
-                "product_name": item.inventory.product.name if item.inventory else "Unknown",
+                "product_name": item.inventory.product.name if item.inventory and item.inventory.product else "Unknown",
                 "quantity": item.quantity,
                 "reason": item.reason,
                 "cost_impact": round(item.quantity * item.inventory.cost_price, 2) if item.inventory else 0,
             }
-            for item in returned_items
+            for item in pagination.items
         ],
     }
     return data
 
+def top_k_with_others(totals, k, label_key, value_key='total_amount', others_label='Others'):
+    """
+    Keep the k largest entries of a {label: amount} mapping (heap-based, O(n log k)) and
+    fold everything else into a single "Others" entry.
+    """
+    top = heapq.nlargest(k, totals.items(), key=lambda item: item[1])
+    rows = [{label_key: label, value_key: amount} for label, amount in top]
+    if len(totals) > k:
+        rows.append({label_key: others_label, value_key: sum(totals.values()) - sum(amount for _, amount in top)})
+    return rows
+
+
 def format_data_for_visualization(report_type, data, chart_type='bar', time_period='daily'):
     """
     Formats data for visualization based on report type, chart type, and time period.
@@ -456,10 +523,7 @@ def format_data_for_visualization(report_type, data, chart_type='bar', time_peri
                     for period, amount in sorted(period_totals.items())
                 ]
             elif chart_type == 'pie':
-                formatted_data = [
-                    {'customer': customer, 'total_amount': amount}
-                    for customer, amount in customer_totals.items()
-                ]
+                formatted_data = top_k_with_others(customer_totals, PIE_CHART_TOP_N, 'customer')
 
         elif report_type == 'expenses':
             # Initialize aggregation dictionaries
@@ -506,10 +570,7 @@ def format_data_for_visualization(report_type, data, chart_type='bar', time_peri
                     for period, amount in sorted(period_totals.items())
                 ]
             elif chart_type == 'pie':
-                formatted_data = [
-                    {'category': category, 'total_amount': amount}
-                    for category, amount in category_totals.items()
-                ]
+                formatted_data = top_k_with_others(category_totals, PIE_CHART_TOP_N, 'category')
 
         elif report_type == 'inventory':
             # Process inventory data (inventory doesn't use time periods)
@@ -539,10 +600,7 @@ def format_data_for_visualization(report_type, data, chart_type='bar', time_peri
                     for product, quantity in sorted(product_quantities.items())
                 ]
             elif chart_type == 'pie':
-                formatted_data = [
-                    {'product_name': product, 'total_amount': value}
-                    for product, value in sorted(product_values.items())
-                ]
+                formatted_data = top_k_with_others(product_values, PIE_CHART_TOP_N, 'product_name')
 
         print(f"Formatted data for {report_type} ({chart_type}, {time_period}):", formatted_data)
         return formatted_data
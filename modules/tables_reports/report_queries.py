@@ -0,0 +1,216 @@
+from datetime import timedelta
+from inventory_system import db
+from modules.sales.models import Sale, SaleItem
+from modules.products.models import Product
+from modules.inventory.models import Inventory
+from modules.expenses.models import Expense, Category
+from modules.accounts_receivable.models import AccountsReceivable
+from modules.suppliers.models import AccountsPayable, Supplier
+from modules.ReturnedDamagedItem.models import ReturnedDamagedItem
+from modules.tables_reports.report_helpers import tenant_user_ids
+
+# Number of rows fetched from the database cursor per round trip
+STREAM_BATCH_SIZE = 1000
+
+
+def _apply_date_range(stmt, column, start_date, end_date):
+    """Restrict a statement to an inclusive date range on the given column."""
+    if start_date:
+        stmt = stmt.where(column >= start_date)
+    if end_date:
+        stmt = stmt.where(column < end_date + timedelta(days=1))
+    return stmt
+
+
+def _sales_statement(user_id, start_date, end_date):
+    stmt = db.select(
+        Sale.id.label('sale_id'),
+        Sale.created_at.label('sale_date'),
+        Sale.customer_name,
+        Product.name.label('product_name'),
+        SaleItem.quantity,
+        SaleItem.price_per_unit.label('unit_price'),
+        SaleItem.discount_percentage,
+        (SaleItem.quantity * SaleItem.price_per_unit
+         * (100 - db.func.coalesce(SaleItem.discount_percentage, 0)) / 100).label('line_total'),
+        Sale.total_price,
+        Sale.sale_status
+    ).join(
+        SaleItem, SaleItem.sale_id == Sale.id
+    ).join(
+        Product, SaleItem.product_id == Product.product_id
+    ).where(Sale.user_id.in_(tenant_user_ids(user_id)))
+    stmt = _apply_date_range(stmt, Sale.created_at, start_date, end_date)
+    return stmt.order_by(Sale.created_at, Sale.id)
+
+
+def _inventory_statement(user_id, start_date, end_date):
+    stmt = db.select(
+        Inventory.product_id,
+        Product.name.label('product_name'),
+        Inventory.sku,
+        Inventory.stock_quantity,
+        Inventory.reorder_threshold,
+        Inventory.unit_price,
+        Inventory.cost_price,
+        Inventory.updated_at
+    ).outerjoin(
+        Product, Inventory.product_id == Product.product_id
+    ).where(Inventory.user_id == user_id)
+    stmt = _apply_date_range(stmt, Inventory.created_at, start_date, end_date)
+    return stmt.order_by(Inventory.id)
+
+
+def _receivables_statement(user_id, start_date, end_date):
+    stmt = db.select(
+        AccountsReceivable.id.label('receivable_id'),
+        AccountsReceivable.customer_name,
+        AccountsReceivable.amount_due,
+        AccountsReceivable.due_date,
+        AccountsReceivable.status
+    ).where(AccountsReceivable.user_id == user_id)
+    stmt = _apply_date_range(stmt, AccountsReceivable.due_date, start_date, end_date)
+    return stmt.order_by(AccountsReceivable.due_date, AccountsReceivable.id)
+
+
+def _payables_statement(user_id, start_date, end_date):
+    stmt = db.select(
+        AccountsPayable.id.label('payable_id'),
+        Supplier.name.label('supplier_name'),
+        AccountsPayable.amount_due,
+        AccountsPayable.due_date,
+        AccountsPayable.status
+    ).outerjoin(
+        Supplier, AccountsPayable.supplier_id == Supplier.id
+    ).where(AccountsPayable.user_id == user_id)
+    stmt = _apply_date_range(stmt, AccountsPayable.due_date, start_date, end_date)
+    return stmt.order_by(AccountsPayable.due_date, AccountsPayable.id)
+
+
+def _expenses_statement(user_id, start_date, end_date):
+    stmt = db.select(
+        Expense.id.label('expense_id'),
+        Expense.date_incurred,
+        db.func.coalesce(Category.name, 'Uncategorized').label('category'),
+        Expense.description,
+        Expense.amount,
+        Expense.expense_type,
+        Expense.payment_status
+    ).outerjoin(
+        Category, Expense.category_id == Category.id
+    ).where(Expense.user_id == user_id)
+    stmt = _apply_date_range(stmt, Expense.date_incurred, start_date, end_date)
+    return stmt.order_by(Expense.date_incurred, Expense.id)
+
+
+def _returned_damaged_statement(user_id, start_date, end_date):
+    stmt = db.select(
+        ReturnedDamagedItem.id.label('item_id'),
+        ReturnedDamagedItem.return_date,
+        db.func.coalesce(Product.name, 'Unknown').label('product_name'),
+        ReturnedDamagedItem.quantity,
+        ReturnedDamagedItem.reason,
+        (ReturnedDamagedItem.quantity * db.func.coalesce(Inventory.cost_price, 0)).label('cost_impact')
+    ).outerjoin(
+        Inventory, ReturnedDamagedItem.inventory_id == Inventory.id
+    ).outerjoin(
+        Product, Inventory.product_id == Product.product_id
+    ).where(ReturnedDamagedItem.user_id == user_id)
+    stmt = _apply_date_range(stmt, ReturnedDamagedItem.return_date, start_date, end_date)
+    return stmt.order_by(ReturnedDamagedItem.return_date, ReturnedDamagedItem.id)
+
+
+REPORT_STATEMENTS = {
+    'sales': _sales_statement,
+    'inventory': _inventory_statement,
+    'receivables': _receivables_statement,
+    'payables': _payables_statement,
+    'expenses': _expenses_statement,
+    'returned_damaged': _returned_damaged_statement,
+}
+
+
+def _report_statement(report_type, user_id, start_date, end_date):
+    if report_type not in REPORT_STATEMENTS:
+        raise ValueError("Unknown report type specified.")
+    return REPORT_STATEMENTS[report_type](user_id, start_date, end_date)
+
+
+def count_report_rows(report_type, user_id, start_date=None, end_date=None):
+    """Count the rows a report will stream, without fetching them."""
+    stmt = _report_statement(report_type, user_id, start_date, end_date).order_by(None)
+    return db.session.execute(
+        db.select(db.func.count()).select_from(stmt.subquery())
+    ).scalar() or 0
+
+
+def stream_report_rows(report_type, user_id, start_date=None, end_date=None):
+    """
+    Yield report rows straight from a server-side cursor, fetching STREAM_BATCH_SIZE rows at a time.
+    """
+    stmt = _report_statement(report_type, user_id, start_date, end_date)
+    result = db.session.execute(
+        stmt.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+    )
+    for row in result:
+        yield row._mapping
+
+
+def returned_damaged_breakdown(user_id, start_date=None, end_date=None):
+    """
+    Aggregate returned/damaged items per product and per reason, plus the sales in the same
+    window, in one UNION ALL statement. Returns a list of rows with a 'dimension' of
+    'product', 'reason' or 'sales'.
+    """
+    returns = db.select(
+        Inventory.product_id,
+        db.func.coalesce(Product.name, 'Unknown').label('product_name'),
+        db.func.coalesce(ReturnedDamagedItem.reason, 'Unspecified').label('reason'),
+        ReturnedDamagedItem.quantity,
+        (ReturnedDamagedItem.quantity * db.func.coalesce(Inventory.cost_price, 0)).label('cost_impact')
+    ).select_from(ReturnedDamagedItem).outerjoin(
+        Inventory, ReturnedDamagedItem.inventory_id == Inventory.id
+    ).outerjoin(
+        Product, Inventory.product_id == Product.product_id
+    ).where(ReturnedDamagedItem.user_id == user_id)
+    returns = _apply_date_range(returns, ReturnedDamagedItem.return_date, start_date, end_date).cte('returns')
+
+    sold = db.select(
+        SaleItem.product_id,
+        db.func.sum(SaleItem.quantity).label('units_sold')
+    ).join(Sale, Sale.id == SaleItem.sale_id).where(Sale.user_id == user_id)
+    sold = _apply_date_range(sold, Sale.created_at, start_date, end_date).group_by(SaleItem.product_id).subquery('sold')
+
+    sales = db.select(
+        db.literal('sales').label('dimension'),
+        db.literal(None, db.String).label('label'),
+        db.func.count(Sale.id).label('entries'),
+        db.literal(0).label('quantity'),
+        db.literal(0).label('cost_impact'),
+        db.literal(0).label('units_sold')
+    ).where(Sale.user_id == user_id)
+    sales = _apply_date_range(sales, Sale.created_at, start_date, end_date)
+
+    by_product = db.select(
+        db.literal('product').label('dimension'),
+        returns.c.product_name.label('label'),
+        db.func.count().label('entries'),
+        db.func.sum(returns.c.quantity).label('quantity'),
+        db.func.sum(returns.c.cost_impact).label('cost_impact'),
+        db.func.coalesce(db.func.max(sold.c.units_sold), 0).label('units_sold')
+    ).select_from(returns).outerjoin(
+        sold, sold.c.product_id == returns.c.product_id
+    ).group_by(returns.c.product_id, returns.c.product_name)
+
+    by_reason = db.select(
+        db.literal('reason').label('dimension'),
+        returns.c.reason.label('label'),
+        db.func.count().label('entries'),
+        db.func.sum(returns.c.quantity).label('quantity'),
+        db.func.sum(returns.c.cost_impact).label('cost_impact'),
+        db.literal(0).label('units_sold')
+    ).group_by(returns.c.reason)
+
+    statement = db.union_all(by_product, by_reason, sales)
+    return [row._mapping for row in db.session.execute(statement)]
+
@@ -0,0 +1,174 @@
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from flask import current_app
+from sqlalchemy import and_, or_
+from inventory_system import db
+from modules.tables_reports.email_service import queue_report_email
+from modules.tables_reports.excel_exporter import export_report_to_excel
+from modules.tables_reports.models import ReportHistory, ReportSettings
+from modules.tables_reports.pdf_generator import render_report_pdf
+from modules.tables_reports.report_helpers import calculate_profit_and_loss
+from modules.tables_reports.report_storage import enforce_retention, store_report_file
+
+SCHEDULES = ('daily', 'weekly', 'monthly')
+
+
+def report_window(schedule, today):
+    """Return the (start_date, end_date) covered by a scheduled run, both inclusive."""
+    if schedule == 'daily':
+        yesterday = today - timedelta(days=1)
+        return yesterday, yesterday
+    if schedule == 'weekly':
+        return today - timedelta(days=7), today - timedelta(days=1)
+    if schedule == 'monthly':
+        last_month_end = today.replace(day=1) - timedelta(days=1)
+        return last_month_end.replace(day=1), last_month_end
+    raise ValueError(f"Unknown report schedule: {schedule}")
+
+
+def _due_settings_query(today):
+    """Enabled settings whose schedule has come round since their last delivery, in one query."""
+    today_start = datetime.combine(today, time.min)
+    week_start = today_start - timedelta(days=6)
+    month_start = today_start.replace(day=1)
+
+    def not_sent_since(cutoff):
+        return or_(ReportSettings.last_sent_at.is_(None), ReportSettings.last_sent_at < cutoff)
+
+    return ReportSettings.query.filter(
+        ReportSettings.is_enabled.is_(True),
+        ReportSettings.email_recipients.isnot(None),
+        ReportSettings.email_recipients != '',
+        or_(
+            and_(ReportSettings.schedule == 'daily', not_sent_since(today_start)),
+            and_(ReportSettings.schedule == 'weekly', not_sent_since(week_start)),
+            and_(ReportSettings.schedule == 'monthly', not_sent_since(month_start)),
+        )
+    ).order_by(ReportSettings.report_type, ReportSettings.schedule, ReportSettings.user_id)
+
+
+def collect_due_reports(today=None):
+    """
+    Collect due ReportSettings across all tenants into delivery jobs.
+    Settings asking for the same tenant, report type, format and date window share one job,
+    so each artifact is generated once. Jobs are grouped by (report_type, start_date, end_date).
+    """
+    today = today or date.today()
+    jobs = {}
+    for setting in _due_settings_query(today):
+        recipients = [email.strip() for email in setting.email_recipients.split(',') if email.strip()]
+        if not recipients:
+            continue
+        start_date, end_date = report_window(setting.schedule, today)
+        key = (setting.user_id, setting.report_type, setting.format or 'pdf', start_date, end_date)
+        job = jobs.setdefault(key, {'recipients': set(), 'setting_ids': []})
+        job['recipients'].update(recipients)
+        job['setting_ids'].append(setting.id)
+
+    groups = defaultdict(dict)
+    for key, job in jobs.items():
+        user_id, report_type, format, start_date, end_date = key
+        groups[(report_type, start_date, end_date)][key] = job
+    return groups
+
+
+def _group_summaries(report_type, start_date, end_date, keys):
+    """
+    Profit and loss summaries for a group, computed once per tenant before its jobs are submitted,
+    so the PDF and Excel jobs of one tenant share a summary instead of racing to compute it.
+    """
+    if report_type != 'profit_loss':
+        return {}
+    summaries = {}
+    for user_id in {key[0] for key in keys}:
+        try:
+            summaries[user_id] = calculate_profit_and_loss(
+                user_id, datetime.combine(start_date, time.min), datetime.combine(end_date, time.min)
+            )
+        except Exception as e:
+            # The jobs recompute it and record the failure in the report history
+            current_app.logger.error(f"Error calculating profit and loss for user {user_id}: {str(e)}")
+    return summaries
+
+
+def _render_job(app, key, summary, pdf_pool):
+    """Generate, store and record one scheduled report. Runs inside a worker thread."""
+    user_id, report_type, format, start_date, end_date = key
+    # Report queries treat end_date as a datetime and include the whole day
+    start = datetime.combine(start_date, time.min)
+    end = datetime.combine(end_date, time.min)
+
+    with app.app_context():
+        try:
+            if format == 'pdf':
+                file_path = render_report_pdf(report_type, user_id, start, end, summary=summary, pool=pdf_pool)
+            else:
+                file_path = export_report_to_excel(report_type, user_id, start, end, summary=summary)
+
+            artifact = store_report_file(user_id, file_path)
+            db.session.flush()
+            history = ReportHistory(
+                report_type=report_type,
+                file_path=artifact.file_path,
+                format=format,
+                status='completed',
+                generated_at=datetime.now(),
+                generated_by='scheduler',
+                user_id=user_id,
+                artifact=artifact
+            )
+            db.session.add(history)
+            enforce_retention(user_id, keep_artifact_id=artifact.id)
+            db.session.commit()
+            return artifact.file_path
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error generating scheduled {report_type} report for user {user_id}: {str(e)}")
+            db.session.add(ReportHistory(
+                report_type=report_type,
+                file_path='',
+                format=format,
+                status='failed',
+                generated_at=datetime.now(),
+                generated_by='scheduler',
+                user_id=user_id
+            ))
+            db.session.commit()
+            return None
+
+
+def deliver_scheduled_reports(today=None):
+    """
+    Scheduler entry point: render every due report with a bounded worker pool, one
+    (report type, date window) group at a time, and queue each group's emails in the email outbox.
+    Large PDFs of every job share one process pool of REPORT_PDF_WORKERS for their page ranges.
+    Returns the number of reports delivered.
+    """
+    app = current_app._get_current_object()
+    workers = app.config.get('REPORT_SCHEDULE_WORKERS', 4)
+    pdf_workers = app.config.get('REPORT_PDF_WORKERS') or os.cpu_count() or 2
+    delivered = 0
+
+    with ThreadPoolExecutor(max_workers=workers) as executor, ProcessPoolExecutor(max_workers=pdf_workers) as pdf_pool:
+        for (report_type, start_date, end_date), jobs in collect_due_reports(today).items():
+            keys = list(jobs)
+            summaries = _group_summaries(report_type, start_date, end_date, keys)
+            file_paths = executor.map(lambda key: _render_job(app, key, summaries.get(key[0]), pdf_pool), keys)
+
+            setting_ids = []
+            for key, file_path in zip(keys, file_paths):
+                if file_path:
+                    queue_report_email(key[1], file_path, sorted(jobs[key]['recipients']), commit=False)
+                    setting_ids.extend(jobs[key]['setting_ids'])
+                    delivered += 1
+
+            if setting_ids:
+                ReportSettings.query.filter(ReportSettings.id.in_(setting_ids)).update(
+                    {ReportSettings.last_sent_at: datetime.now()}, synchronize_session=False
+                )
+                # The outbox rows and last_sent_at are committed together, so a report is never queued twice
+                db.session.commit()
+
+    return delivered
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app, send_file
+from inventory_system import db
+from modules.tables_reports.models import ReportArtifact, ReportHistory
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_report_storage_dir(user_id):
+    """Return the managed report directory for a tenant, creating it if needed."""
+    tenant_dir = os.path.join(current_app.config['REPORT_STORAGE_DIR'], str(user_id))
+    os.makedirs(tenant_dir, exist_ok=True)
+    return tenant_dir
+
+
+def build_report_path(user_id, report_type, extension):
+    """
+    Build a unique staging path for a report being generated.
+    Finished files are moved into content-addressed storage by store_report_file.
+    """
+    staging_dir = os.path.join(get_report_storage_dir(user_id), 'staging')
+    os.makedirs(staging_dir, exist_ok=True)
+    filename = f"{report_type}_{uuid.uuid4().hex}.{extension}"
+    return os.path.join(staging_dir, filename)
+
+
+def _hash_file(file_path):
+    """Compute the SHA-256 hex digest of a file without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _content_path(user_id, content_hash, extension):
+    """Tenant-namespaced path for a content hash, fanned out by the first two hex characters."""
+    shard_dir = os.path.join(get_report_storage_dir(user_id), content_hash[:2])
+    os.makedirs(shard_dir, exist_ok=True)
+    return os.path.join(shard_dir, f"{content_hash}.{extension}")
+
+
+def store_report_file(user_id, staged_path):
+    """
+    Move a freshly generated report into content-addressed storage.
+    If the tenant already has an identical file, the staged copy is discarded and the
+    existing artifact is reused. Returns the ReportArtifact (added to the session, not committed).
+    """
+    extension = os.path.splitext(staged_path)[1].lstrip('.').lower()
+    content_hash = _hash_file(staged_path)
+
+    artifact = ReportArtifact.query.filter_by(
+        user_id=user_id, content_hash=content_hash, extension=extension
+    ).first()
+
+    if artifact and os.path.exists(artifact.file_path):
+        os.remove(staged_path)
+    else:
+        target_path = _content_path(user_id, content_hash, extension)
+        os.replace(staged_path, target_path)
+        if not artifact:
+            artifact = ReportArtifact(
+                user_id=user_id,
+                content_hash=content_hash,
+                extension=extension
+            )
+            db.session.add(artifact)
+        artifact.file_path = target_path
+        artifact.file_size = os.path.getsize(target_path)
+
+    artifact.last_accessed_at = datetime.utcnow()
+    return artifact
+
+
+def get_tenant_quota_bytes(user_id):
+    """Per-tenant storage quota: the Business override if set, otherwise REPORT_STORAGE_QUOTA_MB."""
+    from modules.business.models import Business  # Import here to avoid circular imports
+
+    quota_mb = db.session.query(Business.report_storage_quota_mb).filter(
+        Business.user_id == user_id
+    ).scalar()
+    if quota_mb is None:
+        quota_mb = current_app.config['REPORT_STORAGE_QUOTA_MB']
+    return quota_mb * 1024 * 1024
+
+
+def _evict(artifacts):
+    """Delete artifact files and rows, marking the history entries that pointed at them as expired."""
+    artifact_ids = [artifact.id for artifact in artifacts]
+    if not artifact_ids:
+        return 0
+
+    ReportHistory.query.filter(ReportHistory.artifact_id.in_(artifact_ids)).update(
+        {ReportHistory.artifact_id: None, ReportHistory.status: 'expired'},
+        synchronize_session=False
+    )
+    for artifact in artifacts:
+        try:
+            if os.path.exists(artifact.file_path):
+                os.remove(artifact.file_path)
+        except OSError as e:
+            current_app.logger.error(f"Error removing report file {artifact.file_path}: {str(e)}")
+        db.session.delete(artifact)
+    return len(artifact_ids)
+
+
+def enforce_retention(user_id, keep_artifact_id=None):
+    """
+    Evict a tenant's artifacts that are past REPORT_RETENTION_DAYS, then evict the least
+    recently accessed ones until the tenant is back under its quota.
+    Returns the number of artifacts evicted; the caller commits.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config['REPORT_RETENTION_DAYS'])
+    expired = ReportArtifact.query.filter(
+        ReportArtifact.user_id == user_id,
+        ReportArtifact.last_accessed_at < cutoff,
+        ReportArtifact.id != keep_artifact_id
+    ).all()
+    evicted = _evict(expired)
+
+    quota = get_tenant_quota_bytes(user_id)
+    used = db.session.query(db.func.coalesce(db.func.sum(ReportArtifact.file_size), 0)).filter(
+        ReportArtifact.user_id == user_id
+    ).scalar()
+    if used <= quota:
+        return evicted
+
+    over_quota = []
+    candidates = ReportArtifact.query.filter(
+        ReportArtifact.user_id == user_id,
+        ReportArtifact.id != keep_artifact_id
+    ).order_by(ReportArtifact.last_accessed_at.asc()).all()
+    for artifact in candidates:
+        if used <= quota:
+            break
+        over_quota.append(artifact)
+        used -= artifact.file_size
+    return evicted + _evict(over_quota)
+
+
+def enforce_retention_for_all_tenants():
+    """Scheduler entry point: apply retention and quotas to every tenant that has stored reports."""
+    user_ids = [row[0] for row in db.session.query(ReportArtifact.user_id).distinct()]
+    evicted = 0
+    for user_id in user_ids:
+        try:
+            evicted += enforce_retention(user_id)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error enforcing report retention for user {user_id}: {str(e)}")
+    return evicted
+
+
+def send_report_file(report):
+    """
+    Stream a stored report to the client. The content hash doubles as a strong ETag,
+    so repeat downloads are answered with 304 Not Modified.
+    """
+    artifact = report.artifact
+    extension = artifact.extension if artifact else os.path.splitext(report.file_path)[1].lstrip('.')
+    download_name = f"{report.report_type}_report_{report.generated_at.strftime('%Y%m%d')}.{extension}"
+
+    if artifact:
+        artifact.last_accessed_at = datetime.utcnow()
+        db.session.commit()
+
+    return send_file(
+        report.file_path,
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=artifact.content_hash if artifact else True,
+        max_age=current_app.config.get('REPORT_DOWNLOAD_MAX_AGE', 3600)
+    )
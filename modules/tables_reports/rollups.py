@@ -0,0 +1,301 @@
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from inventory_system import db
+from modules.accounts_receivable.models import AccountsReceivable
+from modules.business.models import Business
+from modules.expenses.models import Expense
+from modules.ReturnedDamagedItem.models import ReturnedDamagedItem
+from modules.sales.models import Sale, SaleItem
+from modules.tables_reports.models import DailyRollup, RollupDirtyDay, RollupWatermark
+from modules.tables_reports.report_helpers import tenant_user_ids
+from modules.users.models import User
+
+# Date column deciding which day a written row counts towards
+TRACKED_DAY_COLUMNS = {
+    Sale: 'created_at',
+    Expense: 'date_incurred',
+    ReturnedDamagedItem: 'return_date',
+    AccountsReceivable: 'due_date',
+}
+
+ROLLUP_FIELDS = (
+    'sales_count', 'revenue', 'profit', 'units_sold', 'expenses',
+    'returned_count', 'returned_quantity', 'receivables_due',
+    'sales_net', 'output_vat', 'purchases_gross', 'input_vat',
+)
+
+
+def _as_date(value):
+    """Normalise a datetime, date or ISO string (SQLite's date()) to a date."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def _days_touched(obj, column):
+    """Days a pending write affects: the current value and, when the date was changed (backdated), the old one."""
+    history = inspect(obj).attrs[column].history
+    values = list(history.added) + list(history.unchanged) + list(history.deleted)
+    # Column defaults are applied during the INSERT, so a new row without a date counts towards today
+    return {_as_date(value) for value in values if value is not None} or {date.today()}
+
+
+def _mark_dirty_days(session, flush_context, instances):
+    """before_flush hook queueing a dirty day for every tracked row being inserted, updated or deleted."""
+    marked = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, SaleItem):
+            # Item edits belong to their sale's day; only follow the relationship if it is already loaded
+            obj = inspect(obj).attrs.sale.loaded_value
+        column = TRACKED_DAY_COLUMNS.get(type(obj))
+        if column is None or obj.user_id is None:
+            continue
+        marked.update((obj.user_id, day) for day in _days_touched(obj, column))
+
+    for user_id, day in marked:
+        session.add(RollupDirtyDay(user_id=user_id, day=day))
+
+
+def _keep_previous_day(target, value, oldvalue, initiator):
+    """
+    No-op 'set' listener. Registering it with active_history makes SQLAlchemy load the stored date
+    before it is overwritten, so a backdated row also dirties the day it moved away from.
+    """
+    return value
+
+
+def register_dirty_day_tracking():
+    """Install the session hook that records dirty days; safe to call more than once."""
+    if not event.contains(Session, 'before_flush', _mark_dirty_days):
+        event.listen(Session, 'before_flush', _mark_dirty_days)
+    for model, column in TRACKED_DAY_COLUMNS.items():
+        attribute = getattr(model, column)
+        if not event.contains(attribute, 'set', _keep_previous_day):
+            event.listen(attribute, 'set', _keep_previous_day, active_history=True, retval=True)
+
+
+def _day_range(column, days):
+    """Criteria covering the span of the given days; rows outside the exact set are discarded afterwards."""
+    if days is None:
+        return []
+    return [column >= min(days), column < max(days) + timedelta(days=1)]
+
+
+def _grouped(day_column, model, tenant, days, *columns, joins=(), criteria=()):
+    """Run one GROUP BY day query over a tenant's rows and return {day: row}."""
+    day = db.func.date(day_column).label('day')
+    statement = db.select(day, *columns).select_from(model)
+    for target, onclause in joins:
+        statement = statement.join(target, onclause)
+    statement = statement.where(
+        model.user_id.in_(tenant), *_day_range(day_column, days), *criteria
+    ).group_by(day)
+    rows = {}
+    for row in db.session.execute(statement):
+        row_day = _as_date(row.day)
+        if days is None or row_day in days:
+            rows[row_day] = row
+    return rows
+
+
+def _compute_days(tenant_id, days=None):
+    """Aggregate every rollup field for a tenant, limited to a set of days (None means full history)."""
+    tenant = tenant_user_ids(tenant_id)
+    kept_sales = [db.func.coalesce(Sale.sale_status, '') != 'returned']
+
+    sales = _grouped(
+        Sale.created_at, Sale, tenant, days,
+        db.func.count(Sale.id).label('sales_count'),
+        db.func.coalesce(db.func.sum(Sale.total_price), 0).label('revenue'),
+        db.func.coalesce(db.func.sum(Sale.profit), 0).label('profit'),
+        criteria=kept_sales
+    )
+    units = _grouped(
+        Sale.created_at, Sale, tenant, days,
+        db.func.coalesce(db.func.sum(SaleItem.quantity), 0).label('units_sold'),
+        joins=[(SaleItem, SaleItem.sale_id == Sale.id)], criteria=kept_sales
+    )
+    expenses = _grouped(
+        Expense.date_incurred, Expense, tenant, days,
+        db.func.coalesce(db.func.sum(Expense.amount), 0).label('expenses')
+    )
+    returns = _grouped(
+        ReturnedDamagedItem.return_date, ReturnedDamagedItem, tenant, days,
+        db.func.count(ReturnedDamagedItem.id).label('returned_count'),
+        db.func.coalesce(db.func.sum(ReturnedDamagedItem.quantity), 0).label('returned_quantity')
+    )
+    receivables = _grouped(
+        AccountsReceivable.due_date, AccountsReceivable, tenant, days,
+        db.func.coalesce(db.func.sum(AccountsReceivable.amount_due), 0).label('receivables_due')
+    )
+
+    totals = {}
+    for source in (sales, units, expenses, returns, receivables):
+        for day, row in source.items():
+            totals.setdefault(day, {}).update(row._mapping)
+    for values in totals.values():
+        values.pop('day', None)
+    return totals
+
+
+def _rebuild_days(tenant_id, days=None):
+    """Replace a tenant's rollups, sketches and heatmap contributions for the given days (or all of them)."""
+    from modules.tables_reports.heatmap import rebuild_sales_heatmap
+    from modules.tables_reports.sketch_metrics import rebuild_daily_sketches
+    from modules.tables_reports.vat import compute_daily_vat
+
+    totals = _compute_days(tenant_id, days)
+    vat_totals, vat_rate = compute_daily_vat(tenant_id, days)
+    for day, values in vat_totals.items():
+        totals.setdefault(day, {}).update(values)
+    rebuild_daily_sketches(tenant_id, days)
+    rebuild_sales_heatmap(tenant_id, days)
+
+    delete = db.delete(DailyRollup).where(DailyRollup.user_id == tenant_id)
+    if days is not None:
+        delete = delete.where(DailyRollup.day.in_(days))
+    db.session.execute(delete)
+
+    now = datetime.now()
+    db.session.add_all(
+        DailyRollup(user_id=tenant_id, day=day, refreshed_at=now, vat_rate=float(vat_rate),
+                    **{field: values.get(field, 0) for field in ROLLUP_FIELDS})
+        for day, values in totals.items()
+    )
+    return len(totals) if days is None else len(days)
+
+
+def _invalidate_report_caches(tenant_id):
+    """Drop a tenant's cached analytics so report pages pick up the refreshed figures."""
+    from modules.tables_reports.aging import aging_cache
+    from modules.tables_reports.chart_series import chart_series_cache
+    from modules.tables_reports.comparisons import comparison_cache
+    from modules.tables_reports.dashboard_metrics import dashboard_cache
+    from modules.tables_reports.leaderboards import leaderboard_cache
+    from modules.tables_reports.sketch_metrics import sketch_cache
+    from modules.tables_reports.turnover import analytics_cache
+    from modules.tables_reports.vat import vat_cache
+
+    caches = (dashboard_cache, analytics_cache, aging_cache, comparison_cache, vat_cache, leaderboard_cache, sketch_cache,
+              chart_series_cache)
+    for cache in caches:
+        cache.invalidate_tenant(tenant_id)
+
+
+def _set_watermark(tenant_id, refreshed_at, days_refreshed):
+    """Record when a tenant's rollups were last brought up to date."""
+    watermark = db.session.get(RollupWatermark, tenant_id)
+    if watermark is None:
+        watermark = RollupWatermark(user_id=tenant_id)
+        db.session.add(watermark)
+    watermark.refreshed_at = refreshed_at
+    watermark.days_refreshed = days_refreshed
+
+
+def refresh_rollups(tenant_id=None, full=False):
+    """
+    Recompute the rollups of days marked dirty since the last refresh, for one tenant or all of them.
+    Tenants without a watermark (never refreshed), tenants whose VAT rate changed since their days
+    were computed, and full=True get a complete rebuild.
+    Each tenant is committed on its own with its dirty markers, so one failing tenant neither rolls
+    back the others nor blocks them on the next run; its markers stay queued for a retry.
+    Dirty markers written while the refresh runs are kept for the next one. Returns {tenant_id: days refreshed}.
+    """
+    started_at = datetime.now()
+    tenant_column = db.func.coalesce(User.parent_id, User.id)
+    high_id = db.session.scalar(db.select(db.func.max(RollupDirtyDay.id)))
+
+    pending = {}
+    if high_id is not None:
+        statement = db.select(tenant_column.label('tenant_id'), RollupDirtyDay.day).distinct().join(
+            User, User.id == RollupDirtyDay.user_id
+        ).where(RollupDirtyDay.id <= high_id)
+        if tenant_id is not None:
+            statement = statement.where(tenant_column == tenant_id)
+        for row in db.session.execute(statement):
+            pending.setdefault(row.tenant_id, set()).add(_as_date(row.day))
+
+    if tenant_id is not None:
+        tenants = {tenant_id}
+    else:
+        tenants = set(pending) | set(db.session.scalars(
+            db.select(User.id).where(User.parent_id.is_(None))
+        ))
+    watermarked = set(db.session.scalars(
+        db.select(RollupWatermark.user_id).where(RollupWatermark.user_id.in_(tenants))
+    ))
+    # VAT figures are stored at the rate in force when the day was computed
+    rate_changed = set(db.session.scalars(
+        db.select(DailyRollup.user_id).distinct().outerjoin(
+            Business, Business.user_id == DailyRollup.user_id
+        ).where(
+            DailyRollup.user_id.in_(tenants),
+            DailyRollup.vat_rate.is_distinct_from(db.func.coalesce(Business.vat_rate, 0))
+        )
+    ))
+
+    refreshed = {}
+    for tenant in tenants:
+        if full or tenant not in watermarked or tenant in rate_changed:
+            days = None
+        elif tenant in pending:
+            days = pending[tenant]
+        else:
+            continue
+        try:
+            days_refreshed = _rebuild_days(tenant, days)
+            _set_watermark(tenant, started_at, days_refreshed)
+            if high_id is not None:
+                db.session.execute(db.delete(RollupDirtyDay).where(
+                    RollupDirtyDay.id <= high_id, RollupDirtyDay.user_id.in_(tenant_user_ids(tenant))
+                ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"Error refreshing rollups for tenant {tenant}: {str(e)}")
+            continue
+        refreshed[tenant] = days_refreshed
+        _invalidate_report_caches(tenant)
+
+    if high_id is not None and tenant_id is None:
+        # Markers left by since-deleted users belong to no tenant
+        db.session.execute(db.delete(RollupDirtyDay).where(
+            RollupDirtyDay.id <= high_id, RollupDirtyDay.user_id.notin_(db.select(User.id))
+        ))
+        db.session.commit()
+
+    if refreshed:
+        current_app.logger.info(f"Refreshed rollups for {len(refreshed)} tenant(s), {sum(refreshed.values())} day(s)")
+    return refreshed
+
+
+def get_rollup_status(tenant_id):
+    """Return a tenant's last-refreshed watermark and how many days are waiting to be recomputed."""
+    watermark = db.session.get(RollupWatermark, tenant_id)
+    pending_days = db.session.scalar(
+        db.select(db.func.count(db.distinct(RollupDirtyDay.day))).where(
+            RollupDirtyDay.user_id.in_(tenant_user_ids(tenant_id))
+        )
+    )
+    return {
+        'refreshed_at': watermark.refreshed_at.strftime('%Y-%m-%d %H:%M:%S') if watermark else None,
+        'days_refreshed': watermark.days_refreshed if watermark else 0,
+        'pending_days': pending_days or 0,
+    }
+
+
+def get_daily_rollups(tenant_id, start_date, end_date):
+    """Return a tenant's rollup rows for an inclusive date range, oldest first."""
+    return DailyRollup.query.filter(
+        DailyRollup.user_id == tenant_id,
+        DailyRollup.day >= _as_date(start_date),
+        DailyRollup.day <= _as_date(end_date)
+    ).order_by(DailyRollup.day).all()
@@ -0,0 +1,124 @@
+from datetime import date, datetime, timedelta
+from flask import current_app
+from inventory_system import db
+from modules.sales.models import Sale, SaleItem
+from modules.tables_reports.models import DailySketch
+from modules.tables_reports.report_helpers import tenant_user_ids
+from modules.tables_reports.report_queries import STREAM_BATCH_SIZE
+from modules.tables_reports.rollups import get_rollup_status
+from modules.utils.cache import TTLCache
+from modules.utils.sketches import HyperLogLog, TDigest
+
+DEFAULT_WINDOW_DAYS = 30
+TICKET_QUANTILES = (0.5, 0.9, 0.99)
+BASKET_QUANTILES = (0.5, 0.9)
+
+sketch_cache = TTLCache(ttl=300)
+
+
+def _as_date(value):
+    return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+
+
+def _sales_per_day_statement(tenant_id, days):
+    """One row per sale (day, customer, total, units) for the given days, or for all history."""
+    day = db.func.date(Sale.created_at)
+    statement = db.select(
+        day.label('day'),
+        Sale.customer_name,
+        Sale.total_price,
+        db.func.coalesce(db.func.sum(SaleItem.quantity), 0).label('units'),
+    ).outerjoin(
+        SaleItem, SaleItem.sale_id == Sale.id
+    ).where(
+        Sale.user_id.in_(tenant_user_ids(tenant_id)),
+        db.func.coalesce(Sale.sale_status, '') != 'returned'
+    ).group_by(Sale.id, day, Sale.customer_name, Sale.total_price)
+    if days is not None:
+        statement = statement.where(
+            Sale.created_at >= min(days), Sale.created_at < max(days) + timedelta(days=1)
+        )
+    return statement
+
+
+def rebuild_daily_sketches(tenant_id, days=None):
+    """
+    Rebuild the distinct-customer and ticket/basket quantile sketches of a tenant for the given days
+    (None means full history). Called from the rollup refresh, so sketches follow the dirty-day tracking.
+    """
+    sketches = {}
+    result = db.session.execute(
+        _sales_per_day_statement(tenant_id, days).execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+    )
+    for row in result:
+        day = _as_date(row.day)
+        if days is not None and day not in days:
+            continue
+        customers, tickets, baskets = sketches.setdefault(day, (HyperLogLog(), TDigest(), TDigest()))
+        if row.customer_name:
+            customers.add(row.customer_name.strip().lower())
+        tickets.add(float(row.total_price or 0))
+        baskets.add(int(row.units))
+
+    delete = db.delete(DailySketch).where(DailySketch.user_id == tenant_id)
+    if days is not None:
+        delete = delete.where(DailySketch.day.in_(days))
+    db.session.execute(delete)
+
+    now = datetime.now()
+    db.session.add_all(
+        DailySketch(user_id=tenant_id, day=day, refreshed_at=now, customers=customers.to_bytes(),
+                    ticket_values=tickets.to_bytes(), basket_sizes=baskets.to_bytes())
+        for day, (customers, tickets, baskets) in sketches.items()
+    )
+
+
+def _compute_approximate_metrics(tenant_id, start_date, end_date):
+    """Merge the daily sketches of a range; memory stays bounded whatever the number of sales."""
+    customers, tickets, baskets = HyperLogLog(), TDigest(), TDigest()
+    rows = db.session.execute(
+        db.select(DailySketch.customers, DailySketch.ticket_values, DailySketch.basket_sizes).where(
+            DailySketch.user_id == tenant_id,
+            DailySketch.day >= start_date.date(),
+            DailySketch.day <= end_date.date()
+        )
+    )
+    for row in rows:
+        customers.merge(HyperLogLog.from_bytes(row.customers))
+        tickets.merge(TDigest.from_bytes(row.ticket_values))
+        baskets.merge(TDigest.from_bytes(row.basket_sizes))
+
+    def quantiles(digest, points):
+        return {f'p{int(q * 100)}': round(digest.quantile(q), 2) if digest.count else None for q in points}
+
+    return {
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'approximate': True,
+        'sales_count': int(tickets.count),
+        'distinct_customers': customers.count(),
+        'ticket_value': quantiles(tickets, TICKET_QUANTILES),
+        'basket_size': quantiles(baskets, BASKET_QUANTILES),
+    }
+
+
+def get_approximate_metrics(tenant_id, start_date=None, end_date=None):
+    """
+    Return distinct customers and ticket-value / basket-size percentiles (median included) for a
+    window (default: the last 30 days), estimated from the daily sketches as they are; 'stale' flags
+    changes the rollup refresh (scheduler or POST /rollups/refresh) has not folded in yet. Reading
+    never rebuilds. Results are cached for ANALYTICS_CACHE_TTL seconds.
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end_date = end_date or today
+    start_date = start_date or end_date - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+
+    rollup_status = get_rollup_status(tenant_id)
+
+    metrics = dict(sketch_cache.get_or_set(
+        (tenant_id, 'approximate_metrics', start_date, end_date),
+        lambda: _compute_approximate_metrics(tenant_id, start_date, end_date),
+        ttl=current_app.config.get('ANALYTICS_CACHE_TTL', 300)
+    ))
+    metrics['stale'] = rollup_status['refreshed_at'] is None or rollup_status['pending_days'] > 0
+    return metrics
@@ -0,0 +1,561 @@
+import os
+import smtplib
+import pytest
+from flask import current_app
+from datetime import date, datetime, timedelta
+from openpyxl import load_workbook
+from inventory_system import db
+from modules.users.models import User
+from modules.products.models import Product
+from modules.inventory.models import Inventory
+from modules.sales.models import Sale
+from modules.expenses.models import Expense, Category
+from modules.tables_reports.models import ReportSettings, RollupDirtyDay
+from modules.tables_reports.excel_exporter import export_report_to_excel, EXCEL_COLUMNS
+from modules.tables_reports.report_storage import build_report_path, store_report_file
+from modules.tables_reports.report_scheduler import collect_due_reports, report_window
+from modules.tables_reports.dashboard_metrics import get_dashboard_metrics, dashboard_cache
+from modules.tables_reports.turnover import get_inventory_turnover
+from modules.tables_reports.report_helpers import fetch_returned_damaged_data, top_k_with_others
+from modules.tables_reports.aging import get_aging_summary, get_aging_items, AGING_BUCKETS
+from modules.tables_reports.cash_flow import project_cash_flow
+from modules.tables_reports import rollups as rollups_module
+from modules.tables_reports.rollups import refresh_rollups, get_rollup_status, get_daily_rollups
+from modules.tables_reports.comparisons import comparison_windows, get_period_comparison
+from modules.tables_reports.vat import get_vat_summary, stream_vat_lines, quarter_bounds
+from modules.tables_reports.leaderboards import get_leaderboard
+from modules.tables_reports.sketch_metrics import get_approximate_metrics
+from modules.tables_reports.heatmap import get_sales_heatmap
+from modules.tables_reports.chart_series import get_chart_series, chart_series_cache
+from modules.tables_reports.live_dashboard import stream_live_metrics, register_live_dashboard_events, dashboard_bus
+from modules.tables_reports.email_service import queue_report_email
+from modules.utils.email_automation.outbox import drain_outbox, enqueue_email, get_outbox_metrics
+from modules.utils.email_automation.smtp_pool import smtp_pool
+from modules.utils.email_automation.models import EmailOutbox
+from modules.utils.email_automation.low_stock_digest import queue_low_stock_digests
+from modules.utils.sketches import HyperLogLog, TDigest
+from modules.utils.downsampling import downsample_series, lttb_indices
+
+
+@pytest.fixture(scope='module')
+def admin_user(test_client):
+    """Fixture returning the seeded admin user."""
+    return User.query.filter_by(username='admin').first()
+
+
+def test_export_sales_report_to_excel(admin_user):
+    """
+    Test case for streaming the sales report into an XLSX file.
+    Verifies the file is written to the tenant's report directory with typed header columns.
+    """
+    file_path = export_report_to_excel('sales', admin_user.id)
+    assert os.path.exists(file_path)
+    assert os.path.join('reports', str(admin_user.id)) in file_path
+
+    workbook = load_workbook(file_path, read_only=True)
+    sheet = workbook['Sales']
+    header = [cell.value for cell in next(sheet.iter_rows(max_row=1))]
+    assert header == [column[0] for column in EXCEL_COLUMNS['sales']]
+
+
+def test_export_profit_loss_report_to_excel(admin_user):
+    """
+    Test case for the multi-sheet profit and loss workbook.
+    Verifies summary and detail sheets are written.
+    """
+    file_path = export_report_to_excel('profit_loss', admin_user.id)
+    workbook = load_workbook(file_path, read_only=True)
+    assert workbook.sheetnames == ['Summary', 'Sales Detail', 'Expenses Detail']
+
+
+def test_export_unknown_report_type(admin_user):
+    """
+    Test case for exporting an unsupported report type.
+    Verifies a ValueError is raised.
+    """
+    with pytest.raises(ValueError):
+        export_report_to_excel('unknown', admin_user.id)
+
+
+def test_store_report_file_deduplicates(admin_user):
+    """
+    Test case for storing two byte-identical reports.
+    Verifies both resolve to the same content-addressed artifact and the staged copies are removed.
+    """
+    staged_paths = []
+    for _ in range(2):
+        staged_path = build_report_path(admin_user.id, 'sales', 'pdf')
+        with open(staged_path, 'wb') as fp:
+            fp.write(b'%PDF-1.3 identical report body')
+        staged_paths.append(staged_path)
+
+    first = store_report_file(admin_user.id, staged_paths[0])
+    second = store_report_file(admin_user.id, staged_paths[1])
+
+    assert first is second
+    assert os.path.exists(first.file_path)
+    assert first.content_hash in first.file_path
+    assert not any(os.path.exists(path) for path in staged_paths)
+
+
+def test_report_window():
+    """
+    Test case for the date windows covered by scheduled reports.
+    Verifies daily, weekly and monthly windows end the day before the run.
+    """
+    today = date(2024, 3, 15)
+    assert report_window('daily', today) == (date(2024, 3, 14), date(2024, 3, 14))
+    assert report_window('weekly', today) == (date(2024, 3, 8), date(2024, 3, 14))
+    assert report_window('monthly', today) == (date(2024, 2, 1), date(2024, 2, 29))
+
+
+def test_collect_due_reports_merges_settings(admin_user):
+    """
+    Test case for collecting due scheduled reports.
+    Verifies settings for the same report and window share one job and recently sent settings are skipped.
+    """
+    db.session.add_all([
+        ReportSettings(user_id=admin_user.id, report_type='sales', schedule='daily',
+                       email_recipients='a@example.com', format='pdf'),
+        ReportSettings(user_id=admin_user.id, report_type='sales', schedule='daily',
+                       email_recipients='b@example.com, a@example.com', format='pdf'),
+        ReportSettings(user_id=admin_user.id, report_type='inventory', schedule='daily',
+                       email_recipients='a@example.com', format='pdf', last_sent_at=datetime.now()),
+    ])
+    db.session.commit()
+
+    today = date.today()
+    groups = collect_due_reports(today)
+    window = report_window('daily', today)
+
+    assert list(groups) == [('sales',) + window]
+    job = groups[('sales',) + window][(admin_user.id, 'sales', 'pdf') + window]
+    assert job['recipients'] == {'a@example.com', 'b@example.com'}
+    assert len(job['setting_ids']) == 2
+
+
+def test_dashboard_metrics(admin_user):
+    """
+    Test case for the single-query dashboard KPIs.
+    Verifies tile values match the tenant's data and repeat calls are served from the cache.
+    """
+    dashboard_cache.clear()
+    metrics = get_dashboard_metrics(admin_user.id)
+
+    assert metrics['product_count'] == Product.query.filter_by(user_id=admin_user.id).count()
+    assert {'monthly_revenue', 'pending_receivables', 'profit_margin'} <= set(metrics)
+    assert get_dashboard_metrics(admin_user.id) is metrics
+
+
+def test_inventory_turnover(admin_user):
+    """
+    Test case for windowed per-product inventory turnover.
+    Verifies every tenant product is ranked and supplier totals are produced.
+    """
+    turnover = get_inventory_turnover(admin_user.id)
+
+    assert len(turnover['products']) == Product.query.filter_by(user_id=admin_user.id).count()
+    assert turnover['window_days'] == 30
+    assert all(product['rank'] >= 1 for product in turnover['products'])
+    assert isinstance(turnover['suppliers'], list)
+
+
+def test_fetch_returned_damaged_data(admin_user):
+    """
+    Test case for the aggregated returned/damaged report.
+    Verifies product totals match the reason totals and detail rows are paginated.
+    """
+    data = fetch_returned_damaged_data(admin_user.id, per_page=1)
+
+    assert sum(row['quantity'] for row in data['by_product']) == data['total_quantity']
+    assert sum(row['quantity'] for row in data['by_reason']) == data['total_quantity']
+    assert len(data['transactions']) <= 1
+    assert data['pagination'].per_page == 1
+
+
+def test_returned_damaged_report_renders(test_client, admin_user):
+    """
+    Test case for the returned/damaged report page.
+    Verifies the route renders its template (including the shared pagination block) for a logged-in admin.
+    """
+    with test_client.session_transaction() as session:
+        session['_user_id'] = str(admin_user.id)
+        session['_fresh'] = True
+
+    response = test_client.get('/tables_reports/returned_damaged_report?per_page=1')
+    assert response.status_code == 200
+    assert b'Back to Dashboard' in response.data
+
+
+def test_receivables_aging(admin_user):
+    """
+    Test case for the receivables aging summary.
+    Verifies every bucket is reported and bucket totals add up to the paginated open items.
+    """
+    aging = get_aging_summary('receivables', admin_user.id)
+    assert [bucket['key'] for bucket in aging['buckets']] == [key for key, _, _ in AGING_BUCKETS]
+
+    items = get_aging_items('receivables', admin_user.id, per_page=1000)
+    assert items.total == aging['total_count']
+    assert round(sum(float(item.amount_due) for item in items.items), 2) == aging['total_outstanding']
+
+
+def test_cash_flow_projection(admin_user):
+    """
+    Test case for the cash flow projection.
+    Verifies one period per week is produced and the closing balance carries every period's net flow.
+    """
+    projection = project_cash_flow(admin_user.id, weeks=4, opening_balance=1000)
+
+    assert len(projection['periods']) == 4
+    expected = 1000 + sum(period['net'] for period in projection['periods'])
+    assert abs(projection['closing_balance'] - expected) < 0.05
+
+    daily = project_cash_flow(admin_user.id, weeks=2, granularity='daily', include_recurring=False)
+    assert len(daily['periods']) == 14
+
+
+def test_refresh_rollups_only_dirty_days(admin_user):
+    """
+    Test case for incremental rollup refresh.
+    Verifies writing an expense marks its day dirty and the next refresh recomputes just that day.
+    """
+    refresh_rollups(admin_user.id, full=True)
+    assert get_rollup_status(admin_user.id)['pending_days'] == 0
+
+    category = Category(name='Rollups', user_id=admin_user.id)
+    db.session.add(category)
+    db.session.flush()
+    incurred = datetime(2020, 2, 14, 10, 30)
+    db.session.add(Expense(user_id=admin_user.id, category_id=category.id, amount=75, date_incurred=incurred))
+    db.session.commit()
+    assert RollupDirtyDay.query.filter_by(day=incurred.date()).count() == 1
+
+    refreshed = refresh_rollups(admin_user.id)
+    assert refreshed == {admin_user.id: 1}
+    status = get_rollup_status(admin_user.id)
+    assert status['pending_days'] == 0 and status['refreshed_at'] is not None
+
+    rollups = get_daily_rollups(admin_user.id, incurred, incurred)
+    assert len(rollups) == 1
+    assert float(rollups[0].expenses) == 75.0
+
+
+def test_refresh_rollups_isolates_failing_tenant(admin_user, monkeypatch):
+    """
+    Test case for per-tenant rollup refresh.
+    Verifies a tenant whose rebuild fails keeps its dirty days, while other tenants are refreshed and committed.
+    """
+    other = User(username='rollup_tenant', hashed_password='x', email='rollup_tenant@example.com', role='admin')
+    db.session.add(other)
+    db.session.commit()
+    refresh_rollups(full=True)
+
+    sale_day = datetime(2020, 3, 9, 11)
+    db.session.add_all([
+        Sale(user_id=admin_user.id, total_price=12, sale_status='completed', created_at=sale_day),
+        Sale(user_id=other.id, total_price=30, sale_status='completed', created_at=sale_day),
+    ])
+    db.session.commit()
+
+    rebuild_days = rollups_module._rebuild_days
+    def failing_rebuild(tenant_id, days=None):
+        if tenant_id == admin_user.id:
+            raise RuntimeError('rebuild failed')
+        return rebuild_days(tenant_id, days)
+    monkeypatch.setattr(rollups_module, '_rebuild_days', failing_rebuild)
+
+    assert refresh_rollups() == {other.id: 1}
+    assert get_rollup_status(other.id)['pending_days'] == 0
+    assert get_rollup_status(admin_user.id)['pending_days'] == 1
+
+    monkeypatch.setattr(rollups_module, '_rebuild_days', rebuild_days)
+    assert refresh_rollups() == {admin_user.id: 1}
+
+
+def test_comparison_windows():
+    """
+    Test case for period comparison windows.
+    Verifies month-to-date is compared with the same span of the previous month and of last year.
+    """
+    windows = comparison_windows('monthly', date(2024, 3, 31))
+
+    assert windows['current'] == (date(2024, 3, 1), date(2024, 3, 31))
+    assert windows['prior'] == (date(2024, 2, 1), date(2024, 2, 29))
+    assert windows['year_ago'] == (date(2023, 3, 1), date(2023, 3, 31))
+
+
+def test_period_comparison(admin_user):
+    """
+    Test case for the P&L period comparison.
+    Verifies deltas are current minus prior and net profit equals gross profit less expenses.
+    """
+    refresh_rollups(admin_user.id)
+    comparison = get_period_comparison(admin_user.id, 'profit_loss', 'monthly')
+    metrics = {metric['key']: metric for metric in comparison['metrics']}
+    assert comparison['stale'] is False
+
+    for metric in metrics.values():
+        assert metric['prior_delta'] == round(metric['current'] - metric['prior'], 2)
+    assert abs(metrics['net_profit']['current']
+               - (metrics['gross_profit']['current'] - metrics['expenses']['current'])) < 0.01
+
+    with pytest.raises(ValueError):
+        get_period_comparison(admin_user.id, 'inventory')
+
+
+def test_vat_summary_matches_lines(admin_user):
+    """
+    Test case for the VAT report.
+    Verifies quarters add up to the year, the exported lines add up to the summary VAT, and the
+    summary read from the daily rollups equals the one scanned from the ledgers.
+    """
+    year = datetime.now().year
+    db.session.add(RollupDirtyDay(user_id=admin_user.id, day=date(year, 1, 1)))
+    db.session.commit()
+    ledger_summary = get_vat_summary(admin_user.id, year)
+    refresh_rollups(admin_user.id)
+    summary = get_vat_summary(admin_user.id, year)
+    assert summary == ledger_summary
+
+    assert len(summary['months']) == 12 and len(summary['quarters']) == 4
+    assert round(sum(q['output_vat'] for q in summary['quarters']), 2) == summary['total']['output_vat']
+
+    lines = list(stream_vat_lines(admin_user.id, *quarter_bounds(year, 1)))
+    lines += list(stream_vat_lines(admin_user.id, quarter_bounds(year, 2)[0], quarter_bounds(year, 4)[1]))
+    output_vat = sum(float(line['vat_amount']) for line in lines if line['source'] == 'sale')
+    input_vat = sum(float(line['vat_amount']) for line in lines if line['source'] == 'expense')
+    assert round(output_vat, 2) == summary['total']['output_vat']
+    assert round(input_vat, 2) == summary['total']['input_vat']
+
+
+def test_top_k_with_others():
+    """
+    Test case for heap-based top-K with an "Others" bucket.
+    Verifies the largest entries are kept in order and the remainder is summed.
+    """
+    rows = top_k_with_others({'a': 1, 'b': 5, 'c': 3, 'd': 2}, 2, 'customer')
+
+    assert [row['customer'] for row in rows] == ['b', 'c', 'Others']
+    assert rows[-1]['total_amount'] == 3
+
+
+def test_product_leaderboard(admin_user):
+    """
+    Test case for the product leaderboard.
+    Verifies entries are ranked by the requested metric and limited to N.
+    """
+    board = get_leaderboard(admin_user.id, 'products', 'units', limit=3)
+
+    assert len(board['entries']) <= 3
+    units = [entry['units'] for entry in board['entries']]
+    assert units == sorted(units, reverse=True)
+    with pytest.raises(ValueError):
+        get_leaderboard(admin_user.id, 'products', 'sales')
+
+
+def test_sketches_merge_within_error():
+    """
+    Test case for the HyperLogLog and t-digest sketches.
+    Verifies estimates survive serialisation and merging within a few percent of the exact values.
+    """
+    left, right = HyperLogLog(), HyperLogLog()
+    for index in range(3000):
+        left.add(f'customer-{index}')
+        right.add(f'customer-{index + 1500}')
+    merged = HyperLogLog.from_bytes(left.to_bytes()).merge(HyperLogLog.from_bytes(right.to_bytes()))
+    assert abs(merged.count() - 4500) / 4500 < 0.05
+
+    digests = [TDigest(), TDigest()]
+    for value in range(1, 10001):
+        digests[value % 2].add(value)
+    combined = TDigest.from_bytes(digests[0].to_bytes()).merge(digests[1])
+    assert abs(combined.quantile(0.5) - 5000) < 100
+    assert abs(combined.quantile(0.99) - 9900) < 100
+
+
+def test_approximate_metrics(admin_user):
+    """
+    Test case for the sketch-backed dashboard metrics.
+    Verifies the merged daily sketches cover the tenant's sales and report ordered percentiles.
+    """
+    refresh_rollups(admin_user.id)
+    metrics = get_approximate_metrics(admin_user.id)
+
+    assert metrics['approximate'] is True
+    assert metrics['stale'] is False
+    assert metrics['distinct_customers'] <= max(metrics['sales_count'], 1)
+    if metrics['sales_count']:
+        assert metrics['ticket_value']['p50'] <= metrics['ticket_value']['p90'] <= metrics['ticket_value']['p99']
+
+
+def test_sales_heatmap_updates_incrementally(admin_user):
+    """
+    Test case for the precomputed sales heatmap.
+    Verifies reads do not refresh, and a newly completed sale lands in its weekday/hour cell on the next refresh.
+    """
+    refresh_rollups(admin_user.id)
+    before = get_sales_heatmap(admin_user.id)
+    assert len(before['sales_count']) == 7 and all(len(row) == 24 for row in before['sales_count'])
+    assert before['stale'] is False
+
+    created_at = datetime(2021, 3, 1, 9, 15)  # A Monday
+    db.session.add(Sale(user_id=admin_user.id, total_price=40, sale_status='completed', created_at=created_at))
+    db.session.commit()
+
+    pending = get_sales_heatmap(admin_user.id)
+    assert pending['stale'] is True
+    assert pending['sales_count'] == before['sales_count']
+
+    refresh_rollups(admin_user.id)
+    after = get_sales_heatmap(admin_user.id)
+    assert after['sales_count'][0][9] == before['sales_count'][0][9] + 1
+    assert round(after['revenue'][0][9] - before['revenue'][0][9], 2) == 40.0
+
+
+def test_chart_series_buckets_in_sql(admin_user):
+    """
+    Test case for the database-bucketed chart series.
+    Verifies sales in one ISO week share a bucket, periods come back in date order and repeat calls hit the cache.
+    """
+    for created_at in (datetime(2019, 12, 30, 8), datetime(2020, 1, 5, 22), datetime(2020, 1, 6, 1)):
+        db.session.add(Sale(user_id=admin_user.id, total_price=10, sale_status='completed', created_at=created_at))
+    db.session.commit()
+    chart_series_cache.clear()
+
+    series = get_chart_series('sales', admin_user.id, 'bar', 'weekly', date(2019, 12, 30), date(2020, 1, 6))
+    assert series == [
+        {'date': 'Week 01 2020', 'total_amount': 20.0},
+        {'date': 'Week 02 2020', 'total_amount': 10.0},
+    ]
+    assert get_chart_series('sales', admin_user.id, 'bar', 'weekly', date(2019, 12, 30), date(2020, 1, 6)) is series
+
+
+def test_lttb_downsampling_keeps_peaks():
+    """
+    Test case for LTTB downsampling of long chart series.
+    Verifies the series is cut to the target size, keeps its end points and isolated spikes, and short series are untouched.
+    """
+    rows = [{'date': f'day-{index}', 'total_amount': float(index % 7)} for index in range(5000)]
+    rows[1234]['total_amount'] = 500.0
+    rows[4321]['total_amount'] = -500.0
+
+    reduced = downsample_series(rows, 'total_amount', 250)
+    assert len(reduced) == 250
+    assert reduced[0] is rows[0] and reduced[-1] is rows[-1]
+    assert rows[1234] in reduced and rows[4321] in reduced
+    assert list(lttb_indices([1.0, 2.0, 3.0], 10)) == [0, 1, 2]
+    assert downsample_series(rows[:10], 'total_amount', 250) == rows[:10]
+
+
+def test_live_dashboard_coalesces_commits(admin_user):
+    """
+    Test case for the live dashboard stream.
+    Verifies a burst of committed sales reaches the stream as one delta with only the changed tiles.
+    """
+    register_live_dashboard_events()
+    stream = stream_live_metrics(admin_user.id, interval=0, heartbeat=1, max_duration=10)
+    snapshot = next(stream)
+    assert snapshot.startswith('retry: ') and 'event: snapshot' in snapshot
+
+    for _ in range(3):
+        db.session.add(Sale(user_id=admin_user.id, total_price=5, sale_status='completed', created_at=datetime.now()))
+        db.session.commit()
+
+    delta = next(stream)
+    assert delta.startswith('event: delta')
+    assert '"today_sales":' in delta and 'low_stock_count' not in delta
+    stream.close()
+    assert admin_user.id not in dashboard_bus._channels
+
+
+def test_live_dashboard_falls_back_to_snapshot_when_full(test_client, admin_user, monkeypatch):
+    """
+    Test case for the live dashboard stream cap.
+    Verifies a stream past LIVE_DASHBOARD_MAX_STREAMS is refused with the snapshot URL, which serves the tiles as JSON.
+    """
+    with test_client.session_transaction() as session:
+        session['_user_id'] = str(admin_user.id)
+        session['_fresh'] = True
+    monkeypatch.setitem(current_app.config, 'LIVE_DASHBOARD_MAX_STREAMS', 0)
+
+    refused = test_client.get('/tables_reports/dashboard/live')
+    assert refused.status_code == 503
+    assert dashboard_bus.open_streams == 0
+
+    snapshot = test_client.get(refused.get_json()['snapshot_url'])
+    assert snapshot.status_code == 200
+    assert set(snapshot.get_json()) == {'today_revenue', 'today_units', 'today_sales', 'low_stock_count'}
+
+
+def test_report_email_outbox_retries_then_dead_letters(admin_user, tmp_path, monkeypatch):
+    """
+    Test case for the email outbox.
+    Verifies a queued report email is retried with backoff on a temporary SMTP error and dead-lettered on a permanent one.
+    """
+    report_file = tmp_path / 'sales_report.pdf'
+    report_file.write_bytes(b'%PDF-1.4')
+    entry = queue_report_email('sales', str(report_file), ['ops@example.com'])
+    assert entry.status == 'pending'
+
+    def temporary_failure(*args):
+        raise smtplib.SMTPDataError(421, 'Try again later')
+
+    monkeypatch.setattr(smtp_pool, 'send', temporary_failure)
+    assert drain_outbox()['retried'] >= 1
+    assert entry.status == 'pending' and entry.attempts == 1 and entry.next_attempt_at > datetime.utcnow()
+
+    def permanent_failure(*args):
+        raise smtplib.SMTPDataError(550, 'Mailbox unavailable')
+
+    entry.next_attempt_at = datetime.utcnow()
+    db.session.commit()
+    monkeypatch.setattr(smtp_pool, 'send', permanent_failure)
+    drain_outbox()
+    assert entry.status == 'dead' and entry.attempts == 2
+    assert get_outbox_metrics()['dead'] >= 1
+
+
+
+def test_email_outbox_counts_interrupted_sends(admin_user, monkeypatch):
+    """
+    Test case for the email outbox.
+    Verifies emails left in 'sending' by a crashed worker are retried with the lost send counted, and dead-lettered at the limit.
+    """
+    monkeypatch.setitem(current_app.config, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 3)
+    abandoned = datetime.utcnow() - timedelta(hours=1)
+    retried = enqueue_email('crashed-once@example.com', 'Interrupted')
+    exhausted = enqueue_email('crashed-often@example.com', 'Interrupted')
+    retried.status, retried.locked_at, retried.attempts = 'sending', abandoned, 0
+    exhausted.status, exhausted.locked_at, exhausted.attempts = 'sending', abandoned, 2
+    db.session.commit()
+
+    monkeypatch.setattr(smtp_pool, 'send', lambda *args: None)
+    assert drain_outbox()['dead'] >= 1
+    db.session.refresh(retried)
+    db.session.refresh(exhausted)
+    assert retried.status == 'sent' and retried.attempts == 2
+    assert exhausted.status == 'dead' and exhausted.attempts == 3
+
+def test_low_stock_digest_queues_one_email_per_tenant(admin_user, tmp_path, monkeypatch):
+    """
+    Test case for the low-stock digest job.
+    Verifies a tenant gets one queued digest listing its low items, with a CSV attached when the list is long.
+    """
+    monkeypatch.setitem(current_app.config, 'REPORT_STORAGE_DIR', str(tmp_path))
+    monkeypatch.setitem(current_app.config, 'LOW_STOCK_DIGEST_INLINE_ROWS', 1)
+    for index in range(2):
+        product = Product(name=f'Digest Widget {index}', price=5, cost_price=2, user_id=admin_user.id)
+        db.session.add(product)
+        db.session.flush()
+        db.session.add(Inventory(product_id=product.product_id, user_id=admin_user.id, sku=f'DIGEST-{index}',
+                                 stock_quantity=0, reorder_threshold=5, unit_price=5, cost_price=2))
+    db.session.commit()
+
+    assert queue_low_stock_digests() >= 1
+    digest = EmailOutbox.query.filter_by(recipients=admin_user.email).order_by(EmailOutbox.id.desc()).first()
+    assert digest.status == 'pending'
+    assert 'Digest Widget' in digest.html_body
+    assert digest.attachment_path and os.path.exists(digest.attachment_path)
+    with open(digest.attachment_path) as fp:
+        assert 'DIGEST-0' in fp.read()
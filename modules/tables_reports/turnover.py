@@ -0,0 +1,180 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import case
+from inventory_system import db
+from modules.inventory.models import Inventory
+from modules.products.models import InventoryMovement, Product
+from modules.sales.models import Sale, SaleItem
+from modules.suppliers.models import Supplier
+from modules.tables_reports.report_helpers import tenant_user_ids
+from modules.utils.cache import TTLCache
+
+DEFAULT_WINDOW_DAYS = 30
+MOVERS_LIMIT = 5
+
+analytics_cache = TTLCache(ttl=300)
+
+
+def _non_negative(expression):
+    """Clamp a reconstructed stock level at zero; ledgers with missing entries can otherwise go negative."""
+    return case((expression < 0, 0), else_=expression)
+
+
+def _turnover_statement(user_id, start_date, end_exclusive):
+    """
+    Build the per-product turnover query for a window.
+    Stock at the window edges is reconstructed from current on-hand stock by replaying sales and
+    receipts (the movement ledger) backwards, then window functions rank products and total per supplier.
+    """
+    tenant = tenant_user_ids(user_id)
+
+    sold = db.select(
+        SaleItem.product_id.label('product_id'),
+        db.func.sum(case((Sale.created_at < end_exclusive, SaleItem.quantity), else_=0)).label('in_window'),
+        db.func.sum(case((Sale.created_at >= end_exclusive, SaleItem.quantity), else_=0)).label('after_window'),
+    ).join(
+        Sale, Sale.id == SaleItem.sale_id
+    ).where(
+        Sale.user_id.in_(tenant),
+        Sale.created_at >= start_date,
+        db.func.coalesce(Sale.sale_status, '') != 'returned'
+    ).group_by(SaleItem.product_id).subquery('sold')
+
+    received = db.select(
+        InventoryMovement.product_id.label('product_id'),
+        db.func.sum(case((InventoryMovement.created_at < end_exclusive, InventoryMovement.quantity), else_=0)).label('in_window'),
+        db.func.sum(case((InventoryMovement.created_at >= end_exclusive, InventoryMovement.quantity), else_=0)).label('after_window'),
+    ).where(
+        InventoryMovement.user_id.in_(tenant),
+        InventoryMovement.created_at >= start_date
+    ).group_by(InventoryMovement.product_id).subquery('received')
+
+    on_hand = db.select(
+        Inventory.product_id.label('product_id'),
+        db.func.sum(Inventory.stock_quantity).label('quantity'),
+    ).where(Inventory.user_id.in_(tenant)).group_by(Inventory.product_id).subquery('on_hand')
+
+    sold_in_window = db.func.coalesce(sold.c.in_window, 0)
+    received_in_window = db.func.coalesce(received.c.in_window, 0)
+    end_stock = (
+        db.func.coalesce(on_hand.c.quantity, 0)
+        - db.func.coalesce(received.c.after_window, 0)
+        + db.func.coalesce(sold.c.after_window, 0)
+    )
+    begin_stock = end_stock - received_in_window + sold_in_window
+
+    stats = db.select(
+        Product.product_id,
+        Product.name.label('product_name'),
+        Product.supplier_id,
+        Supplier.name.label('supplier_name'),
+        db.func.coalesce(Product.cost_price, 0).label('cost_price'),
+        sold_in_window.label('units_sold'),
+        received_in_window.label('units_received'),
+        _non_negative(begin_stock).label('begin_stock'),
+        _non_negative(end_stock).label('end_stock'),
+    ).select_from(Product).outerjoin(
+        Supplier, Supplier.id == Product.supplier_id
+    ).outerjoin(
+        sold, sold.c.product_id == Product.product_id
+    ).outerjoin(
+        received, received.c.product_id == Product.product_id
+    ).outerjoin(
+        on_hand, on_hand.c.product_id == Product.product_id
+    ).where(Product.user_id.in_(tenant)).cte('product_stats')
+
+    average_stock = (stats.c.begin_stock + stats.c.end_stock) / 2.0
+    turnover = stats.c.units_sold / db.func.nullif(average_stock, 0)
+    by_supplier = {'partition_by': stats.c.supplier_id}
+
+    return db.select(
+        stats,
+        average_stock.label('average_stock'),
+        turnover.label('turnover'),
+        db.func.rank().over(order_by=db.func.coalesce(turnover, 0).desc()).label('turnover_rank'),
+        db.func.sum(stats.c.units_sold * stats.c.cost_price).over(**by_supplier).label('supplier_cogs'),
+        db.func.sum(average_stock * stats.c.cost_price).over(**by_supplier).label('supplier_average_value'),
+        db.func.sum(stats.c.units_sold).over(**by_supplier).label('supplier_units_sold'),
+        db.func.sum(stats.c.begin_stock + stats.c.units_received).over(**by_supplier).label('supplier_units_available'),
+    ).order_by('turnover_rank', stats.c.product_name)
+
+
+def _days_of_inventory(average_stock, units_sold, window_days):
+    """Days the average stock would last at the window's sales rate; None when nothing sold."""
+    if not units_sold:
+        return None
+    return round(float(average_stock) * window_days / float(units_sold), 1)
+
+
+def _sell_through(units_sold, units_available):
+    """Percentage of the stock available during the window that was sold."""
+    if not units_available:
+        return None
+    return round(float(units_sold) / float(units_available) * 100, 2)
+
+
+def _compute_turnover(user_id, start_date, end_date):
+    """Run the turnover query and shape per-product and per-supplier results."""
+    end_exclusive = end_date + timedelta(days=1)
+    window_days = (end_exclusive - start_date).days
+
+    products, suppliers = [], {}
+    for row in db.session.execute(_turnover_statement(user_id, start_date, end_exclusive)).mappings():
+        products.append({
+            'product_id': row['product_id'],
+            'product_name': row['product_name'],
+            'supplier_name': row['supplier_name'],
+            'units_sold': int(row['units_sold']),
+            'units_received': int(row['units_received']),
+            'begin_stock': int(row['begin_stock']),
+            'end_stock': int(row['end_stock']),
+            'turnover': round(float(row['turnover']), 2) if row['turnover'] is not None else None,
+            'days_of_inventory': _days_of_inventory(row['average_stock'], row['units_sold'], window_days),
+            'sell_through': _sell_through(row['units_sold'], row['begin_stock'] + row['units_received']),
+            'rank': row['turnover_rank'],
+        })
+        if row['supplier_id'] not in suppliers:
+            average_value = float(row['supplier_average_value'] or 0)
+            cogs = float(row['supplier_cogs'] or 0)
+            suppliers[row['supplier_id']] = {
+                'supplier_id': row['supplier_id'],
+                'supplier_name': row['supplier_name'] or 'No supplier',
+                'units_sold': int(row['supplier_units_sold'] or 0),
+                'cogs': round(cogs, 2),
+                'average_value': round(average_value, 2),
+                'turnover': round(cogs / average_value, 2) if average_value else None,
+                'days_of_inventory': round(average_value * window_days / cogs, 1) if cogs else None,
+                'sell_through': _sell_through(row['supplier_units_sold'], row['supplier_units_available']),
+            }
+
+    supplier_rows = sorted(suppliers.values(), key=lambda s: s['turnover'] or 0, reverse=True)
+    total_cogs = sum(supplier['cogs'] for supplier in supplier_rows)
+    total_average_value = sum(supplier['average_value'] for supplier in supplier_rows)
+    movers = [product for product in products if product['units_sold']]
+    return {
+        'start_date': start_date.strftime('%Y-%m-%d'),
+        'end_date': end_date.strftime('%Y-%m-%d'),
+        'window_days': window_days,
+        'overall_turnover': round(total_cogs / total_average_value, 2) if total_average_value else 0.0,
+        'products': products,
+        'suppliers': supplier_rows,
+        'top_movers': movers[:MOVERS_LIMIT],
+        'bottom_movers': [product for product in reversed(products) if product['begin_stock'] or product['end_stock']][:MOVERS_LIMIT],
+    }
+
+
+def get_inventory_turnover(user_id, start_date=None, end_date=None):
+    """
+    Return turnover, days of inventory and sell-through per product and per supplier for a window
+    (default: the last 30 days). Results are cached per tenant and window for ANALYTICS_CACHE_TTL seconds.
+    """
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end_date = end_date or today
+    start_date = start_date or end_date - timedelta(days=DEFAULT_WINDOW_DAYS - 1)
+
+    key = (user_id, 'inventory_turnover', start_date, end_date)
+    return analytics_cache.get_or_set(
+        key,
+        lambda: _compute_turnover(user_id, start_date, end_date),
+        ttl=current_app.config.get('ANALYTICS_CACHE_TTL', 300)
+    )
@@ -0,0 +1,252 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from flask import current_app
+from inventory_system import db
+from modules.business.models import Business
+from modules.expenses.models import Category, Expense
+from modules.products.models import Product
+from modules.sales.models import Sale, SaleItem
+from modules.tables_reports.models import DailyRollup, RollupDirtyDay
+from modules.tables_reports.report_helpers import tenant_user_ids
+from modules.tables_reports.report_queries import STREAM_BATCH_SIZE
+from modules.utils.cache import TTLCache
+
+VAT_LINE_COLUMNS = ['source', 'reference', 'line_date', 'description', 'net_amount', 'vat_amount', 'gross_amount']
+
+VAT_TOTAL_FIELDS = ('sales_net', 'output_vat', 'purchases_gross', 'input_vat')
+
+vat_cache = TTLCache(ttl=300)
+
+
+def get_vat_settings(tenant_id):
+    """Return the tenant's (vat_id, vat_rate as a Decimal percentage) from its Business profile."""
+    row = db.session.execute(
+        db.select(Business.vat_id, Business.vat_rate).where(Business.user_id == tenant_id)
+    ).first()
+    if row is None:
+        return None, Decimal('0')
+    return row.vat_id, Decimal(str(row.vat_rate or 0))
+
+
+def _as_date(value):
+    return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+
+
+def _money(expression):
+    """Round an amount to cents in the database, so every line is rounded exactly once and the same way."""
+    return db.func.round(db.cast(expression, db.Numeric(14, 4)), 2)
+
+
+def _sale_line_amounts(rate):
+    """
+    Net and output VAT per sale item. Assumes sale prices are recorded net of VAT, as receipt.html
+    does when it prints VAT and the VAT-inclusive total on top of the sale total; nothing stores
+    VAT on the sale itself. VAT is the rate applied to the discounted line total.
+    """
+    net = _money(SaleItem.quantity * SaleItem.price_per_unit
+                 * (100 - db.func.coalesce(SaleItem.discount_percentage, 0)) / 100)
+    return net, _money(net * rate / 100)
+
+
+def _expense_line_amounts(rate):
+    """Gross and input VAT per expense. Expenses are recorded as paid, i.e. VAT-inclusive."""
+    gross = _money(Expense.amount)
+    return gross, _money(gross * rate / (100 + rate))
+
+
+def _sales_criteria(tenant, start_date, end_exclusive):
+    criteria = [Sale.user_id.in_(tenant), db.func.coalesce(Sale.sale_status, '') != 'returned']
+    if start_date is not None:
+        criteria += [Sale.created_at >= start_date, Sale.created_at < end_exclusive]
+    return criteria
+
+
+def _expense_criteria(tenant, start_date, end_exclusive):
+    criteria = [Expense.user_id.in_(tenant)]
+    if start_date is not None:
+        criteria += [Expense.date_incurred >= start_date, Expense.date_incurred < end_exclusive]
+    return criteria
+
+
+def _daily_totals_statement(tenant_id, rate, start_date=None, end_exclusive=None):
+    """One UNION ALL of per-day output VAT on sales and input VAT on expenses, for a date range or all history."""
+    tenant = tenant_user_ids(tenant_id)
+    net, output_vat = _sale_line_amounts(rate)
+    gross, input_vat = _expense_line_amounts(rate)
+
+    sale_day = db.func.date(Sale.created_at)
+    sales = db.select(
+        sale_day.label('day'),
+        db.func.sum(net).label('sales_net'),
+        db.func.sum(output_vat).label('output_vat'),
+        db.literal(0).label('purchases_gross'),
+        db.literal(0).label('input_vat'),
+    ).select_from(SaleItem).join(
+        Sale, Sale.id == SaleItem.sale_id
+    ).where(*_sales_criteria(tenant, start_date, end_exclusive)).group_by(sale_day)
+
+    expense_day = db.func.date(Expense.date_incurred)
+    expenses = db.select(
+        expense_day.label('day'),
+        db.literal(0).label('sales_net'),
+        db.literal(0).label('output_vat'),
+        db.func.sum(gross).label('purchases_gross'),
+        db.func.sum(input_vat).label('input_vat'),
+    ).where(*_expense_criteria(tenant, start_date, end_exclusive)).group_by(expense_day)
+
+    return db.union_all(sales, expenses)
+
+
+def compute_daily_vat(tenant_id, days=None):
+    """
+    Per-day VAT totals of a tenant at its current rate, limited to a set of days (None means full
+    history). Called from the rollup refresh; returns ({day: {field: Decimal}}, rate).
+    """
+    _, rate = get_vat_settings(tenant_id)
+    bounds = (min(days), max(days) + timedelta(days=1)) if days else (None, None)
+    totals = {}
+    for row in db.session.execute(_daily_totals_statement(tenant_id, rate, *bounds)):
+        day = _as_date(row.day)
+        if days is not None and day not in days:
+            continue
+        day_totals = totals.setdefault(day, _empty_totals())
+        for field in VAT_TOTAL_FIELDS:
+            day_totals[field] += Decimal(str(row._mapping[field] or 0))
+    return totals, rate
+
+
+def _rollup_vat_days(tenant_id, rate, year):
+    """
+    The year's per-day VAT totals from the daily rollups, or None while they lag the ledgers: a day
+    of the year is waiting to be refreshed, or some days were computed at a different VAT rate.
+    """
+    start_date, end_exclusive = date(year, 1, 1), date(year + 1, 1, 1)
+    tenant = tenant_user_ids(tenant_id)
+    dirty = db.session.scalar(db.select(db.func.count(RollupDirtyDay.id)).where(
+        RollupDirtyDay.user_id.in_(tenant), RollupDirtyDay.day >= start_date, RollupDirtyDay.day < end_exclusive
+    ))
+    if dirty:
+        return None
+    rows = db.session.execute(db.select(
+        DailyRollup.day, DailyRollup.vat_rate, *[getattr(DailyRollup, field) for field in VAT_TOTAL_FIELDS]
+    ).where(
+        DailyRollup.user_id == tenant_id, DailyRollup.day >= start_date, DailyRollup.day < end_exclusive
+    )).all()
+    if not rows or any(row.vat_rate is None or Decimal(str(row.vat_rate)) != rate for row in rows):
+        return None
+    return rows
+
+
+def _empty_totals():
+    return {field: Decimal('0') for field in VAT_TOTAL_FIELDS}
+
+
+def _shape(label, totals):
+    """Convert summed Decimals to floats and add the net VAT payable (negative means reclaimable)."""
+    return {
+        'period': label,
+        **{field: float(value) for field, value in totals.items()},
+        'net_vat': float(totals['output_vat'] - totals['input_vat']),
+    }
+
+
+def _compute_vat_summary(tenant_id, year):
+    """
+    Sum a year's daily VAT totals into months, quarters and the year; all sums stay in Decimal.
+    The days come from the rollups when they are current, otherwise from one scan of the ledgers.
+    """
+    vat_id, rate = get_vat_settings(tenant_id)
+    rows = _rollup_vat_days(tenant_id, rate, year)
+    if rows is None:
+        rows = db.session.execute(_daily_totals_statement(tenant_id, rate, datetime(year, 1, 1), datetime(year + 1, 1, 1)))
+
+    months = [_empty_totals() for _ in range(12)]
+    for row in rows:
+        month = months[int(str(row.day)[5:7]) - 1]
+        for field in month:
+            month[field] += Decimal(str(row._mapping[field] or 0))
+
+    quarters = [_empty_totals() for _ in range(4)]
+    year_totals = _empty_totals()
+    for index, month in enumerate(months):
+        for field, value in month.items():
+            quarters[index // 3][field] += value
+            year_totals[field] += value
+
+    return {
+        'year': year,
+        'vat_id': vat_id,
+        'vat_rate': float(rate),
+        'months': [_shape(date(year, index + 1, 1).strftime('%b %Y'), month) for index, month in enumerate(months)],
+        'quarters': [_shape(f'Q{index + 1} {year}', quarter) for index, quarter in enumerate(quarters)],
+        'total': _shape(str(year), year_totals),
+    }
+
+
+def get_vat_summary(tenant_id, year=None):
+    """
+    Return output VAT on sales and input VAT on expenses per month and quarter of a year.
+    Each line is rounded to cents once, in SQL, so the totals always equal the sum of the exported lines.
+    Cached per tenant, year and VAT rate for ANALYTICS_CACHE_TTL seconds.
+    """
+    year = year or datetime.now().year
+    _, rate = get_vat_settings(tenant_id)
+    return vat_cache.get_or_set(
+        (tenant_id, 'vat_summary', year, rate),
+        lambda: _compute_vat_summary(tenant_id, year),
+        ttl=current_app.config.get('ANALYTICS_CACHE_TTL', 300)
+    )
+
+
+def quarter_bounds(year, quarter):
+    """Inclusive first and last day of a calendar quarter."""
+    start = datetime(year, (quarter - 1) * 3 + 1, 1)
+    end = datetime(year + quarter // 4, quarter % 4 * 3 + 1, 1) - timedelta(days=1)
+    return start, end
+
+
+def _vat_lines_statement(tenant_id, rate, start_date, end_exclusive):
+    """Every sale item and expense behind a VAT period, with the same per-line rounding as the summary."""
+    tenant = tenant_user_ids(tenant_id)
+    net, output_vat = _sale_line_amounts(rate)
+    gross, input_vat = _expense_line_amounts(rate)
+
+    sales = db.select(
+        db.literal('sale').label('source'),
+        Sale.receipt_number.label('reference'),
+        Sale.created_at.label('line_date'),
+        Product.name.label('description'),
+        net.label('net_amount'),
+        output_vat.label('vat_amount'),
+        (net + output_vat).label('gross_amount'),
+    ).select_from(SaleItem).join(
+        Sale, Sale.id == SaleItem.sale_id
+    ).join(
+        Product, Product.product_id == SaleItem.product_id
+    ).where(*_sales_criteria(tenant, start_date, end_exclusive))
+
+    expenses = db.select(
+        db.literal('expense').label('source'),
+        Expense.reference_number.label('reference'),
+        Expense.date_incurred.label('line_date'),
+        db.func.coalesce(Expense.description, Category.name).label('description'),
+        (gross - input_vat).label('net_amount'),
+        input_vat.label('vat_amount'),
+        gross.label('gross_amount'),
+    ).outerjoin(
+        Category, Category.id == Expense.category_id
+    ).where(*_expense_criteria(tenant, start_date, end_exclusive))
+
+    lines = db.union_all(sales, expenses).subquery('vat_lines')
+    return db.select(lines).order_by(lines.c.line_date, lines.c.source)
+
+
+def stream_vat_lines(tenant_id, start_date, end_date):
+    """Yield the supporting VAT lines for an inclusive date range from a server-side cursor."""
+    _, rate = get_vat_settings(tenant_id)
+    statement = _vat_lines_statement(tenant_id, rate, start_date, end_date + timedelta(days=1))
+    result = db.session.execute(
+        statement.execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+    )
+    for row in result:
+        yield row._mapping
@@ -1,4 +1,5 @@
 from flask import Blueprint, render_template, request, jsonify
+from flask_login import current_user
 from modules.tables_reports.pdf_generator import generate_pdf
 from modules.tables_reports.excel_exporter import export_to_excel
 from modules.tables_reports.email_service import send_report_email
@@ -40,11 +41,11 @@ def download_report(report_type):
     data = {}  # This should contain the data relevant to the report
 
     if format == 'pdf':
-        pdf_file = generate_pdf(report_type, data)
+        pdf_file = generate_pdf(report_type, data, current_user.id)
         return pdf_file  # or send as response attachment
 
     elif format == 'excel':
-        excel_file = export_to_excel(report_type, data)
+        excel_file = export_to_excel(report_type, data, current_user.id)
         return excel_file  # or send as response attachment
     return jsonify({"message": "Invalid format"}), 400
 
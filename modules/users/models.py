@@ -75,8 +75,9 @@ class User(db.Model, UserMixin):
     role = db.Column(db.String(50), default='admin')
     status = db.Column(db.String(50), default='active')
     last_login = db.Column(db.DateTime(timezone=True), nullable=True)
-    trial_expiry_date = db.Column(db.DateTime(timezone=True), nullable=True)
+    trial_expiry_date = db.Column(db.DateTime(timezone=True), nullable=True, index=True)  # Indexed for the reminder windows
     notification_sent = db.Column(db.Boolean, default=False)
+    trial_reminders_sent = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Bit per reminder milestone already sent
     created_at = db.Column(db.DateTime(timezone=True), default=get_utc_now)
     updated_at = db.Column(
         db.DateTime(timezone=True),
@@ -1,5 +1,10 @@
 import pytest
+from datetime import timedelta
 from werkzeug.security import generate_password_hash
+from inventory_system import db
+from modules.users.models import User, get_utc_now
+from modules.users.trial_reminders import queue_trial_reminders
+from modules.utils.email_automation.models import EmailOutbox
 
 
 @pytest.fixture(scope='module')
@@ -126,3 +131,25 @@ def test_get_nonexistent_user(test_client):
     response_data = response.json
     assert 'message' in response_data
     assert response_data['message'] == 'User not found'
+
+def test_trial_reminders_fire_once_per_milestone(test_client):
+    """
+    Test case for the trial reminder job.
+    Verifies only users inside a reminder window are queued, and a second run queues nothing new.
+    """
+    now = get_utc_now()
+    due = User(username='trial_due', hashed_password=generate_password_hash('pw'), email='trial_due@example.com',
+               role='admin', trial_expiry_date=now + timedelta(days=3, hours=6))
+    not_due = User(username='trial_later', hashed_password=generate_password_hash('pw'), email='trial_later@example.com',
+                   role='admin', trial_expiry_date=now + timedelta(days=20))
+    db.session.add_all([due, not_due])
+    db.session.commit()
+
+    first = queue_trial_reminders(now)
+    assert first[3] >= 1
+    assert EmailOutbox.query.filter_by(recipients='trial_due@example.com').count() == 1
+    assert EmailOutbox.query.filter_by(recipients='trial_later@example.com').count() == 0
+
+    assert queue_trial_reminders(now)[3] == 0
+    db.session.refresh(due)
+    assert due.trial_reminders_sent & 2 and due.notification_sent
@@ -0,0 +1,44 @@
+from datetime import timedelta
+from inventory_system import db
+from modules.users.models import User, get_utc_now
+from modules.utils.email_automation import email_automation
+from modules.utils.email_automation.outbox import enqueue_emails
+
+# Days before trial expiry -> bit recorded in User.trial_reminders_sent once that reminder is queued
+TRIAL_REMINDER_MILESTONES = {7: 1, 3: 2, 1: 4}
+
+
+def _due_reminders_statement(days, bit, now):
+    """Users whose trial ends between `days` and `days + 1` days from now and who have not had this reminder."""
+    return db.select(User).where(
+        User.trial_expiry_date >= now + timedelta(days=days),
+        User.trial_expiry_date < now + timedelta(days=days + 1),
+        User.trial_reminders_sent.op('&')(bit) == 0,
+        User.email.isnot(None)
+    )
+
+
+def queue_trial_reminders(now=None):
+    """
+    Queue the 7, 3 and 1 day trial expiry reminders that are due. Each milestone is one range scan
+    on the trial_expiry_date index, so the work grows with the reminders due rather than the users
+    registered; the emails are inserted in bulk and the recipients flagged with one UPDATE, in the
+    same transaction. A milestone's bit is set once queued, so each reminder fires exactly once however
+    often this runs. Returns {days: reminders queued}.
+    """
+    now = now or get_utc_now()
+    queued = {}
+    for days, bit in TRIAL_REMINDER_MILESTONES.items():
+        users = db.session.scalars(_due_reminders_statement(days, bit, now)).all()
+        queued[days] = enqueue_emails(
+            [email_automation.build_trial_expiry_reminder(user, days) for user in users], commit=False
+        )
+        if users:
+            db.session.execute(
+                db.update(User)
+                .where(User.id.in_([user.id for user in users]))
+                .values(trial_reminders_sent=User.trial_reminders_sent.op('|')(bit), notification_sent=True)
+                .execution_options(synchronize_session=False)
+            )
+        db.session.commit()
+    return queued
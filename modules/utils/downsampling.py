@@ -0,0 +1,44 @@
+import numpy as np
+
+
+def lttb_indices(y, threshold, x=None):
+    """
+    Largest-Triangle-Three-Buckets: pick `threshold` points of a series (x ascending, default 0..n-1)
+    that keep its visual shape. The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with its neighbours, so peaks and troughs survive.
+    Returns the sorted indices of the kept points.
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.arange(n, dtype=float) if x is None else np.asarray(x, dtype=float)
+
+    # Bucket boundaries for the points between the first and the last
+    every = (n - 2) / (threshold - 2)
+    bounds = np.append((np.arange(threshold - 1) * every).astype(np.int64) + 1, n)
+
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start, end = bounds[bucket], bounds[bucket + 1]
+        next_start, next_end = bounds[bucket + 1], bounds[bucket + 2]
+        average_x = x[next_start:next_end].mean()
+        average_y = y[next_start:next_end].mean()
+        # Twice the triangle area; the constant factor does not change the argmax
+        areas = np.abs(
+            (x[selected] - average_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (average_y - y[selected])
+        )
+        selected = start + int(areas.argmax())
+        indices[bucket + 1] = selected
+    return indices
+
+
+def downsample_series(rows, y_key, threshold):
+    """Reduce a list of chart rows (already in x order) to at most `threshold` rows with LTTB."""
+    if not rows or len(rows) <= threshold:
+        return rows
+    values = np.fromiter((float(row[y_key] or 0) for row in rows), dtype=float, count=len(rows))
+    return [rows[index] for index in lttb_indices(values, threshold)]
@@ -1,12 +1,9 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import smtplib
-from datetime import datetime
 import os
 from flask import current_app
 from modules.utils.logger import setup_logger
+from modules.utils.email_automation.smtp_pool import smtp_pool
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -38,6 +35,8 @@ class EmailAutomation:
         # Load Gmail credentials from environment or app config
         self.gmail_user = app.config.get('MAIL_USERNAME') or os.environ.get('GMAIL_USER')
         self.gmail_password = app.config.get('MAIL_PASSWORD') or os.environ.get('GMAIL_APP_PASSWORD')
+        # Every sender shares the pooled SMTP connections
+        smtp_pool.configure(app.config)
 
         if not self.gmail_user or not self.gmail_password:
             logger.error("Gmail credentials not configured!")
@@ -55,46 +54,22 @@ class EmailAutomation:
         except Exception as e:
             logger.error(f"Failed to start email automation scheduler: {str(e)}")
 
-    def send_email(self, to_email, subject, html_content):
-        print(f"\nStarting email send process...")
-        print(f"To: {to_email}")
-        print(f"From: {self.gmail_user}")
-        print(f"Subject: {subject}")
-
-        if not self.gmail_user or not self.gmail_password:
-            print("ERROR: Missing Gmail credentials!")
-            return False
-
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        msg['From'] = f"BMSgo <{self.gmail_user}>"
-        msg['To'] = to_email
+    @property
+    def sender(self):
+        """From header for automated emails (MAIL_DEFAULT_SENDER is used when credentials are not set)."""
+        return f"BMSgo <{self.gmail_user}>" if self.gmail_user else None
 
-        html_part = MIMEText(html_content, 'html')
-        msg.attach(html_part)
+    def send_email(self, to_email, subject, html_content):
+        """Queue an HTML email in the outbox; the outbox worker delivers it over the shared SMTP pool."""
+        from inventory_system import db  # Import here to avoid circular imports
+        from modules.utils.email_automation.outbox import enqueue_email
 
         try:
-            print("\nAttempting SMTP connection...")
-            with smtplib.SMTP_SSL('smtp.gmail.com', 465, timeout=10) as smtp_server:
-                print("SMTP connection established")
-
-                print("Attempting login...")
-                smtp_server.login(self.gmail_user, self.gmail_password)
-                print("Login successful")
-
-                print("Sending email...")
-                smtp_server.sendmail(self.gmail_user, to_email, msg.as_string())
-                print("Email sent successfully!")
-
-                return True
-        except smtplib.SMTPAuthenticationError as auth_error:
-            print(f"Authentication failed: {str(auth_error)}")
-            return False
-        except smtplib.SMTPException as smtp_error:
-            print(f"SMTP error occurred: {str(smtp_error)}")
-            return False
+            enqueue_email(to_email, subject, html_body=html_content, sender=self.sender)
+            return True
         except Exception as e:
-            print(f"Unexpected error: {str(e)}")
+            db.session.rollback()
+            logger.error(f"Failed to queue email to {to_email}: {str(e)}")
             return False
 
     def send_welcome_email(self, user):
@@ -153,6 +128,11 @@ class EmailAutomation:
 
     def send_trial_expiry_reminder(self, user, days_remaining):
         """Send strategic trial expiration reminder"""
+        email = self.build_trial_expiry_reminder(user, days_remaining)
+        self.send_email(email['recipients'], email['subject'], email['html_body'])
+
+    def build_trial_expiry_reminder(self, user, days_remaining):
+        """Render the trial expiration reminder as enqueue_emails() keyword arguments"""
         subject = f"Don't Miss Out! Your BMSgo Trial Ends in {days_remaining} Days"
         html = f"""
         <html>
@@ -205,7 +185,7 @@ class EmailAutomation:
             </body>
         </html>
         """
-        self.send_email(user.email, subject, html)
+        return {'recipients': user.email, 'subject': subject, 'html_body': html, 'sender': self.sender}
 
     def send_subscription_confirmation(self, user, plan_type):
         """Send strategic subscription confirmation"""
@@ -245,46 +225,6 @@ class EmailAutomation:
         """
         self.send_email(user.email, subject, html)
 
-    def send_low_inventory_alert(self, user, low_stock_items):
-        """Send low inventory alert email"""
-        subject = "BMSgo - Low Inventory Alert!"
-        html = f"""
-        <html>
-            <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-                <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
-                    <h2 style="color: #2c5282;">⚠️ Low Inventory Alert</h2>
-                    <p>Hello {user.first_name},</p>
-
-                    <div style="background-color: #fff5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
-                        <p>The following items have reached their reorder point:</p>
-                        <table style="width: 100%; border-collapse: collapse;">
-                            <thead>
-                                <tr style="background-color: #fed7d7;">
-                                    <th style="padding: 8px; text-align: left;">Product</th>
-                                    <th style="padding: 8px; text-align: center;">Current Stock</th>
-                                    <th style="padding: 8px; text-align: center;">Reorder Point</th>
-                                </tr>
-                            </thead>
-                            <tbody>
-                                {self._generate_low_stock_rows(low_stock_items)}
-                            </tbody>
-                        </table>
-                    </div>
-
-                    <div style="text-align: center; margin: 30px 0;">
-                        <a href="{current_app.config.get('SITE_URL', 'https://bmsgo.online')}/inventory" 
-                           style="background-color: #4299e1; color: white; padding: 12px 25px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                            Manage Inventory
-                        </a>
-                    </div>
-
-                    <p style="margin-top: 20px;">Best regards,<br>The BMSgo Team</p>
-                </div>
-            </body>
-        </html>
-        """
-        self.send_email(user.email, subject, html)
-
     def send_payment_failed_notification(self, user, error_message=None):
         """Send payment failure notification"""
         subject = "BMSgo - Important: Payment Failed"
@@ -316,70 +256,33 @@ class EmailAutomation:
         self.send_email(user.email, subject, html)
 
     def check_trial_reminders(self):
-        """Check and send trial reminders"""
+        """Queue the 7, 3 and 1 day trial reminders that are due"""
         with self.app.app_context():
             try:
-                from modules.users.models import User  # Import here to avoid circular imports
-
-                # Get users with active trials
-                users = User.query.filter(
-                    User.trial_expiry_date.isnot(None),
-                    User.notification_sent == False
-                ).all()
+                from modules.users.trial_reminders import queue_trial_reminders  # Import here to avoid circular imports
 
-                for user in users:
-                    days_remaining = (user.trial_expiry_date - datetime.now()).days
-                    if days_remaining in [7, 3, 1]:  # Send reminders at these intervals
-                        self.send_trial_expiry_reminder(user, days_remaining)
-                        user.notification_sent = True
-                        user.save()
+                queued = queue_trial_reminders()
+                logger.info(f"Queued {sum(queued.values())} trial reminder(s)")
 
             except Exception as e:
                 logger.error(f"Error in check_trial_reminders: {str(e)}")
 
     def check_low_inventory(self):
-        """Check and send low inventory alerts"""
+        """Queue the low inventory digest for every tenant with items at or below their reorder threshold"""
         with self.app.app_context():
             try:
-                from modules.users.models import User, Inventory  # Import here to avoid circular imports
-
-                # Get all items with low stock
-                low_stock_items = Inventory.query.filter(
-                    Inventory.quantity <= Inventory.reorder_point
-                ).all()
-
-                # Group items by user
-                user_items = {}
-                for item in low_stock_items:
-                    if item.user_id not in user_items:
-                        user_items[item.user_id] = []
-                    user_items[item.user_id].append(item)
-
-                # Send alerts to each user
-                for user_id, items in user_items.items():
-                    user = User.query.get(user_id)
-                    if user and user.email:
-                        self.send_low_inventory_alert(user, items)
+                from modules.utils.email_automation.low_stock_digest import queue_low_stock_digests  # Import here to avoid circular imports
+
+                queued = queue_low_stock_digests()
+                logger.info(f"Queued {queued} low inventory digest(s)")
 
             except Exception as e:
                 logger.error(f"Error in check_low_inventory: {str(e)}")
 
-    def _generate_low_stock_rows(self, items):
-        """Helper method to generate HTML table rows for low stock items"""
-        rows = ""
-        for item in items:
-            rows += f"""
-                <tr>
-                    <td style="padding: 8px; border-top: 1px solid #eee;">{item.name}</td>
-                    <td style="padding: 8px; border-top: 1px solid #eee; text-align: center;">{item.quantity}</td>
-                    <td style="padding: 8px; border-top: 1px solid #eee; text-align: center;">{item.reorder_point}</td>
-                </tr>
-            """
-        return rows
-
     def cleanup(self):
         """Cleanup method to be called when shutting down the application"""
         self.scheduler.shutdown()
+        smtp_pool.close()
 
 # Create a single instance
 email_automation = EmailAutomation()
@@ -0,0 +1,115 @@
+import csv
+import os
+import shutil
+from datetime import date, timedelta
+from itertools import groupby
+from flask import current_app
+from sqlalchemy.orm import aliased
+from inventory_system import db
+from modules.inventory.models import Inventory
+from modules.products.models import Product
+from modules.tables_reports.report_queries import STREAM_BATCH_SIZE
+from modules.users.models import User
+from modules.utils.email_automation.outbox import enqueue_emails
+
+LOW_STOCK_TEMPLATE = 'emails/low_stock_digest.html'
+CSV_COLUMNS = ('product', 'sku', 'stock_quantity', 'reorder_threshold')
+CSV_RETENTION_DAYS = 7
+
+
+def _low_stock_statement():
+    """
+    Every low-stock item with the tenant owner it belongs to, in one join ordered by tenant.
+    Items entered by staff roll up to their admin, who receives the digest.
+    """
+    row_owner = aliased(User)
+    tenant = aliased(User)
+    tenant_id = db.case(
+        (db.and_(row_owner.role == 'staff', row_owner.parent_id.isnot(None)), row_owner.parent_id),
+        else_=row_owner.id
+    )
+    return db.select(
+        tenant.id.label('tenant_id'),
+        tenant.email,
+        db.func.coalesce(tenant.first_name, tenant.username).label('name'),
+        db.func.coalesce(Product.name, Inventory.sku).label('product'),
+        Inventory.sku,
+        Inventory.stock_quantity,
+        Inventory.reorder_threshold,
+    ).join(
+        row_owner, row_owner.id == Inventory.user_id
+    ).join(
+        tenant, tenant.id == tenant_id
+    ).outerjoin(
+        Product, Product.product_id == Inventory.product_id
+    ).where(
+        Inventory.stock_quantity <= Inventory.reorder_threshold,
+        tenant.email.isnot(None),
+        tenant.email != ''
+    ).order_by(tenant.id, Inventory.stock_quantity - Inventory.reorder_threshold, Inventory.sku)
+
+
+def _write_csv(csv_dir, tenant_id, items):
+    path = os.path.join(csv_dir, f"low_stock_{tenant_id}.csv")
+    with open(path, 'w', newline='', encoding='utf-8') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows([item[column] for column in CSV_COLUMNS] for item in items)
+    return path
+
+
+def _prune_csv_dirs(base_dir, today):
+    """Drop attachment folders from earlier runs once their emails have had time to go out."""
+    cutoff = (today - timedelta(days=CSV_RETENTION_DAYS)).isoformat()
+    for name in os.listdir(base_dir):
+        if name < cutoff:
+            shutil.rmtree(os.path.join(base_dir, name), ignore_errors=True)
+
+
+def queue_low_stock_digests(today=None):
+    """
+    Queue one low-stock digest per tenant in the email outbox. Rows stream from a single join on
+    their own connection, tenant by tenant; each digest is rendered from the compiled template,
+    with the full list attached as CSV when it is longer than LOW_STOCK_DIGEST_INLINE_ROWS, and
+    the emails are inserted LOW_STOCK_DIGEST_BATCH_SIZE at a time. Returns the number of digests queued.
+    """
+    config = current_app.config
+    today = today or date.today()
+    inline_rows = config.get('LOW_STOCK_DIGEST_INLINE_ROWS', 25)
+    batch_size = config.get('LOW_STOCK_DIGEST_BATCH_SIZE', 500)
+    site_url = config.get('SITE_URL', 'https://bmsgo.online').rstrip('/')
+    sender = f"BMSgo <{config['MAIL_DEFAULT_SENDER']}>" if config.get('MAIL_DEFAULT_SENDER') else None
+    template = current_app.jinja_env.get_template(LOW_STOCK_TEMPLATE)  # Compiled once, rendered per tenant
+
+    base_dir = os.path.join(config['REPORT_STORAGE_DIR'], 'low_stock_digests')
+    csv_dir = os.path.join(base_dir, today.isoformat())
+    os.makedirs(csv_dir, exist_ok=True)
+    _prune_csv_dirs(base_dir, today)
+
+    emails, queued = [], 0
+    # The read streams on its own connection so the session can insert outbox rows meanwhile
+    with db.engine.connect() as connection:
+        result = connection.execute(
+            _low_stock_statement().execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE)
+        )
+        for tenant_id, rows in groupby(result.mappings(), key=lambda row: row['tenant_id']):
+            items = list(rows)
+            attachment_path = _write_csv(csv_dir, tenant_id, items) if len(items) > inline_rows else None
+            emails.append({
+                'recipients': items[0]['email'],
+                'subject': f"BMSgo - {len(items)} item{'s' if len(items) != 1 else ''} at or below reorder level",
+                'html_body': template.render(
+                    name=items[0]['name'],
+                    items=items[:inline_rows],
+                    total_items=len(items),
+                    attached=attachment_path is not None,
+                    inventory_url=f"{site_url}/inventory/low-stock-alerts"
+                ),
+                'attachment_path': attachment_path,
+                'sender': sender,
+            })
+            if len(emails) >= batch_size:
+                queued += enqueue_emails(emails)
+                emails = []
+    queued += enqueue_emails(emails)
+    return queued
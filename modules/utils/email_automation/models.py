@@ -0,0 +1,43 @@
+from inventory_system import db
+from datetime import datetime
+
+
+class EmailOutbox(db.Model):
+    """An email waiting to be delivered (or already delivered) by the outbox worker."""
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    sender = db.Column(db.String(255), nullable=True)  # Defaults to MAIL_DEFAULT_SENDER at delivery time
+    recipients = db.Column(db.Text, nullable=False)  # Comma-separated addresses
+    subject = db.Column(db.String(255), nullable=False)
+    html_body = db.Column(db.Text, nullable=True)
+    text_body = db.Column(db.Text, nullable=True)
+    attachment_path = db.Column(db.String(255), nullable=True)  # File attached at delivery time, e.g. a stored report
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'sending', 'sent' or 'dead'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)  # When a worker claimed the row
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # The worker's claim query: due rows of one status in retry order
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    def to_dict(self):
+        """Convert the EmailOutbox instance to a dictionary."""
+        return {
+            "id": self.id,
+            "sender": self.sender,
+            "recipients": self.recipients,
+            "subject": self.subject,
+            "attachment_path": self.attachment_path,
+            "status": self.status,
+            "attempts": self.attempts,
+            "next_attempt_at": self.next_attempt_at,
+            "last_error": self.last_error,
+            "created_at": self.created_at,
+            "sent_at": self.sent_at
+        }
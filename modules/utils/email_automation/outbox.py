@@ -0,0 +1,266 @@
+import mimetypes
+import os
+import random
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from flask import current_app
+from inventory_system import db
+from modules.utils.email_automation.models import EmailOutbox
+from modules.utils.email_automation.smtp_pool import smtp_pool
+from modules.utils.logger import setup_logger
+
+logger = setup_logger('email_outbox')
+
+OUTBOX_STATUSES = ('pending', 'sending', 'sent', 'dead')
+
+
+class PermanentDeliveryError(Exception):
+    """Delivery can never succeed (missing attachment, rejected recipient); the email is dead-lettered."""
+
+
+def _outbox_values(recipients, subject, html_body=None, text_body=None, attachment_path=None, sender=None):
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    return {
+        'sender': sender,
+        'recipients': ', '.join(recipients),
+        'subject': subject,
+        'html_body': html_body,
+        'text_body': text_body,
+        'attachment_path': attachment_path,
+        'status': 'pending',
+        'attempts': 0,
+        'next_attempt_at': datetime.utcnow(),
+        'created_at': datetime.utcnow(),
+    }
+
+
+def enqueue_email(recipients, subject, html_body=None, text_body=None, attachment_path=None, sender=None, commit=True):
+    """
+    Store an email in the outbox for the background worker and return the row. Callers never
+    wait on SMTP; pass commit=False to enqueue inside the caller's own transaction.
+    """
+    entry = EmailOutbox(**_outbox_values(recipients, subject, html_body, text_body, attachment_path, sender))
+    db.session.add(entry)
+    if commit:
+        db.session.commit()
+    return entry
+
+
+def enqueue_emails(emails, commit=True):
+    """
+    Bulk enqueue_email for jobs that queue many emails at once: `emails` is a list of enqueue_email
+    keyword dicts, written with one multi-row INSERT. Returns the number of emails queued.
+    """
+    if emails:
+        db.session.execute(db.insert(EmailOutbox), [_outbox_values(**email) for email in emails])
+    if commit:
+        db.session.commit()
+    return len(emails)
+
+
+def _build_message(entry, default_sender):
+    msg = EmailMessage()
+    msg['Subject'] = entry.subject
+    msg['From'] = entry.sender or default_sender
+    msg['To'] = entry.recipients
+    msg.set_content(entry.text_body or 'This email is best viewed in an HTML-capable client.')
+    if entry.html_body:
+        msg.add_alternative(entry.html_body, subtype='html')
+
+    if entry.attachment_path:
+        if not os.path.exists(entry.attachment_path):
+            raise PermanentDeliveryError(f"Attachment {entry.attachment_path} no longer exists")
+        mime_type = mimetypes.guess_type(entry.attachment_path)[0] or 'application/octet-stream'
+        maintype, subtype = mime_type.split('/', 1)
+        with open(entry.attachment_path, 'rb') as fp:
+            msg.add_attachment(fp.read(), maintype=maintype, subtype=subtype,
+                               filename=os.path.basename(entry.attachment_path))
+    return msg
+
+
+def _deliver_chunk(payloads):
+    """Worker thread: send a chunk over one pooled SMTP session. Returns {entry id: error or None}."""
+    results = {}
+    with smtp_pool.batch():
+        for entry_id, sender, recipients, message in payloads:
+            try:
+                smtp_pool.send(sender, recipients, message.as_bytes())
+                results[entry_id] = None
+            except smtplib.SMTPAuthenticationError as e:
+                results[entry_id] = e  # A credentials problem, not the message's; keep retrying
+            except smtplib.SMTPResponseException as e:
+                # 5xx replies are permanent (bad mailbox, policy rejection); 4xx are worth retrying
+                results[entry_id] = PermanentDeliveryError(str(e)) if e.smtp_code >= 500 else e
+            except smtplib.SMTPRecipientsRefused as e:
+                results[entry_id] = PermanentDeliveryError(str(e))
+            except Exception as e:
+                results[entry_id] = e
+    return results
+
+
+def _retry_delay(attempts, config):
+    """Exponential backoff with jitter: base, 2x base, 4x base ... capped at the maximum."""
+    base = config.get('EMAIL_OUTBOX_RETRY_BASE_SECONDS', 60)
+    cap = config.get('EMAIL_OUTBOX_RETRY_MAX_SECONDS', 3600)
+    delay = min(cap, base * 2 ** (attempts - 1))
+    return timedelta(seconds=delay * random.uniform(0.9, 1.1))
+
+
+def _reclaim_stale(stale_after, max_attempts):
+    """
+    Give rows left in 'sending' by a worker that died mid-send back to the queue. The lost send
+    counts as an attempt, so an email that keeps crashing its worker is dead-lettered at
+    max_attempts instead of being retried forever. Returns the number dead-lettered.
+    """
+    stale = db.and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < datetime.utcnow() - stale_after)
+    dead = EmailOutbox.query.filter(stale, EmailOutbox.attempts + 1 >= max_attempts).update({
+        EmailOutbox.status: 'dead',
+        EmailOutbox.attempts: EmailOutbox.attempts + 1,
+        EmailOutbox.locked_at: None,
+        EmailOutbox.last_error: 'Worker stopped while sending'
+    }, synchronize_session=False)
+    EmailOutbox.query.filter(stale).update({
+        EmailOutbox.status: 'pending',
+        EmailOutbox.attempts: EmailOutbox.attempts + 1,
+        EmailOutbox.locked_at: None
+    }, synchronize_session=False)
+    db.session.commit()
+    if dead:
+        logger.error(f"{dead} email(s) dead-lettered after their worker stopped mid-send {max_attempts} time(s)")
+    return dead
+
+
+def _claim_batch(limit):
+    """Mark up to `limit` due emails as sending and return them; rows locked by another worker are skipped."""
+    now = datetime.utcnow()
+    entries = db.session.scalars(
+        db.select(EmailOutbox)
+        .where(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.next_attempt_at, EmailOutbox.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    ).all()
+    for entry in entries:
+        entry.status = 'sending'
+        entry.locked_at = now
+    db.session.commit()
+    # Reload the claimed rows in one query rather than one refresh per expired row
+    return db.session.scalars(
+        db.select(EmailOutbox).where(EmailOutbox.id.in_([entry.id for entry in entries]))
+    ).all() if entries else []
+
+
+def drain_outbox(batch_size=None, workers=None):
+    """
+    Deliver due outbox emails: claim a batch, send it from a bounded pool of threads (each on one
+    pooled SMTP session), record the outcome, and repeat while full batches keep coming. Failed
+    emails are retried with exponential backoff until EMAIL_OUTBOX_MAX_ATTEMPTS, permanent failures
+    are dead-lettered at once. Returns {'sent', 'retried', 'dead'} counts for the run.
+    """
+    config = current_app.config
+    batch_size = batch_size or config.get('EMAIL_OUTBOX_BATCH_SIZE', 100)
+    workers = workers or config.get('EMAIL_OUTBOX_WORKERS', 2)
+    stale_after = timedelta(minutes=config.get('EMAIL_OUTBOX_STALE_MINUTES', 15))
+    counts = {'sent': 0, 'retried': 0, 'dead': 0}
+    counts['dead'] += _reclaim_stale(stale_after, config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 6))
+
+    while True:
+        entries = _claim_batch(batch_size)
+        if entries:
+            _deliver_batch(entries, workers, config, counts)
+        if len(entries) < batch_size:
+            break
+
+    if any(counts.values()):
+        _prune_sent(config.get('EMAIL_OUTBOX_RETENTION_DAYS', 30))
+        logger.info(f"Email outbox run: {counts['sent']} sent, {counts['retried']} to retry, {counts['dead']} dead-lettered")
+    return counts
+
+
+def _deliver_batch(entries, workers, config, counts):
+    default_sender = config.get('MAIL_DEFAULT_SENDER')
+    max_attempts = config.get('EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+    results, payloads = {}, []
+    for entry in entries:
+        try:
+            message = _build_message(entry, default_sender)
+            payloads.append((entry.id, entry.sender or default_sender,
+                             [address.strip() for address in entry.recipients.split(',')], message))
+        except Exception as e:
+            results[entry.id] = e if isinstance(e, PermanentDeliveryError) else PermanentDeliveryError(str(e))
+
+    chunks = [payloads[index::workers] for index in range(workers) if payloads[index::workers]]
+    if chunks:
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            for chunk_results in executor.map(_deliver_chunk, chunks):
+                results.update(chunk_results)
+
+    now = datetime.utcnow()
+    for entry in entries:
+        error = results.get(entry.id)
+        entry.attempts += 1
+        entry.locked_at = None
+        if error is None:
+            entry.status, entry.sent_at, entry.last_error = 'sent', now, None
+            counts['sent'] += 1
+        elif isinstance(error, PermanentDeliveryError) or entry.attempts >= max_attempts:
+            entry.status, entry.last_error = 'dead', str(error)
+            counts['dead'] += 1
+            logger.error(f"Email {entry.id} to {entry.recipients} dead-lettered after {entry.attempts} attempt(s): {error}")
+        else:
+            entry.status, entry.last_error = 'pending', str(error)
+            entry.next_attempt_at = now + _retry_delay(entry.attempts, config)
+            counts['retried'] += 1
+    db.session.commit()
+
+
+def _prune_sent(retention_days):
+    """Delete delivered emails older than the retention period; dead letters are kept for inspection."""
+    EmailOutbox.query.filter(
+        EmailOutbox.status == 'sent',
+        EmailOutbox.sent_at < datetime.utcnow() - timedelta(days=retention_days)
+    ).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def requeue_dead(entry_ids=None):
+    """Give dead-lettered emails (all, or the given ids) a fresh set of attempts. Returns the number requeued."""
+    query = EmailOutbox.query.filter(EmailOutbox.status == 'dead')
+    if entry_ids:
+        query = query.filter(EmailOutbox.id.in_(entry_ids))
+    requeued = query.update({
+        EmailOutbox.status: 'pending',
+        EmailOutbox.attempts: 0,
+        EmailOutbox.next_attempt_at: datetime.utcnow()
+    }, synchronize_session=False)
+    db.session.commit()
+    return requeued
+
+
+def get_outbox_metrics():
+    """Delivery metrics in one query: emails per status, oldest due email, sends and retries in the last hour."""
+    now = datetime.utcnow()
+    hour_ago = now - timedelta(hours=1)
+    due = db.and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now)
+    def count_where(*criteria):
+        return db.func.coalesce(db.func.sum(db.case((db.and_(*criteria), 1), else_=0)), 0)
+
+    row = db.session.execute(db.select(
+        *[count_where(EmailOutbox.status == status).label(status) for status in OUTBOX_STATUSES],
+        db.func.min(db.case((due, EmailOutbox.created_at))).label('oldest_due'),
+        count_where(EmailOutbox.sent_at >= hour_ago).label('sent_last_hour'),
+        count_where(EmailOutbox.status == 'pending', EmailOutbox.attempts > 0).label('retrying'),
+        db.func.avg(db.case((EmailOutbox.status == 'sent', EmailOutbox.attempts))).label('avg_attempts'),
+    )).one()._mapping
+
+    metrics = {status: int(row[status]) for status in OUTBOX_STATUSES}
+    metrics.update({
+        'retrying': int(row['retrying']),
+        'sent_last_hour': int(row['sent_last_hour']),
+        'avg_attempts_per_sent': round(float(row['avg_attempts'] or 0), 2),
+        'oldest_due_age_seconds': int((now - row['oldest_due']).total_seconds()) if row['oldest_due'] else 0,
+    })
+    return metrics
@@ -0,0 +1,190 @@
+import smtplib
+import socket
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from modules.utils.logger import setup_logger
+
+logger = setup_logger('smtp_pool')
+
+# Transport failures after which the connection is dropped and the message retried once on a fresh one.
+# Server replies (SMTPResponseException, SMTPRecipientsRefused) propagate and leave the session open.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+
+class _PooledConnection:
+    """One logged-in SMTP session plus the bookkeeping the pool needs to reuse or retire it."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.smtp = None
+        self.sent = 0
+        self.last_used = 0.0
+
+    def open(self):
+        pool = self.pool
+        if pool.use_ssl:
+            smtp = smtplib.SMTP_SSL(pool.host, pool.port, timeout=pool.timeout)
+        else:
+            smtp = smtplib.SMTP(pool.host, pool.port, timeout=pool.timeout)
+            if pool.use_tls:
+                smtp.starttls()
+        if pool.username and pool.password:
+            smtp.login(pool.username, pool.password)
+        self.smtp, self.sent, self.last_used = smtp, 0, time.monotonic()
+
+    def close(self):
+        if self.smtp is not None:
+            try:
+                self.smtp.quit()
+            except Exception:
+                pass
+        self.smtp = None
+
+    def is_alive(self):
+        """NOOP round trip; used on connections that sat idle long enough for the server to drop them."""
+        try:
+            return self.smtp is not None and self.smtp.noop()[0] == 250
+        except CONNECTION_ERRORS:
+            return False
+
+
+class SmtpPool:
+    """
+    Shared SMTP transport: a bounded pool of persistent, logged-in connections. Idle connections
+    are checked with NOOP before reuse, a connection that drops mid-send is reopened and the
+    message retried once, and each connection is recycled after max_messages sends. Sends are
+    rate limited across the whole pool. batch() pins one connection to the current thread so a
+    loop of sends shares a single session.
+    """
+
+    def __init__(self):
+        self.host = 'smtp.gmail.com'
+        self.port = 465
+        self.use_ssl = True
+        self.use_tls = False
+        self.username = None
+        self.password = None
+        self.timeout = 10
+        self.size = 3
+        self.max_messages = 100
+        self.keepalive = 30
+        self.rate = 0
+        self._config = {}
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_send_at = 0.0
+
+    def configure(self, config):
+        """Read server, credentials and pool limits from the app config (the same MAIL_* keys as Flask-Mail)."""
+        self.close()
+        self.host = config.get('MAIL_SERVER', self.host)
+        self.port = config.get('MAIL_PORT', self.port)
+        self.use_ssl = config.get('MAIL_USE_SSL', self.use_ssl)
+        self.use_tls = config.get('MAIL_USE_TLS', False)
+        self.username = config.get('MAIL_USERNAME')
+        self.password = config.get('MAIL_PASSWORD')
+        self.size = config.get('MAIL_POOL_SIZE', 3)
+        self.max_messages = config.get('MAIL_MAX_MESSAGES_PER_CONNECTION', 100)
+        self.keepalive = config.get('MAIL_KEEPALIVE_SECONDS', 30)
+        self.rate = config.get('MAIL_RATE_PER_SECOND', 0)
+        self._config = config
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    @property
+    def suppress(self):
+        """Like Flask-Mail, send nothing under MAIL_SUPPRESS_SEND or while testing (read live from the config)."""
+        return self._config.get('MAIL_SUPPRESS_SEND', self._config.get('TESTING', False))
+
+    def _acquire(self, connect=True):
+        self._slots.acquire()
+        try:
+            with self._lock:
+                connection = self._idle.pop() if self._idle else None
+            if connection is not None and time.monotonic() - connection.last_used > self.keepalive \
+                    and not connection.is_alive():
+                connection.close()
+            if connection is None:
+                connection = _PooledConnection(self)
+            if connect and connection.smtp is None:
+                connection.open()
+            return connection
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, connection):
+        if connection.smtp is not None:
+            connection.last_used = time.monotonic()
+            with self._lock:
+                self._idle.append(connection)
+        self._slots.release()
+
+    def _throttle(self):
+        """Space sends at least 1/rate seconds apart across all threads (no limit when rate is 0)."""
+        if not self.rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            send_at = max(now, self._next_send_at)
+            self._next_send_at = send_at + 1.0 / self.rate
+        if send_at > now:
+            time.sleep(send_at - now)
+
+    def _send_on(self, connection, from_addr, to_addrs, message):
+        for attempt in range(2):
+            try:
+                if connection.smtp is None:
+                    connection.open()
+                self._throttle()
+                connection.smtp.sendmail(from_addr, to_addrs, message)
+                break
+            except CONNECTION_ERRORS as e:
+                connection.close()
+                if attempt:
+                    raise
+                logger.warning(f"SMTP connection lost ({e}), reconnecting")
+        connection.sent += 1
+        connection.last_used = time.monotonic()
+        if connection.sent >= self.max_messages:
+            connection.close()  # Servers cap messages per session; the next send opens a new one
+
+    def send(self, from_addr, to_addrs, message):
+        """Send one message (str or bytes) on a pooled connection, or on the thread's batch connection."""
+        if self.suppress:
+            logger.info(f"Mail sending suppressed; not sending to {to_addrs}")
+            return
+        pinned = getattr(self._local, 'connection', None)
+        connection = pinned or self._acquire()
+        try:
+            self._send_on(connection, from_addr, to_addrs, message)
+        finally:
+            if pinned is None:
+                self._release(connection)
+
+    @contextmanager
+    def batch(self):
+        """Hold one pooled connection for every send made by this thread inside the block."""
+        if self.suppress or getattr(self._local, 'connection', None) is not None:
+            yield
+            return
+        connection = self._acquire(connect=False)  # Opened by the first send, so failures surface per message
+        self._local.connection = connection
+        try:
+            yield
+        finally:
+            self._local.connection = None
+            self._release(connection)
+
+    def close(self):
+        """Log out of every idle connection (shutdown, or before reconfiguring)."""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for connection in idle:
+            connection.close()
+
+
+smtp_pool = SmtpPool()
@@ -0,0 +1,91 @@
+import smtplib
+import pytest
+from modules.utils.email_automation import smtp_pool as smtp_pool_module
+from modules.utils.email_automation.smtp_pool import SmtpPool
+
+
+class FakeSMTP:
+    """In-memory SMTP session; `drop_next` makes the next sendmail fail as if the server hung up."""
+    opened = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.drop_next = False
+        FakeSMTP.opened.append(self)
+
+    def login(self, username, password):
+        pass
+
+    def noop(self):
+        return 250, b'OK'
+
+    def sendmail(self, from_addr, to_addrs, message):
+        refused = {address: (550, b'5.1.1 No such user') for address in to_addrs if address.startswith('nobody@')}
+        if refused:
+            raise smtplib.SMTPRecipientsRefused(refused)
+        if self.drop_next:
+            self.drop_next = False
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(to_addrs)
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Fixture to provide an SMTP pool on fake connections, recycling each after 3 messages."""
+    FakeSMTP.opened = []
+    monkeypatch.setattr(smtp_pool_module.smtplib, 'SMTP', FakeSMTP)
+    smtp_pool = SmtpPool()
+    smtp_pool.configure({
+        'MAIL_SERVER': 'localhost',
+        'MAIL_PORT': 25,
+        'MAIL_USE_SSL': False,
+        'MAIL_USERNAME': 'user',
+        'MAIL_PASSWORD': 'secret',
+        'MAIL_MAX_MESSAGES_PER_CONNECTION': 3,
+    })
+    yield smtp_pool
+    smtp_pool.close()
+
+
+def test_smtp_pool_reconnects_after_disconnect(pool):
+    """
+    Test case for the pooled SMTP transport.
+    Verifies a message whose connection drops mid-send is delivered once on a fresh connection.
+    """
+    pool.send('noreply@example.com', ['first@example.com'], b'Subject: 1\r\n\r\nBody')
+    FakeSMTP.opened[0].drop_next = True
+
+    pool.send('noreply@example.com', ['second@example.com'], b'Subject: 2\r\n\r\nBody')
+
+    assert len(FakeSMTP.opened) == 2
+    assert FakeSMTP.opened[0].sent == [['first@example.com']]
+    assert FakeSMTP.opened[1].sent == [['second@example.com']]
+
+
+def test_smtp_pool_keeps_connection_on_refused_recipient(pool):
+    """
+    Test case for the pooled SMTP transport.
+    Verifies a refused recipient is raised to the caller without reconnecting, and the session is reused.
+    """
+    with pytest.raises(smtplib.SMTPRecipientsRefused):
+        pool.send('noreply@example.com', ['nobody@example.com'], b'Subject: 1\r\n\r\nBody')
+
+    pool.send('noreply@example.com', ['someone@example.com'], b'Subject: 2\r\n\r\nBody')
+
+    assert len(FakeSMTP.opened) == 1
+    assert FakeSMTP.opened[0].sent == [['someone@example.com']]
+
+
+def test_smtp_pool_recycles_after_max_messages(pool):
+    """
+    Test case for the pooled SMTP transport.
+    Verifies a connection is replaced after MAIL_MAX_MESSAGES_PER_CONNECTION sends, including inside a batch.
+    """
+    with pool.batch():
+        for index in range(7):
+            pool.send('noreply@example.com', [f'user{index}@example.com'], b'Subject: Hi\r\n\r\nBody')
+
+    assert [len(connection.sent) for connection in FakeSMTP.opened] == [3, 3, 1]
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import pdfkit
+
+try:
+    import fcntl
+except ImportError:  # Windows: the desktop build runs a single process, so the thread lock suffices
+    fcntl = None
+
+
+class PdfQueueFull(Exception):
+    """Raised when too many PDF renders are already waiting for a worker."""
+
+
+def _render_pdf(html_content, options, output_path, retries=3):
+    """Worker process: run wkhtmltopdf into a temporary file, then move it into the cache atomically."""
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    for attempt in range(retries):
+        try:
+            pdfkit.from_string(html_content, temp_path, options=options)
+            break
+        except Exception:
+            if attempt == retries - 1:
+                raise
+            time.sleep(1)  # Wait before retry
+    os.replace(temp_path, output_path)
+    return output_path
+
+
+class PdfRenderService:
+    """
+    Renders HTML to PDF in a bounded pool of worker processes, so exports never hold a web worker
+    while wkhtmltopdf runs. Jobs are keyed by a hash of the HTML and options: identical requests
+    share one render, and finished PDFs are served from the on-disk cache until they expire.
+    Each job's owners and outcome are kept next to its PDF in the cache directory, so any web
+    worker sharing that directory can answer status polls and downloads.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._futures = {}  # key -> Future of the renders this process started
+        self._lock = threading.RLock()  # Re-entered when a done callback fires inside submit()
+        self._file_locked = False
+        self._last_prune = 0.0
+        self.workers = 2
+        self.max_queued = 20
+        self.cache_dir = None
+        self.max_age = 24 * 3600
+        self.stale_after = 10 * 60
+
+    def configure(self, config):
+        """Read pool size, queue bound and cache location from the app config."""
+        self.workers = config.get('PDF_RENDER_WORKERS', 2)
+        self.max_queued = config.get('PDF_MAX_QUEUED_JOBS', 20)
+        self.cache_dir = config.get('PDF_CACHE_DIR') or os.path.join(config['REPORT_STORAGE_DIR'], 'pdf_cache')
+        self.max_age = config.get('PDF_CACHE_MAX_AGE_HOURS', 24) * 3600
+        self.stale_after = config.get('PDF_RENDER_STALE_MINUTES', 10) * 60
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def content_key(html_content, options):
+        digest = hashlib.sha256(html_content.encode('utf-8'))
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def cached_path(self, key):
+        """Path of a finished PDF in the cache, or None."""
+        path = os.path.join(self.cache_dir, f"{key}.pdf")
+        return path if os.path.exists(path) else None
+
+    def _read_job(self, key):
+        """The shared job record ({'owners', 'download_name', 'submitted_at', 'error'}), or None."""
+        try:
+            with open(os.path.join(self.cache_dir, f"{key}.json"), encoding='utf-8') as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+    def _write_job(self, key, job):
+        path = os.path.join(self.cache_dir, f"{key}.json")
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as fp:
+            json.dump(job, fp)
+        os.replace(temp_path, path)
+
+    @contextmanager
+    def _job_lock(self):
+        """
+        Serialise job record read-modify-writes across threads and, through an flock on a file in
+        the cache directory, across every web worker process that shares it.
+        """
+        with self._lock:
+            if fcntl is None or self._file_locked:
+                yield
+                return
+            with open(os.path.join(self.cache_dir, 'jobs.lock'), 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._file_locked = True
+                try:
+                    yield
+                finally:
+                    self._file_locked = False
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _record_failure(self, key, future):
+        """Done callback: store a failed render's error where every web worker can see it."""
+        if future.cancelled() or future.exception() is None:
+            return
+        with self._job_lock():
+            job = self._read_job(key)
+            if job is not None:
+                job['error'] = str(future.exception())
+                self._write_job(key, job)
+
+    def _is_rendering(self, key, job):
+        """True while a render of `key` is in flight here or, going by its record, in another process."""
+        future = self._futures.get(key)
+        if future is not None:
+            return not future.done()
+        return job is not None and not job['error'] and time.time() - job['submitted_at'] < self.stale_after
+
+    def submit(self, html_content, options, owner_id, download_name='document.pdf'):
+        """
+        Queue a render and return its job key straight away. A cached PDF or an identical job
+        already in flight is reused; PdfQueueFull is raised when the queue is at its bound.
+        """
+        key = self.content_key(html_content, options)
+        self._prune()
+        with self._job_lock():
+            job = self._read_job(key)
+            if not self.cached_path(key) and not self._is_rendering(key, job):
+                pending = sum(1 for future in self._futures.values() if not future.done())
+                if pending >= self.max_queued:
+                    raise PdfQueueFull("Too many PDF exports are in progress, please try again shortly.")
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                output_path = os.path.join(self.cache_dir, f"{key}.pdf")
+                job = {'owners': [], 'download_name': download_name, 'submitted_at': time.time(), 'error': None}
+                self._write_job(key, job)
+                future = self._executor.submit(_render_pdf, html_content, options, output_path)
+                self._futures[key] = future
+                future.add_done_callback(lambda done: self._record_failure(key, done))
+            elif job is None:
+                job = {'owners': [], 'download_name': download_name, 'submitted_at': time.time(), 'error': None}
+
+            if owner_id not in job['owners']:
+                job['owners'].append(owner_id)
+            job['download_name'] = download_name
+            self._write_job(key, job)
+        return key
+
+    def status(self, key, owner_id):
+        """
+        Return {'status', 'download_name', 'error'} for a job the user submitted, or None.
+        Answered from the shared job record, so it does not matter which process took the render.
+        """
+        with self._lock:
+            job = self._read_job(key)
+            future = self._futures.get(key)
+        if job is None or owner_id not in job['owners']:
+            return None
+
+        if self.cached_path(key):
+            status, error = 'done', None
+        elif future is not None and future.done() and future.exception() is not None:
+            status, error = 'failed', str(future.exception())
+        elif job['error']:
+            status, error = 'failed', job['error']
+        elif future is not None:
+            status, error = ('running' if future.running() else 'queued'), None
+        elif time.time() - job['submitted_at'] < self.stale_after:
+            status, error = 'running', None  # Rendering in another web worker's pool
+        else:
+            status, error = 'failed', "The PDF render did not finish; please export again."
+        return {'status': status, 'download_name': job['download_name'], 'error': error}
+
+    def render(self, html_content, options, owner_id):
+        """Render through the pool and wait for the result; for callers that need the file now."""
+        key = self.submit(html_content, options, owner_id)
+        with self._lock:
+            future = self._futures.get(key)
+        if future is not None:
+            future.result()
+        while (status := self.status(key, owner_id))['status'] not in ('done', 'failed'):
+            time.sleep(0.5)  # An identical render is in flight in another process
+        if status['status'] == 'failed':
+            raise RuntimeError(status['error'])
+        return self.cached_path(key)
+
+    def _prune(self):
+        """Drop finished renders and cached files older than the cache lifetime (at most once an hour)."""
+        now = time.time()
+        if now - self._last_prune < 3600:
+            return
+        self._last_prune = now
+        with self._lock:
+            for key in [key for key, future in self._futures.items() if future.done()]:
+                del self._futures[key]
+        for name in os.listdir(self.cache_dir):
+            if name == 'jobs.lock':
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.max_age:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+pdf_service = PdfRenderService()
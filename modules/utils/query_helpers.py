@@ -0,0 +1,18 @@
+from sqlalchemy.orm import undefer_group
+from inventory_system import db
+
+# Deferral group shared by the large columns (long text, JSON payloads) of frequently listed models
+DETAIL_GROUP = 'detail'
+
+
+def detail_column(column):
+    """
+    Declare a large column as deferred: ordinary queries leave it out of the SELECT and it is
+    loaded on first access, unless the query asked for the details with with_details().
+    """
+    return db.deferred(column, group=DETAIL_GROUP)
+
+
+def with_details(query):
+    """Load the deferred detail columns in the same SELECT, for pages that render them."""
+    return query.options(undefer_group(DETAIL_GROUP))
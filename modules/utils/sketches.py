@@ -0,0 +1,158 @@
+import hashlib
+import math
+import struct
+import zlib
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch. With the default precision (2**12 registers) the standard
+    error is about 1.6% regardless of how many values are added.
+    """
+
+    def __init__(self, precision=12, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+
+    def add(self, value):
+        """Add a value; equal values (by their string form) are counted once."""
+        digest = hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest()
+        hashed = int.from_bytes(digest, 'big')
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        """Fold another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        """Estimated number of distinct values added."""
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # Small cardinalities: linear counting is more accurate
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self):
+        """Serialise as the precision followed by the zlib-compressed registers."""
+        return bytes([self.precision]) + zlib.compress(bytes(self.registers))
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(precision=data[0], registers=zlib.decompress(data[1:]))
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (merging t-digest). Centroids are kept small near the tails, so
+    extreme quantiles stay accurate while the whole digest holds at most a few hundred centroids.
+    """
+
+    _HEADER = struct.Struct('<Hddd')
+    _CENTROID = struct.Struct('<dd')
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.centroids = []  # Sorted [mean, weight] pairs
+        self.count = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer = []
+
+    def add(self, value, weight=1.0):
+        value = float(value)
+        self._buffer.append([value, float(weight)])
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        """Fold another digest into this one."""
+        other._compress()
+        self._buffer.extend([mean, weight] for mean, weight in other.centroids)
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _scale(self, q):
+        """k1 scale function: maps a quantile to a centroid index, steep near 0 and 1."""
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _scale_inverse(self, k):
+        k = max(-self.compression / 4, min(self.compression / 4, k))
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        """Merge buffered points and existing centroids, respecting the per-centroid size limit."""
+        if not self._buffer:
+            return
+        points = sorted(self.centroids + self._buffer)
+        self._buffer = []
+        total = sum(weight for _, weight in points)
+
+        merged = [list(points[0])]
+        cumulative = 0.0
+        limit = self._scale_inverse(self._scale(0.0) + 1) * total
+        for mean, weight in points[1:]:
+            current = merged[-1]
+            if cumulative + current[1] + weight <= limit:
+                current[0] += (mean - current[0]) * weight / (current[1] + weight)
+                current[1] += weight
+            else:
+                cumulative += current[1]
+                limit = self._scale_inverse(self._scale(cumulative / total) + 1) * total
+                merged.append([mean, weight])
+        self.centroids = merged
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0..1), or None for an empty digest."""
+        self._compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+        target = q * self.count
+        cumulative = 0.0
+        previous_center, previous_mean = 0.0, self.min
+        for mean, weight in self.centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - previous_center
+                fraction = (target - previous_center) / span if span else 0
+                return previous_mean + (mean - previous_mean) * fraction
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+        span = self.count - previous_center
+        fraction = (target - previous_center) / span if span else 1
+        return previous_mean + (self.max - previous_mean) * min(fraction, 1)
+
+    def to_bytes(self):
+        """Serialise as a fixed header followed by packed (mean, weight) pairs."""
+        self._compress()
+        return self._HEADER.pack(self.compression, self.count, self.min, self.max) + b''.join(
+            self._CENTROID.pack(mean, weight) for mean, weight in self.centroids
+        )
+
+    @classmethod
+    def from_bytes(cls, data):
+        compression, count, minimum, maximum = cls._HEADER.unpack_from(data)
+        digest = cls(compression=compression)
+        digest.count, digest.min, digest.max = count, minimum, maximum
+        digest.centroids = [
+            list(cls._CENTROID.unpack_from(data, offset))
+            for offset in range(cls._HEADER.size, len(data), cls._CENTROID.size)
+        ]
+        return digest
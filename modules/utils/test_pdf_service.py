@@ -0,0 +1,90 @@
+import multiprocessing
+import pytest
+from concurrent.futures import Future
+from modules.utils.pdf_service import PdfQueueFull, PdfRenderService, fcntl
+
+
+class PendingExecutor:
+    """Stands in for the process pool: records submissions and leaves them pending."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+@pytest.fixture
+def pdf_render_service(tmp_path):
+    """Fixture to provide a render service with its own cache directory and a queue bound of 2."""
+    service = PdfRenderService()
+    service.configure({'REPORT_STORAGE_DIR': str(tmp_path), 'PDF_MAX_QUEUED_JOBS': 2})
+    service._executor = PendingExecutor()
+    return service
+
+
+def test_identical_pdf_submits_share_one_render(pdf_render_service, tmp_path):
+    """
+    Test case for PDF job de-duplication.
+    Verifies identical submits share one render, also from another worker, and only owners see the job.
+    """
+    first = pdf_render_service.submit('<p>Report</p>', {'page-size': 'A4'}, owner_id=1)
+    second = pdf_render_service.submit('<p>Report</p>', {'page-size': 'A4'}, owner_id=2)
+    assert first == second
+    assert len(pdf_render_service._executor.futures) == 1
+
+    other_worker = PdfRenderService()
+    other_worker.configure({'REPORT_STORAGE_DIR': str(tmp_path)})
+    other_worker._executor = PendingExecutor()
+    assert other_worker.submit('<p>Report</p>', {'page-size': 'A4'}, owner_id=3) == first
+    assert other_worker._executor.futures == []
+    assert other_worker.status(first, 2)['status'] == 'running'
+    assert other_worker.status(first, 99) is None
+
+
+def test_pdf_queue_bound(pdf_render_service):
+    """
+    Test case for the PDF queue bound.
+    Verifies PdfQueueFull is raised once PDF_MAX_QUEUED_JOBS renders are pending, and cleared when one finishes.
+    """
+    pdf_render_service.submit('<p>One</p>', {}, owner_id=1)
+    pdf_render_service.submit('<p>Two</p>', {}, owner_id=1)
+    with pytest.raises(PdfQueueFull):
+        pdf_render_service.submit('<p>Three</p>', {}, owner_id=1)
+
+    pdf_render_service._executor.futures[0].set_result(None)
+    pdf_render_service.submit('<p>Three</p>', {}, owner_id=1)
+    assert len(pdf_render_service._executor.futures) == 3
+
+
+def _submit_as_worker(cache_dir, owner_ids):
+    """Run in a separate process: submit the same export once per owner, like one web worker would."""
+    service = PdfRenderService()
+    service.configure({'REPORT_STORAGE_DIR': cache_dir})
+    service._executor = PendingExecutor()
+    for owner_id in owner_ids:
+        service.submit('<p>Shared</p>', {}, owner_id=owner_id)
+
+
+@pytest.mark.skipif(fcntl is None, reason="Job records are only locked across processes where flock exists")
+def test_concurrent_workers_keep_every_owner(tmp_path):
+    """
+    Test case for the shared PDF job record.
+    Verifies owners added at the same time from several worker processes are all kept.
+    """
+    context = multiprocessing.get_context('fork')
+    workers = [
+        context.Process(target=_submit_as_worker, args=(str(tmp_path), range(start, start + 20)))
+        for start in range(0, 80, 20)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    service = PdfRenderService()
+    service.configure({'REPORT_STORAGE_DIR': str(tmp_path)})
+    key = service.content_key('<p>Shared</p>', {})
+    assert sorted(service._read_job(key)['owners']) == list(range(80))
@@ -1,6 +1,7 @@
 from datetime import datetime
 from inventory_system import db
 from flask_login import current_user
+from modules.utils.query_helpers import detail_column
 
 class Visualization(db.Model):
     __tablename__ = 'visualizations'
@@ -12,9 +13,10 @@ class Visualization(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.now)
     start_date = db.Column(db.Date, nullable=True)          # Start of date range for visualization
     end_date = db.Column(db.Date, nullable=True)            # End of date range for visualization
-    data = db.Column(db.JSON, nullable=False)               # Store data used in the chart
+    data = detail_column(db.Column(db.JSON, nullable=False))  # Store data used in the chart (deferred)
     chart_url = db.Column(db.String(255), nullable=True)    # URL to generated chart image/file if applicable
-    chart_html = db.Column(db.Text(length=4294967295), nullable=True)  # Changed to LONGTEXT
+    chart_html = detail_column(db.Column(db.Text(length=4294967295), nullable=True))  # Legacy rendered HTML (deferred)
+    chart_spec = detail_column(db.Column(db.JSON, nullable=True))  # Plotly figure spec rendered client-side (deferred)
 
     user = db.relationship('User', backref='visualizations')
 
@@ -33,5 +35,6 @@ class Visualization(db.Model):
             'end_date': self.end_date.strftime('%Y-%m-%d') if self.end_date else None,
             'data': self.data,
             'chart_url': self.chart_url,
-            'chart_html': self.chart_html
+            'chart_html': self.chart_html,
+            'chart_spec': self.chart_spec
         }
\ No newline at end of file
@@ -1,9 +1,13 @@
-import pdfkit
+import shutil
 from datetime import datetime
+from modules.utils.pdf_service import pdf_service
 
 
 def generate_pdf(html_content, output_path):
-    """Convert HTML content to a PDF file with improved formatting."""
+    """
+    Convert HTML content to a PDF file with improved formatting. The render runs in the shared
+    PDF pool (so concurrent exports stay bounded) and this call waits for it.
+    """
     try:
         options = {
             'page-size': 'A4',
@@ -23,11 +27,7 @@ def generate_pdf(html_content, output_path):
             'footer-line': None
         }
 
-        pdfkit.from_string(
-            html_content,
-            output_path,
-            options=options
-        )
+        shutil.copyfile(pdf_service.render(html_content, options, owner_id=None), output_path)
         return True
     except Exception as e:
         print(f"Error generating PDF: {str(e)}")
@@ -1,11 +1,24 @@
+import json
 import plotly.express as px
 import pandas as pd
 from datetime import datetime
+from flask import current_app
 import pdfkit
+from modules.utils.downsampling import downsample_series
+
+
+CHART_CONFIG = {
+    'responsive': True,
+    'displayModeBar': True,
+    'displaylogo': False
+}
 
 
 def create_visualization(data, chart_type, settings):
-    """Generate Plotly chart based on data and settings."""
+    """
+    Generate a Plotly chart based on data and settings and return its figure spec
+    ({'data', 'layout', 'config'}), rendered in the browser with the shared plotly.js bundle.
+    """
     try:
         if not data or not settings:
             return None
@@ -14,13 +27,17 @@ def create_visualization(data, chart_type, settings):
         print(f"Chart type: {chart_type}")
         print(f"Settings: {settings}")
 
-        df = pd.DataFrame(data)
-        print(f"DataFrame columns: {df.columns}")
-
         # Get the correct column names based on available data
         x_col = settings.get('x')
         y_col = settings.get('y')
 
+        # Thin long time series (LTTB keeps peaks and troughs) so the figure stays light
+        if chart_type in ['bar', 'line'] and y_col:
+            data = downsample_series(data, y_col, current_app.config.get('CHART_MAX_POINTS', 1000))
+
+        df = pd.DataFrame(data)
+        print(f"DataFrame columns: {df.columns}")
+
         # Validate that the required columns exist
         if chart_type in ['bar', 'line']:
             if x_col not in df.columns:
@@ -86,15 +103,10 @@ def create_visualization(data, chart_type, settings):
 
         if fig:
             fig.update_layout(**layout_settings)
-            return fig.to_html(
-                full_html=False,
-                include_plotlyjs=True,
-                config={
-                    'responsive': True,
-                    'displayModeBar': True,
-                    'displaylogo': False
-                }
-            )
+            # to_json handles numpy/pandas values; the result is plain JSON-serialisable data
+            spec = json.loads(fig.to_json(validate=False, remove_uids=True))
+            spec['config'] = dict(CHART_CONFIG)
+            return spec
 
         return None
 
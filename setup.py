@@ -32,10 +32,13 @@ setup(
         "MarkupSafe==2.1.5",
         "marshmallow==3.22.0",
         "marshmallow-sqlalchemy==1.1.0",
+        "numpy==1.26.4",
+        "openpyxl==3.1.5",
         "packaging==24.1",
         "passlib==1.7.4",
         "psycopg2-binary==2.9.9",
         "PyJWT==2.9.0",
+        "pypdf==5.1.0",
         "python-dotenv==1.0.1",
         "pytz==2024.2",
         "referencing==0.36.2",